@@ -0,0 +1,265 @@
+import argparse
+import json
+import logging
+import os
+import re
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Dict, List, Optional, Tuple
+
+from listing_archive import ListingArchive
+from vinted_scraper import VintedScraper
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_DIR = os.path.join("cache", "backfill")
+
+# Bands are (low, high) in whole cents of the domain's currency, both ends inclusive
+Band = Tuple[int, int]
+
+
+class BackfillCrawler:
+    """
+    Full snapshot of a query's active listings, beyond what one paginated
+    query can reach. Vinted stops serving pages after `max_pages`, so the
+    price range is split until every band fits in per_page * max_pages
+    listings: a band whose first page reports more entries than that (or whose
+    last reachable page is still full) is cut into narrower bands. Bands are
+    crawled concurrently on `workers` threads, and every request still goes
+    through the scraper's rate limiter or egress pool, so the rate budget holds.
+
+    Progress is kept in a JSON checkpoint. Finished bands are recorded only
+    after their listings have been flushed to the archive, so a crawl that is
+    interrupted resumes where it stopped without losing or re-writing bands.
+    """
+
+    def __init__(self, scraper: VintedScraper, brands: List[str] = None, search_text: str = "",
+                 min_price: float = 0.0, max_price: float = 5000.0, checkpoint_path: str = None,
+                 archive: ListingArchive = None, workers: int = 4, per_page: int = 96, max_pages: int = 10,
+                 checkpoint_interval: float = 30, max_attempts: int = 3):
+        self.scraper = scraper
+        self.brands = brands or []
+        self.search_text = search_text
+        self.workers = workers
+        self.per_page = per_page
+        self.max_pages = max_pages
+        self.limit = per_page * max_pages
+        self.checkpoint_interval = checkpoint_interval
+        self.max_attempts = max_attempts
+        # Bounds are given in GBP like everywhere else; bands live in the domain's currency
+        self.range = (int(round(scraper.fx.from_gbp(min_price, scraper.currency) * 100)),
+                      int(round(scraper.fx.from_gbp(max_price, scraper.currency) * 100)))
+        self.checkpoint_path = checkpoint_path or default_checkpoint_path(scraper.domain, self.brands, search_text)
+        # Only flushed at checkpoints, so the checkpoint never claims rows that aren't on disk
+        self.archive = archive or ListingArchive(flush_rows=float("inf"), flush_interval=24 * 3600)
+
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.state: Dict = {}
+        self.unflushed: List[Tuple[Band, int, bool]] = []
+
+    def _query(self) -> Dict:
+        return {"domain": self.scraper.domain, "brands": sorted(self.brands), "search_text": self.search_text,
+                "range": list(self.range), "per_page": self.per_page, "max_pages": self.max_pages}
+
+    def _load_checkpoint(self, restart: bool):
+        if not restart and os.path.exists(self.checkpoint_path):
+            with open(self.checkpoint_path, "r", encoding="utf-8") as f:
+                state = json.load(f)
+            if state.get("query") == self._query():
+                # Failed bands get another round of attempts
+                state["pending"] = state["pending"] + state.pop("failed", [])
+                state["failed"] = []
+                self.state = state
+                logger.info(f"Resuming backfill from {self.checkpoint_path}: {len(state['done'])} bands done, "
+                            f"{len(state['pending'])} pending, {state['listings']} listings so far")
+                return
+            logger.warning(f"Checkpoint {self.checkpoint_path} is for a different query; starting over")
+        self.state = {"query": self._query(), "pending": [list(self.range)], "done": [], "failed": [],
+                      "listings": 0, "requests": 0, "started_at": time.time()}
+
+    def _save_checkpoint(self):
+        """Flush the archive, then record the bands whose rows just hit disk"""
+        self.archive.flush()
+        for band, count, truncated in self.unflushed:
+            self.state["pending"].remove(list(band))
+            self.state["done"].append([band[0], band[1], count] + (["truncated"] if truncated else []))
+            self.state["listings"] += count
+        self.unflushed = []
+        self.state["requests"] += self.requests
+        self.requests = 0
+        self.state["updated_at"] = time.time()
+
+        directory = os.path.dirname(self.checkpoint_path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.state, f)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def _fetch(self, band: Band, page: int) -> Tuple[Optional[List[Dict]], Dict]:
+        with self.lock:
+            self.requests += 1
+        return self.scraper.fetch_page(band[0] / 100, band[1] / 100, self.brands, self.search_text,
+                                       page=page, per_page=self.per_page)
+
+    def _split(self, band: Band, total: Optional[int]) -> List[Band]:
+        """Cut a band into equal-width parts, more of them the further it is over the limit"""
+        parts = 2 if total is None else max(2, min(8, -(-total // self.limit) + 1))
+        low, high = band
+        parts = min(parts, high - low + 1)
+        width = (high - low + 1) / parts
+        edges = [low + round(width * i) for i in range(parts)] + [high + 1]
+        return [(edges[i], edges[i + 1] - 1) for i in range(parts)]
+
+    def _crawl_band(self, band: Band):
+        """
+        Page through one band. Returns ("split", sub-bands), ("done", listings,
+        truncated) or ("failed", None) when a request gave up.
+        """
+        can_split = band[1] > band[0]
+        listings, pagination = self._fetch(band, 1)
+        if listings is None:
+            return "failed", None
+        total = pagination.get("total_entries")
+        if total is not None and total > self.limit and can_split:
+            return "split", self._split(band, total)
+
+        items, seen_ids = [], set()
+        page, truncated = 1, False
+        while True:
+            for listing in listings:
+                # New listings shift later pages; skip the repeats that causes
+                if listing["id"] not in seen_ids:
+                    seen_ids.add(listing["id"])
+                    items.append(listing)
+            if len(listings) < self.per_page or (pagination.get("total_pages") or 0) and page >= pagination["total_pages"]:
+                break
+            if page >= self.max_pages:
+                # The deepest page is still full, so there is more than we can reach
+                if can_split:
+                    return "split", self._split(band, None)
+                truncated = True
+                break
+            page += 1
+            listings, pagination = self._fetch(band, page)
+            if listings is None:
+                return "failed", None
+        if truncated:
+            logger.warning(f"Band {band[0] / 100:.2f}-{band[1] / 100:.2f} holds more than {self.limit} "
+                           f"listings at a single price; kept the first {len(items)}")
+        return "done", items, truncated
+
+    def run(self, restart: bool = False) -> Dict:
+        self._load_checkpoint(restart)
+        queue = deque(tuple(band) for band in self.state["pending"])
+        attempts: Dict[Band, int] = {}
+        last_checkpoint = time.time()
+        started = time.time()
+
+        with ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="backfill") as pool:
+            running = {}
+            while queue or running:
+                while queue and len(running) < self.workers:
+                    band = queue.popleft()
+                    running[pool.submit(self._crawl_band, band)] = band
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    band = running.pop(future)
+                    try:
+                        outcome = future.result()
+                    except Exception as e:
+                        logger.error(f"Band {band} failed: {str(e)}")
+                        outcome = ("failed", None)
+
+                    if outcome[0] == "split":
+                        # Splits carry no data, so they can be recorded right away
+                        self.state["pending"].remove(list(band))
+                        self.state["pending"].extend(list(sub) for sub in outcome[1])
+                        queue.extend(outcome[1])
+                    elif outcome[0] == "done":
+                        self.archive.append(outcome[1])
+                        self.unflushed.append((band, len(outcome[1]), outcome[2]))
+                    else:
+                        attempts[band] = attempts.get(band, 0) + 1
+                        if attempts[band] < self.max_attempts:
+                            queue.append(band)
+                        else:
+                            logger.error(f"Giving up on band {band[0] / 100:.2f}-{band[1] / 100:.2f} for this run")
+                            self.state["pending"].remove(list(band))
+                            self.state["failed"].append(list(band))
+
+                if time.time() - last_checkpoint >= self.checkpoint_interval:
+                    self._save_checkpoint()
+                    last_checkpoint = time.time()
+                    logger.info(f"Backfill: {len(self.state['done'])} bands done, {len(self.state['pending'])} pending, "
+                                f"{self.state['listings']} listings, {self.state['requests']} requests")
+
+        self._save_checkpoint()
+        stats = {
+            "bands": len(self.state["done"]),
+            "failed_bands": len(self.state["failed"]),
+            "truncated_bands": sum(1 for band in self.state["done"] if len(band) > 3),
+            "listings": self.state["listings"],
+            "requests": self.state["requests"],
+            "duration": round(time.time() - started, 1),
+            "checkpoint": self.checkpoint_path,
+        }
+        logger.info(f"Backfill finished: {stats}")
+        return stats
+
+    def close(self):
+        """Record bands finished since the last checkpoint (closing the archive would write them anyway)"""
+        if self.state:
+            self._save_checkpoint()
+        self.archive.close()
+
+
+def default_checkpoint_path(domain: str, brands: List[str], search_text: str) -> str:
+    """One checkpoint per query, so backfills of different brands never collide"""
+    slug = re.sub(r"[^a-z0-9]+", "-", "-".join(sorted(brands) + [search_text]).lower()).strip("-") or "all"
+    return os.path.join(BACKFILL_DIR, f"{domain}-{slug}.json")
+
+
+def main():
+    from multi_domain_scraper import MultiDomainScraper
+    from vinted_domains import DEFAULT_DOMAIN
+
+    parser = argparse.ArgumentParser(description="Crawl every active listing of a query into the listing archive")
+    parser.add_argument("--brands", nargs="*", default=[])
+    parser.add_argument("--search", default="", help="Search text")
+    parser.add_argument("--domain", default=DEFAULT_DOMAIN)
+    parser.add_argument("--min-price", type=float, default=0.0, help="GBP")
+    parser.add_argument("--max-price", type=float, default=5000.0, help="GBP")
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--per-page", type=int, default=96)
+    parser.add_argument("--max-pages", type=int, default=10, help="Deepest page Vinted serves for one query")
+    parser.add_argument("--checkpoint", default=None, help=f"Progress file (default: under {BACKFILL_DIR})")
+    parser.add_argument("--restart", action="store_true", help="Ignore an existing checkpoint")
+    args = parser.parse_args()
+
+    if not args.brands and not args.search:
+        parser.error("give --brands and/or --search")
+
+    # Same egress setup as the dashboard: with VINTED_PROXIES every proxy adds its own budget
+    proxies = [p.strip() for p in os.environ.get("VINTED_PROXIES", "").split(",") if p.strip()]
+    scrapers = MultiDomainScraper([args.domain], proxies=proxies)
+    crawler = BackfillCrawler(scrapers.primary, args.brands, args.search, args.min_price, args.max_price,
+                              checkpoint_path=args.checkpoint, workers=args.workers,
+                              per_page=args.per_page, max_pages=args.max_pages)
+    try:
+        crawler.run(restart=args.restart)
+    except KeyboardInterrupt:
+        # close() checkpoints the finished bands; anything in flight is crawled again on resume
+        logger.info("Interrupted; rerun the same command to resume")
+    finally:
+        crawler.close()
+        scrapers.close()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
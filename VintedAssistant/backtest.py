@@ -0,0 +1,249 @@
+import argparse
+import csv
+import itertools
+import json
+import logging
+import multiprocessing
+import os
+import random
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Dict, Iterable, Iterator, List
+
+logger = logging.getLogger(__name__)
+
+NUMERIC_FIELDS = ("price", "original_price", "sold_price", "actual_profit", "year")
+
+# Set up once per worker process by _init_worker
+_worker = {}
+
+
+def _coerce(row: Dict) -> Dict:
+    for field in NUMERIC_FIELDS:
+        value = row.get(field)
+        if isinstance(value, str):
+            try:
+                row[field] = float(value) if value.strip() else None
+            except ValueError:
+                row[field] = None
+    return row
+
+
+def _iter_file(path: str) -> Iterator[Dict]:
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f) if path.endswith(".csv") else (json.loads(line) for line in f if line.strip())
+        yield from reader
+
+
+def _iter_parquet(root: str, outcomes: Dict[str, Dict], chunk_size: int) -> Iterator[Dict]:
+    """
+    Listings from a Parquet listing archive. The archive holds a snapshot per
+    scan, so each listing is taken once, as first seen, and labelled by id.
+    """
+    from listing_archive import iter_archive_batches
+
+    seen = set()
+    for batch in iter_archive_batches(batch_size=chunk_size, root=root):
+        for row in batch:
+            if row["id"] in seen:
+                continue
+            seen.add(row["id"])
+            row.update(outcomes.get(row["id"], {}))
+            yield row
+
+
+def load_outcomes(paths: Iterable[str]) -> Dict[str, Dict]:
+    """
+    Known outcomes (`sold_price` / `actual_profit`) by listing id, from CSV /
+    JSON-lines files, for labelling the Parquet archive
+    """
+    outcomes = {}
+    for path in paths:
+        for row in _iter_file(path):
+            row = _coerce(row)
+            outcomes[str(row["id"])] = {field: row[field] for field in ("sold_price", "actual_profit")
+                                        if row.get(field) is not None}
+    return outcomes
+
+
+def iter_archive(paths: Iterable[str], chunk_size: int = 5000,
+                 outcomes: Dict[str, Dict] = None) -> Iterator[List[Dict]]:
+    """
+    Stream archived listings in fixed-size chunks, so a month of data never has
+    to fit in memory at once. A path is a CSV / JSON-lines file or the root of
+    a Parquet listing archive, whose rows are labelled from `outcomes`.
+    """
+    chunk = []
+    for path in paths:
+        rows = _iter_parquet(path, outcomes or {}, chunk_size) if os.path.isdir(path) else _iter_file(path)
+        for row in rows:
+            chunk.append(_coerce(row))
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+    if chunk:
+        yield chunk
+
+
+def build_param_grid(thresholds: List[float], platform_fees: List[float], payment_fees: List[float],
+                     shipping_scales: List[float]) -> List[Dict]:
+    """
+    Every combination of the given settings as DealAnalyzer keyword arguments.
+    Shipping scales multiply the configured tiers.
+    """
+    from config_service import get_config_service
+
+    fees = get_config_service().get("fees")
+    grid = []
+    for threshold, platform_fee, payment_fee, scale in itertools.product(
+            thresholds, platform_fees, payment_fees, shipping_scales):
+        grid.append({
+            "profit_threshold": threshold,
+            "platform_fee_rate": platform_fee,
+            "payment_fee_rate": payment_fee,
+            "shipping_tiers": [(upper, round(cost * scale, 2)) for upper, cost in fees["shipping_tiers"]],
+            "football_shipping": round(fees["football_shipping"] * scale, 2),
+        })
+    return grid
+
+
+def _init_worker(param_sets: List[Dict], target_profit: float):
+    # Imported here so each spawned process builds its own analyzers and caches
+    from deal_analyzer import DealAnalyzer
+
+    # Per-listing mock pricing logs would drown everything else
+    logging.getLogger("ebay_scraper").setLevel(logging.WARNING)
+    _worker["reference"] = DealAnalyzer()
+    _worker["analyzers"] = [DealAnalyzer(**params) for params in param_sets]
+    _worker["target_profit"] = target_profit
+
+
+def _actual_profit(row: Dict, reference) -> float:
+    """Realized profit from the known outcome, costed with the default fee model"""
+    if row.get("actual_profit") is not None:
+        return row["actual_profit"]
+    price = row["price"]
+    return row["sold_price"] - price - reference._calculate_fees(price) - reference._estimate_shipping(price, row.get("category") or "")
+
+
+def _run_chunk(chunk_index: int, rows: List[Dict]) -> Dict:
+    """
+    Value a chunk once, then score it under every parameter set
+    """
+    # Mock eBay prices are random; seed per chunk so runs are repeatable
+    random.seed(chunk_index)
+    reference = _worker["reference"]
+    target_profit = _worker["target_profit"]
+
+    labelled = []
+    for row in rows:
+        # Untitled rows are never valued, so they would only count against recall
+        if row.get("title") and row.get("price") and (row.get("sold_price") or row.get("actual_profit") is not None):
+            row["_actual_profit"] = _actual_profit(row, reference)
+            labelled.append(row)
+
+    batch, values = reference.value_batch(labelled)
+    actual_deals = sum(1 for row in labelled if row["_actual_profit"] >= target_profit)
+
+    results = []
+    for analyzer in _worker["analyzers"]:
+        deals = analyzer.select_deals(batch, values)
+        true_positives = sum(1 for deal in deals if deal["_actual_profit"] >= target_profit)
+        results.append({
+            "predicted": len(deals),
+            "true_positives": true_positives,
+            "profit": sum(deal["_actual_profit"] for deal in deals),
+            "estimated_profit": sum(deal["estimated_profit"] for deal in deals),
+        })
+    return {"rows": len(rows), "labelled": len(labelled), "actual_deals": actual_deals, "results": results}
+
+
+def run_backtest(paths: List[str], param_sets: List[Dict], workers: int = None,
+                 chunk_size: int = 5000, target_profit: float = 5.0,
+                 outcomes: Dict[str, Dict] = None) -> List[Dict]:
+    """
+    Replay archived listings through DealAnalyzer under each parameter set.
+    Chunks are spread over a process pool with a bounded number in flight.
+    """
+    workers = workers or multiprocessing.cpu_count()
+    totals = {"rows": 0, "labelled": 0, "actual_deals": 0}
+    per_set = [{"predicted": 0, "true_positives": 0, "profit": 0.0, "estimated_profit": 0.0} for _ in param_sets]
+
+    def collect(future):
+        outcome = future.result()
+        for key in totals:
+            totals[key] += outcome[key]
+        for summary, result in zip(per_set, outcome["results"]):
+            for key in summary:
+                summary[key] += result[key]
+
+    started = time.time()
+    # Spawn keeps workers independent of the parent's sessions and works on Windows
+    with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context("spawn"),
+                             initializer=_init_worker, initargs=(param_sets, target_profit)) as pool:
+        pending = set()
+        for index, chunk in enumerate(iter_archive(paths, chunk_size, outcomes)):
+            # Only read ahead of the pool by a couple of chunks per worker
+            if len(pending) >= workers * 2:
+                done, pending = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    collect(future)
+            pending.add(pool.submit(_run_chunk, index, chunk))
+        for future in wait(pending).done:
+            collect(future)
+
+    logger.info(f"Backtested {totals['labelled']} of {totals['rows']} listings with known outcomes "
+                f"against {len(param_sets)} parameter sets in {time.time() - started:.1f}s")
+
+    report = []
+    for params, summary in zip(param_sets, per_set):
+        predicted, hits = summary["predicted"], summary["true_positives"]
+        report.append({
+            "profit_threshold": params["profit_threshold"],
+            "platform_fee_rate": params["platform_fee_rate"],
+            "payment_fee_rate": params["payment_fee_rate"],
+            "shipping_tiers": "/".join(f"{cost:.2f}" for _, cost in params["shipping_tiers"]),
+            "predicted": predicted,
+            "true_positives": hits,
+            "precision": round(hits / predicted, 3) if predicted else 0.0,
+            "recall": round(hits / totals["actual_deals"], 3) if totals["actual_deals"] else 0.0,
+            "profit": round(summary["profit"], 2),
+            "estimated_profit": round(summary["estimated_profit"], 2),
+        })
+    report.sort(key=lambda row: row["profit"], reverse=True)
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay archived listings through DealAnalyzer with many settings")
+    parser.add_argument("archive", nargs="+",
+                        help="CSV / JSON-lines files of listings with sold_price or actual_profit, "
+                             "or a Parquet listing archive directory")
+    parser.add_argument("--outcomes", nargs="*", default=[],
+                        help="CSV / JSON-lines files of id plus sold_price or actual_profit, to label a Parquet archive")
+    parser.add_argument("--thresholds", nargs="+", type=float, default=[5.0, 10.0, 20.0])
+    parser.add_argument("--platform-fees", nargs="+", type=float, default=[0.12])
+    parser.add_argument("--payment-fees", nargs="+", type=float, default=[0.03])
+    parser.add_argument("--shipping-scales", nargs="+", type=float, default=[1.0],
+                        help="Multipliers applied to the configured shipping tiers")
+    parser.add_argument("--target-profit", type=float, default=5.0,
+                        help="Realized profit for a listing to count as a true deal")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--out", default=None, help="Write the full report to this CSV")
+    args = parser.parse_args()
+
+    param_sets = build_param_grid(args.thresholds, args.platform_fees, args.payment_fees, args.shipping_scales)
+    report = run_backtest(args.archive, param_sets, workers=args.workers, chunk_size=args.chunk_size,
+                          target_profit=args.target_profit, outcomes=load_outcomes(args.outcomes))
+
+    import pandas as pd
+    df = pd.DataFrame(report)
+    logger.info(f"Top {min(20, len(df))} of {len(df)} parameter sets:\n{df.head(20).to_string(index=False)}")
+    if args.out:
+        df.to_csv(args.out, index=False)
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,202 @@
+import json
+import logging
+import os
+import re
+import threading
+import time
+import unicodedata
+from typing import Dict, List, Optional, Tuple
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+# Bundled, versioned brand catalog shipped with the app
+BRANDS_DATA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "brands.json")
+# Local cache written by refresh(); shared by the scraper, analyzer and UI, wherever they're started from
+BRANDS_CACHE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "cache", "brands.json")
+BRAND_SEARCH_URL = "https://www.vinted.co.uk/api/v2/brands"
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_brand(name: str) -> str:
+    """
+    Normalize a brand name for matching: strip accents, case and punctuation
+    ("Stüssy" -> "stussy", "Off-White" -> "offwhite", "Arc'teryx" -> "arcteryx")
+    """
+    if not name:
+        return ""
+    name = unicodedata.normalize("NFKD", name)
+    name = "".join(ch for ch in name if not unicodedata.combining(ch))
+    name = name.lower().replace("&", "and")
+    return _NON_ALNUM.sub("", name)
+
+
+class BrandRegistry:
+    def __init__(self, data: Dict):
+        self.version = int(data.get("version", 0))
+        self.source = data.get("source", "bundled")
+        self.brands = data.get("brands", [])
+
+        # Forward and reverse indexes, built once
+        self._by_name: Dict[str, Dict] = {}
+        self._by_id: Dict[str, Dict] = {}
+        self._by_key: Dict[str, Dict] = {}
+        self._build_indexes()
+
+    @classmethod
+    def from_file(cls, path: str) -> "BrandRegistry":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls(json.load(f))
+
+    def _build_indexes(self):
+        """
+        Build name/id/alias indexes and reject colliding entries
+        """
+        errors = []
+        for brand in self.brands:
+            name = brand["name"]
+            brand_id = str(brand["id"])
+            brand["id"] = brand_id
+
+            if name in self._by_name:
+                errors.append(f"duplicate brand name '{name}'")
+            self._by_name[name] = brand
+
+            if brand_id in self._by_id:
+                errors.append(f"brand id {brand_id} used by both '{self._by_id[brand_id]['name']}' and '{name}'")
+            self._by_id[brand_id] = brand
+
+            for label in [name] + list(brand.get("aliases", [])):
+                key = normalize_brand(label)
+                owner = self._by_key.get(key)
+                if owner is not None and owner is not brand:
+                    errors.append(f"'{label}' of '{name}' collides with '{owner['name']}'")
+                self._by_key[key] = brand
+
+        if errors:
+            raise ValueError("Invalid brand catalog: " + "; ".join(errors))
+
+    def names(self) -> List[str]:
+        """Canonical brand names in catalog order"""
+        return [brand["name"] for brand in self.brands]
+
+    def get(self, name: str) -> Optional[Dict]:
+        return self._by_name.get(name) or self._by_key.get(normalize_brand(name))
+
+    def id_for(self, name: str) -> Optional[str]:
+        brand = self.get(name)
+        return brand["id"] if brand else None
+
+    def name_for_id(self, brand_id) -> Optional[str]:
+        brand = self._by_id.get(str(brand_id))
+        return brand["name"] if brand else None
+
+    def ids_for(self, names: List[str]) -> List[str]:
+        """
+        Convert brand names to Vinted brand IDs, skipping unknown brands
+        """
+        ids = []
+        for name in names:
+            brand_id = self.id_for(name)
+            if brand_id and brand_id not in ids:
+                ids.append(brand_id)
+        return ids
+
+    def canonical(self, brand_title: str, default: str = "Other") -> str:
+        """
+        Map a raw Vinted `brand_title` (any case, alias or spelling) to its canonical name
+        """
+        brand = self._by_key.get(normalize_brand(brand_title))
+        return brand["name"] if brand else (brand_title or default)
+
+    def price_range(self, name: str) -> Optional[Tuple[float, float]]:
+        brand = self.get(name)
+        if not brand or not brand.get("price_range"):
+            return None
+        low, high = brand["price_range"]
+        return float(low), float(high)
+
+    def to_dict(self) -> Dict:
+        return {"version": self.version, "source": self.source, "brands": self.brands}
+
+    def save(self, path: str):
+        """Write the catalog atomically so concurrent readers never see a partial file"""
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp_path, path)
+
+    def refresh(self, session: requests.Session, headers: Dict = None,
+                cache_path: str = BRANDS_CACHE_PATH, delay: float = 1.0) -> "BrandRegistry":
+        """
+        Look every known brand up on Vinted's brand endpoint and write the corrected
+        catalog to the local cache. Brands that can't be resolved keep their current id.
+        """
+        refreshed = []
+        for brand in self.brands:
+            updated = dict(brand)
+            try:
+                response = session.get(
+                    BRAND_SEARCH_URL,
+                    headers=headers,
+                    params={"keyword": brand["name"], "per_page": "20"},
+                    timeout=10
+                )
+                response.raise_for_status()
+                wanted = {normalize_brand(label) for label in [brand["name"]] + brand.get("aliases", [])}
+                for candidate in response.json().get("brands", []):
+                    if normalize_brand(candidate.get("title", "")) in wanted:
+                        updated["id"] = str(candidate["id"])
+                        break
+            except (requests.exceptions.RequestException, ValueError) as e:
+                logger.warning(f"Could not refresh brand '{brand['name']}': {str(e)}")
+            refreshed.append(updated)
+            time.sleep(delay)
+
+        # Validate before writing so a bad response never replaces a good cache
+        registry = BrandRegistry({"version": self.version + 1, "source": "vinted", "brands": refreshed})
+        registry.save(cache_path)
+        logger.info(f"Brand catalog refreshed to version {registry.version} ({cache_path})")
+        set_brand_registry(registry)
+        return registry
+
+
+_registry: Optional[BrandRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def load_brand_registry(data_path: str = BRANDS_DATA_PATH,
+                        cache_path: str = BRANDS_CACHE_PATH) -> BrandRegistry:
+    """
+    Load the newest valid catalog, preferring the refreshed cache over the bundled file
+    """
+    registry = BrandRegistry.from_file(data_path)
+    if os.path.exists(cache_path):
+        try:
+            cached = BrandRegistry.from_file(cache_path)
+            if cached.version >= registry.version:
+                registry = cached
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring invalid brand cache {cache_path}: {str(e)}")
+    return registry
+
+
+def get_brand_registry() -> BrandRegistry:
+    """Process-wide registry, loaded once on first use"""
+    global _registry
+    if _registry is None:
+        with _registry_lock:
+            if _registry is None:
+                _registry = load_brand_registry()
+    return _registry
+
+
+def set_brand_registry(registry: BrandRegistry):
+    global _registry
+    with _registry_lock:
+        _registry = registry
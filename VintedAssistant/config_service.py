@@ -0,0 +1,166 @@
+import json
+import logging
+import os
+import threading
+import time
+import weakref
+from typing import Callable, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# Bundled defaults; VINTED_CONFIG points at a deployment's own copy
+CONFIG_PATH = os.environ.get("VINTED_CONFIG") or os.path.join(os.path.dirname(os.path.abspath(__file__)), "config.json")
+
+SECTIONS = ("monitor", "fees", "condition_modifiers", "football_shirt_modifiers", "model_premiums", "ebay")
+
+
+def validate_config(data: Dict):
+    """Raise ValueError describing everything wrong with a config document"""
+    errors = []
+    if not isinstance(data.get("version"), int):
+        errors.append("'version' must be an integer")
+    for section in SECTIONS:
+        if section not in data:
+            errors.append(f"missing section '{section}'")
+    if errors:
+        raise ValueError("Invalid config: " + "; ".join(errors))
+
+    fees = data["fees"]
+    for key in ("platform_fee_rate", "payment_fee_rate"):
+        if not isinstance(fees.get(key), (int, float)) or not 0 <= fees[key] < 1:
+            errors.append(f"fees.{key} must be a rate between 0 and 1")
+    tiers = fees.get("shipping_tiers") or []
+    if not tiers or tiers[-1][0] is not None:
+        errors.append("fees.shipping_tiers must end with an unbounded [null, cost] tier")
+    bounds = [upper for upper, _ in tiers[:-1]]
+    if bounds != sorted(bounds) or None in bounds:
+        errors.append("fees.shipping_tiers upper bounds must increase")
+    if not isinstance(fees.get("football_shipping"), (int, float)):
+        errors.append("fees.football_shipping must be a number")
+    for section in ("condition_modifiers", "football_shirt_modifiers"):
+        if any(not isinstance(value, (int, float)) or value <= 0 for value in data[section].values()):
+            errors.append(f"{section} values must be positive numbers")
+    for premium in data["model_premiums"]:
+        if not premium.get("tokens") or not isinstance(premium.get("multiplier"), (int, float)):
+            errors.append(f"model premium {premium} needs tokens and a multiplier")
+    monitor = data["monitor"]
+    if monitor.get("min_price", 0) > monitor.get("max_price", float("inf")):
+        errors.append("monitor.min_price is above monitor.max_price")
+    if errors:
+        raise ValueError("Invalid config: " + "; ".join(errors))
+
+
+def diff_config(old: Dict, new: Dict, prefix: str = "") -> List[str]:
+    """Dotted paths of every value that was added, removed or changed"""
+    changed = []
+    for key in sorted(set(old) | set(new), key=str):
+        path = f"{prefix}{key}"
+        before, after = old.get(key), new.get(key)
+        if isinstance(before, dict) and isinstance(after, dict):
+            changed.extend(diff_config(before, after, path + "."))
+        elif before != after:
+            changed.append(path)
+    return changed
+
+
+class ConfigService:
+    """
+    Serves the versioned config file and applies edits without a restart.
+    The file is checked at most every `check_interval` seconds; a new version
+    is validated, diffed against the running one and handed to subscribers,
+    which update their own tables in place so sessions, caches and schedules
+    stay as they are. An invalid file is logged and the running config kept.
+    Edits only go live once `version` is raised, so a half-finished edit is
+    never picked up.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, check_interval: float = 5):
+        self.path = path
+        self.check_interval = check_interval
+        self.lock = threading.RLock()
+        self.loaded_mtime = None
+        self.last_check = 0.0
+        self.subscribers: List = []
+        with open(path, "r", encoding="utf-8") as f:
+            self.config = json.load(f)
+        validate_config(self.config)
+        self.loaded_mtime = os.path.getmtime(path)
+
+    @property
+    def version(self) -> int:
+        return self.config["version"]
+
+    def current(self) -> Dict:
+        """The live config, reloaded if the file changed since the last check"""
+        now = time.time()
+        if now - self.last_check >= self.check_interval:
+            with self.lock:
+                self.last_check = now
+                self._reload_if_changed()
+        return self.config
+
+    def get(self, section: str) -> Dict:
+        return self.current()[section]
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.path)
+        except OSError:
+            return
+        if mtime == self.loaded_mtime:
+            return
+        self.loaded_mtime = mtime
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            validate_config(data)
+        except (OSError, ValueError, KeyError, TypeError, AttributeError) as e:
+            logger.error(f"Keeping config v{self.version}: {str(e)}")
+            return
+        if data["version"] <= self.version:
+            if data != self.config:
+                logger.warning(f"Config file changed but version is still {data['version']}; "
+                               f"raise it above {self.version} to apply the edit")
+            return
+        self.apply(data)
+
+    def apply(self, data: Dict) -> List[str]:
+        """Swap in a new config document and notify subscribers of what changed"""
+        with self.lock:
+            changed = diff_config(self.config, data)
+            old_version, self.config = self.version, data
+            subscribers = [ref() for ref in self.subscribers]
+            self.subscribers = [ref for ref, callback in zip(self.subscribers, subscribers) if callback is not None]
+        logger.info(f"Config v{old_version} -> v{data['version']}: {', '.join(changed) or 'no changes'}")
+        for callback in subscribers:
+            if callback is None:
+                continue
+            try:
+                callback(data, changed)
+            except Exception as e:
+                logger.error(f"Applying config v{data['version']} failed in {callback}: {str(e)}")
+        return changed
+
+    def subscribe(self, callback: Callable[[Dict, List[str]], None]):
+        """
+        Call `callback(config, changed_paths)` after each reload. Bound methods
+        are held weakly, so a component that goes away (a closed dashboard
+        session, say) unsubscribes itself.
+        """
+        ref = weakref.WeakMethod(callback) if hasattr(callback, "__self__") else (lambda: callback)
+        with self.lock:
+            self.subscribers.append(ref)
+
+
+_service: Optional[ConfigService] = None
+_service_lock = threading.Lock()
+
+
+def get_config_service() -> ConfigService:
+    """Process-wide config service, loaded once on first use"""
+    global _service
+    if _service is None:
+        with _service_lock:
+            if _service is None:
+                _service = ConfigService()
+    return _service
@@ -1,55 +1,63 @@
 import logging
 import re
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import random
 from ebay_scraper import EbayScraper  # Add missing import
 from datetime import datetime  # Needed for EbayScraper
+from brand_registry import BrandRegistry, get_brand_registry
+from title_attributes import FOOTBALL_TEAMS, get_title_extractor
+from rule_engine import RuleSet
+from valuation import HeuristicModel, get_valuation_service
+from config_service import ConfigService, get_config_service
+import numpy as np
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class DealAnalyzer:
-    def __init__(self, profit_threshold: float = 5.0):
+    def __init__(self, profit_threshold: float = 5.0, platform_fee_rate: float = None,
+                 payment_fee_rate: float = None, shipping_tiers: List[Tuple[Optional[float], float]] = None,
+                 football_shipping: float = None, config: ConfigService = None):
         self.profit_threshold = profit_threshold
         #self.market_values = self._load_market_values() #removed as not used anymore
-        self.ebay_scraper = EbayScraper() #Added
-
-        # Football shirt value modifiers
-        self.football_shirt_modifiers = {
-            # Premier League
-            "Manchester United": 1.2,
-            "Liverpool": 1.15,
-            "Arsenal": 1.1,
-            "Chelsea": 1.1,
-            "Manchester City": 1.05,
-
-            # European Giants
-            "Barcelona": 1.25,
-            "Real Madrid": 1.2,
-            "Bayern Munich": 1.15,
-            "Juventus": 1.1,
-            "PSG": 1.05,
-
-            # Special seasons
-            "treble": 1.5,
-            "champions": 1.3,
-            "invincibles": 1.8,
-            "final": 1.4,
-
-            # Special editions
-            "limited edition": 1.6,
-            "special": 1.4,
-            "collectors": 1.5,
-
-            # Players
-            "messi": 1.5,
-            "ronaldo": 1.5,
-            "beckham": 1.4,
-            "gerrard": 1.3,
-            "henry": 1.3,
-            "cantona": 1.4,
-            "zidane": 1.3
+        self.ebay_scraper = EbayScraper(config) #Added
+        self.extractor = get_title_extractor()
+        # Trained model when one is available, these heuristics otherwise
+        self.valuation = get_valuation_service()
+        self.heuristic_model = HeuristicModel(self._heuristic_value)
+
+        # Fees, shipping and value modifiers come from the config file; explicit
+        # arguments (a backtest's parameter grid) pin their value across reloads
+        self.overrides = {
+            key: value for key, value in {
+                "platform_fee_rate": platform_fee_rate,
+                "payment_fee_rate": payment_fee_rate,
+                "shipping_tiers": shipping_tiers,
+                "football_shipping": football_shipping,
+            }.items() if value is not None
         }
+        self.config = config or get_config_service()
+        self.apply_config(self.config.current())
+        self.config.subscribe(self.apply_config)
+
+    @property
+    def brands(self) -> BrandRegistry:
+        # Looked up on every use, so a catalog refresh reaches every instance
+        return get_brand_registry()
+
+    def apply_config(self, config: Dict, changed: List[str] = None):
+        """Pick up a new config version in place; caches and state are untouched"""
+        fees = {**config["fees"], **self.overrides}
+        self.platform_fee_rate = fees["platform_fee_rate"]
+        self.payment_fee_rate = fees["payment_fee_rate"]
+        # (upper price bound, cost) pairs; the last tier has no upper bound
+        self.shipping_tiers = [tuple(tier) for tier in fees["shipping_tiers"]]
+        self.football_shipping = fees["football_shipping"]
+
+        # Value modifiers for the condition parsed from the title
+        self.condition_modifiers = dict(config["condition_modifiers"])
+        # Football shirt value modifiers: teams, special seasons and editions, players
+        self.football_shirt_modifiers = dict(config["football_shirt_modifiers"])
 
     #def _load_market_values(self) -> Dict[str, float]: #removed as not used anymore
      #   """
@@ -99,33 +107,60 @@ class DealAnalyzer:
             #"Alcatraz": 130.0
         #}
 
-    def find_deals(self, listings: List[Dict]) -> List[Dict]:
+    def find_deals(self, listings: List[Dict], rules: RuleSet = None) -> List[Dict]:
         """
-        Analyze listings to find potential deals based on market values
+        Analyze listings to find potential deals based on market values.
+        With rules, a deal must also satisfy at least one rule; listings no rule
+        can match are dropped before the (expensive) valuation step.
         """
-        potential_deals = []
+        batch, estimated_values = self.value_batch(listings, rules)
+        return self.select_deals(batch, estimated_values, rules)
 
-        for listing in listings:
-            # Extract brand and title for market comparison
-            brand = listing.get('brand', 'Other')
-            title = listing.get('title', '')
-            price = listing.get('price', 0.0)
-            category = listing.get('category', '')
+    def value_batch(self, listings: List[Dict], rules: RuleSet = None):
+        """
+        Prefilter a batch and value what's left in one call (vectorized for a
+        trained model). Returns the (listing, attributes, candidate rules)
+        triples alongside their estimated values.
+        """
+        # Cheap mtime check; a newer config version is applied before this batch
+        self.config.current()
+        # Parse every title once up front; both valuation paths use the result
+        batch_attributes = self.extractor.extract_batch([listing.get('title') or '' for listing in listings])
+        candidate_rules = rules.prefilter(listings, batch_attributes) if rules else [None] * len(listings)
+
+        to_value = []
+        for listing, attributes, candidates in zip(listings, batch_attributes, candidate_rules):
+            if rules and not candidates:
+                continue
 
             # Skip if we don't have enough info
-            if not title or price <= 0:
+            if not listing.get('title', '') or listing.get('price', 0.0) <= 0:
                 continue
-
-            # Different analysis for football shirts vs regular items
-            if category == 'football_shirt':
-                estimated_value = self._estimate_football_shirt_value(listing)
-            else:
-                # Get estimated market value from eBay
-                estimated_value = self.ebay_scraper.get_average_sold_price(brand, title)
-
+            to_value.append((listing, attributes, candidates))
+
+        # Value the whole batch in one call (vectorized for a trained model)
+        estimated_values = self.valuation.predict(
+            [listing for listing, _, _ in to_value],
+            [attributes for _, attributes, _ in to_value],
+            fallback=self.heuristic_model
+        )
+        return to_value, estimated_values
+
+    def select_deals(self, batch: List[Tuple[Dict, Dict, Optional[list]]], estimated_values,
+                     rules: RuleSet = None) -> List[Dict]:
+        """
+        Turn valued (listing, attributes, candidate rules) triples into deals using
+        this analyzer's fees, shipping and threshold. Split out so a backtest can
+        value a batch once and try many cost settings on it.
+        """
+        potential_deals = []
+        for (listing, attributes, candidates), estimated_value in zip(batch, estimated_values):
             # Skip if we couldn't get an estimated value
-            if not estimated_value:
+            if not np.isfinite(estimated_value) or estimated_value <= 0:
                 continue
+            estimated_value = float(estimated_value)
+            price = listing.get('price', 0.0)
+            category = listing.get('category') or attributes['category'] or ''
 
             # Calculate potential profit (accounting for fees)
             fees = self._calculate_fees(price)
@@ -144,20 +179,50 @@ class DealAnalyzer:
                 deal['estimated_value'] = round(estimated_value, 2)
                 deal['estimated_profit'] = round(estimated_profit, 2)
                 deal['profit_percentage'] = round(profit_percentage, 1)
+                if rules:
+                    matched = rules.match(deal, candidates)
+                    if not matched:
+                        continue
+                    deal['matched_rules'] = ", ".join(matched)
                 potential_deals.append(deal)
 
         # Sort by profit potential (highest first)
         potential_deals.sort(key=lambda x: x.get('estimated_profit', 0), reverse=True)
         return potential_deals
 
-    def _estimate_football_shirt_value(self, listing: Dict) -> float:
+    def _heuristic_value(self, listing: Dict, attributes: Dict) -> float:
+        """
+        Hand-tuned valuation, kept as the fallback model
+        """
+        category = listing.get('category') or attributes['category'] or ''
+        # Different analysis for football shirts vs regular items
+        if category == 'football_shirt':
+            return self._estimate_football_shirt_value(listing, attributes)
+        # Get estimated market value from eBay
+        brand = self.brands.canonical(listing.get('brand'))
+        return self.ebay_scraper.get_average_sold_price(brand, listing.get('title', ''), attributes)
+
+    def find_price_drops(self, events: List[Dict], rules: RuleSet = None) -> List[Dict]:
+        """
+        Value known items that got cheaper or were relisted (from ItemStateStore.observe).
+        Deals keep their `event` and `previous_price` tags and record the size of the drop.
+        """
+        deals = self.find_deals(events, rules=rules)
+        for deal in deals:
+            if deal.get('previous_price', 0) > deal['price']:
+                deal['price_drop'] = round(deal['previous_price'] - deal['price'], 2)
+        return deals
+
+    def _estimate_football_shirt_value(self, listing: Dict, attributes: Dict = None) -> float:
         """
         Special analysis for football shirts - enhanced to improve profitability
         """
+        attributes = attributes or self.extractor.extract(listing.get('title') or '')
         title = listing.get('title', '').lower()
-        team = listing.get('team', '')
+        # Search-time tags win; otherwise fall back to what the title says
+        team = listing.get('team') or attributes['team'] or ''
         price = listing.get('price', 0.0)
-        year = listing.get('year', 0)
+        year = listing.get('year') or attributes['year'] or 0
 
         # Base value starts with current price plus a higher margin
         base_value = price * 1.6  # 60% markup as starting point (increased from 30%)
@@ -181,21 +246,14 @@ class DealAnalyzer:
             year_modifier = 1.2  # Default (increased from 1.0)
 
         # Special characteristics modifiers
+        # Team names are already covered by the team modifier above
         special_modifier = 1.0
         for key, modifier in self.football_shirt_modifiers.items():
-            if key.lower() in title.lower() and key.lower() not in ["manchester united", "liverpool", "arsenal", "chelsea"]:
+            if key not in FOOTBALL_TEAMS and key.lower() in title:
                 special_modifier *= modifier
 
         # Condition modifier
-        condition_modifier = 1.0
-        if "new" in title or "brand new" in title or "with tags" in title:
-            condition_modifier = 1.3
-        elif "excellent" in title or "like new" in title:
-            condition_modifier = 1.2
-        elif "good" in title:
-            condition_modifier = 1.1
-        elif "poor" in title or "damaged" in title or "stained" in title:
-            condition_modifier = 0.7
+        condition_modifier = self.condition_modifiers.get(attributes['condition'], 1.0)
 
         # Calculate final estimated value
         estimated_value = base_value * team_modifier * year_modifier * special_modifier * condition_modifier
@@ -216,8 +274,8 @@ class DealAnalyzer:
         """
         # Simplified fee structure (example)
         # Typically platforms charge 10-15% plus payment processing
-        platform_fee = price * 0.12  # 12% platform fee
-        payment_fee = price * 0.03  # 3% payment processing fee
+        platform_fee = price * self.platform_fee_rate  # 12% platform fee by default
+        payment_fee = price * self.payment_fee_rate  # 3% payment processing fee by default
         return platform_fee + payment_fee
 
     def _estimate_shipping(self, price: float, category: str = '') -> float:
@@ -226,12 +284,10 @@ class DealAnalyzer:
         """
         # Football shirts typically cost less to ship
         if category == 'football_shirt':
-            return 3.95  # Standard shipping for clothing
+            return self.football_shipping  # Standard shipping for clothing
 
-        # Basic shipping estimate for other items
-        if price < 20:
-            return 3.50  # Small items
-        elif price < 50:
-            return 4.95  # Medium items
-        else:
-            return 6.50  # Larger/more valuable items
\ No newline at end of file
+        # Basic shipping estimate for other items: small, medium, then larger/more valuable
+        for upper_price, cost in self.shipping_tiers:
+            if upper_price is None or price < upper_price:
+                return cost
+        return self.shipping_tiers[-1][1]
\ No newline at end of file
@@ -0,0 +1,182 @@
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger(__name__)
+
+DEAL_STORE_PATH = os.path.join("cache", "deals.db")
+
+# Deal fields with their own column; everything else lives in the JSON blob
+DEAL_COLUMNS = ["title", "brand", "size", "domain", "category", "price", "estimated_value",
+                "estimated_profit", "profit_percentage", "url", "photo", "event", "matched_rules"]
+
+# Orderings the browser offers; each one is backed by an index ending in seq
+SORT_COLUMNS = ("found_at", "profit_percentage", "estimated_profit", "price")
+
+INDEXES = {
+    "deals_found_at": "found_at, seq",
+    "deals_profit_pct": "profit_percentage, seq",
+    "deals_profit": "estimated_profit, seq",
+    "deals_price": "price, seq",
+    "deals_brand": "brand, found_at, seq",
+    "deals_size": "size, found_at, seq",
+}
+
+
+class DealStore:
+    """
+    Every deal found, in one SQLite file shared by the dashboard and the sharded
+    monitor. `seq` increases with each write (a re-found deal is moved to the
+    end), so the highest seq doubles as a version readers can poll cheaply and
+    `since(version)` returns exactly the rows they haven't shown yet.
+    """
+
+    def __init__(self, path: str = DEAL_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS deals ("
+            " seq INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " listing_id TEXT NOT NULL UNIQUE,"
+            " found_at REAL NOT NULL,"
+            " title TEXT, brand TEXT, size TEXT, domain TEXT, category TEXT,"
+            " price REAL, estimated_value REAL, estimated_profit REAL, profit_percentage REAL,"
+            " url TEXT, photo TEXT, event TEXT, matched_rules TEXT,"
+            " data TEXT NOT NULL)"
+        )
+        for name, columns in INDEXES.items():
+            self.conn.execute(f"CREATE INDEX IF NOT EXISTS {name} ON deals ({columns})")
+
+    def add(self, deals: List[Dict]) -> int:
+        """Store a batch of deals and return the new version"""
+        if not deals:
+            return self.version()
+        now = time.time()
+        rows = [
+            (str(deal.get("id")), now) + tuple(deal.get(column) for column in DEAL_COLUMNS)
+            + (json.dumps(deal, default=str),)
+            for deal in deals
+        ]
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                # REPLACE deletes the old row, so a price drop on a known deal gets a new seq
+                self.conn.executemany(
+                    f"INSERT OR REPLACE INTO deals (listing_id, found_at, {', '.join(DEAL_COLUMNS)}, data) "
+                    f"VALUES ({', '.join('?' * (len(DEAL_COLUMNS) + 3))})", rows
+                )
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return self.version()
+
+    def version(self) -> int:
+        """Highest seq written so far; an index lookup, cheap enough to poll"""
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(seq) FROM deals").fetchone()
+        return row[0] or 0
+
+    def since(self, version: int, limit: int = 500) -> List[Dict]:
+        """Deals written after `version`, newest first"""
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT seq, found_at, data FROM deals WHERE seq > ? ORDER BY seq DESC LIMIT ?", (version, limit)
+            ).fetchall()
+        return [self._decode(row) for row in rows]
+
+    def recent(self, limit: int = 30) -> List[Dict]:
+        return self.since(0, limit)
+
+    def page(self, sort: str = "found_at", descending: bool = True, after: Optional[Tuple] = None,
+             limit: int = 50, brands: Sequence[str] = None, sizes: Sequence[str] = None,
+             min_profit_pct: float = None, start: float = None, end: float = None) -> Tuple[List[Dict], Optional[Tuple]]:
+        """
+        One page of deals matching the filters, ordered by `sort` then seq.
+        Keyset pagination: `after` is the (sort value, seq) cursor returned
+        with the previous page, so every page is an index range scan of
+        `limit` rows no matter how deep the user pages. Only the table columns
+        are read, never the JSON blob. Returns the rows and the next cursor,
+        which is None on the last page.
+        """
+        if sort not in SORT_COLUMNS:
+            raise ValueError(f"Cannot sort deals by {sort!r}")
+        clauses, params = [f"{sort} IS NOT NULL"], []
+        if brands:
+            clauses.append(f"brand IN ({', '.join('?' * len(brands))})")
+            params.extend(brands)
+        if sizes:
+            clauses.append(f"size IN ({', '.join('?' * len(sizes))})")
+            params.extend(str(size) for size in sizes)
+        if min_profit_pct is not None:
+            clauses.append("profit_percentage >= ?")
+            params.append(min_profit_pct)
+        if start is not None:
+            clauses.append("found_at >= ?")
+            params.append(start)
+        if end is not None:
+            clauses.append("found_at < ?")
+            params.append(end)
+        if after is not None:
+            # Row-value comparison keeps ties on the sort value in seq order
+            clauses.append(f"({sort}, seq) {'<' if descending else '>'} (?, ?)")
+            params.extend(after)
+
+        direction = "DESC" if descending else "ASC"
+        columns = ["seq", "found_at", "listing_id"] + DEAL_COLUMNS
+        query = (f"SELECT {', '.join(columns)} FROM deals WHERE {' AND '.join(clauses)} "
+                 f"ORDER BY {sort} {direction}, seq {direction} LIMIT ?")
+        # One extra row tells us whether there is a next page without a COUNT(*)
+        with self.lock:
+            rows = self.conn.execute(query, params + [limit + 1]).fetchall()
+
+        deals = [dict(zip(columns, row)) for row in rows[:limit]]
+        for deal in deals:
+            deal["id"] = deal.pop("listing_id")
+        cursor = (deals[-1][sort], deals[-1]["seq"]) if len(rows) > limit else None
+        return deals, cursor
+
+    def distinct(self, column: str) -> List[str]:
+        """Values of an indexed column for filter pickers (brand or size)"""
+        if column not in ("brand", "size"):
+            raise ValueError(f"No index on {column!r}")
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT DISTINCT {column} FROM deals WHERE {column} IS NOT NULL ORDER BY {column}"
+            ).fetchall()
+        return [row[0] for row in rows]
+
+    @staticmethod
+    def _decode(row) -> Dict:
+        deal = json.loads(row[2])
+        deal["seq"] = row[0]
+        deal["found_at"] = row[1]
+        return deal
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM deals").fetchone()[0]
+
+    def import_csv(self, path: str) -> int:
+        """One-off import of the deals.csv the dashboard used to keep"""
+        import pandas as pd
+
+        deals = pd.read_csv(path).to_dict(orient="records")
+        deals = [{key: value for key, value in deal.items() if value == value} for deal in deals]  # drop NaN
+        self.add(deals)
+        logger.info(f"Imported {len(deals)} deals from {path}")
+        return len(deals)
+
+    def close(self):
+        self.conn.close()
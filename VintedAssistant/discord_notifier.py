@@ -20,8 +20,16 @@ class DiscordNotifier:
         if current_time - self.last_notification_time < self.rate_limit_delay:
             time.sleep(self.rate_limit_delay)
 
+        titles = {
+            "price_drop": "📉 Price Drop on a Vinted Item!",
+            "relisted": "🔁 Vinted Item Back on Sale!",
+        }
+        price_text = f"£{deal['price']:.2f}"
+        if deal.get('previous_price', 0) > deal['price']:
+            price_text = f"~~£{deal['previous_price']:.2f}~~ {price_text}"
+
         embed = {
-            "title": "🔥 New Vinted Deal Found!",
+            "title": titles.get(deal.get('event'), "🔥 New Vinted Deal Found!"),
             "color": 0x00ff00,
             "fields": [
                 {
@@ -31,7 +39,7 @@ class DiscordNotifier:
                 },
                 {
                     "name": "Price",
-                    "value": f"£{deal['price']:.2f}",
+                    "value": price_text,
                     "inline": True
                 },
                 {
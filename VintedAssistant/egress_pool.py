@@ -0,0 +1,184 @@
+import logging
+import os
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+import requests
+
+from rate_limiter import RateLimiter
+
+logger = logging.getLogger(__name__)
+
+
+class EgressUnavailable(RuntimeError):
+    """Raised when every egress stays quarantined for longer than the caller will wait"""
+
+
+class Egress:
+    """
+    One outbound route (a proxy, or the direct connection when `proxy` is None)
+    with its own session, cookie jar, user agent and request budget
+    """
+
+    def __init__(self, name: str, proxy: Optional[str], user_agent: str,
+                 min_request_interval: float = 1.0):
+        self.name = name
+        self.proxy = proxy
+        self.user_agent = user_agent
+        self.session = requests.Session()
+        if proxy:
+            self.session.proxies = {"http": proxy, "https": proxy}
+        self.rate_limiter = RateLimiter.from_interval(min_request_interval)
+
+        # Health counters
+        self.requests = 0
+        self.successes = 0
+        self.captchas = 0
+        self.failures = 0
+        self.consecutive_failures = 0
+        self.latency = None  # Exponentially weighted moving average, seconds
+        self.quarantined_until = 0.0
+        self.quarantine_count = 0
+        self.last_used = 0.0
+
+    def success_rate(self) -> float:
+        # Laplace smoothing so a fresh egress starts optimistic but not perfect
+        return (self.successes + 1) / (self.requests + 2)
+
+    def captcha_rate(self) -> float:
+        return self.captchas / self.requests if self.requests else 0.0
+
+    def health_score(self) -> float:
+        """
+        Higher is healthier: reliable, rarely challenged and fast
+        """
+        latency_penalty = 1.0 + (self.latency or 1.0)
+        return self.success_rate() * (1.0 - self.captcha_rate()) / latency_penalty
+
+    def stats(self) -> Dict:
+        return {
+            "name": self.name,
+            "requests": self.requests,
+            "success_rate": round(self.success_rate(), 3),
+            "captcha_rate": round(self.captcha_rate(), 3),
+            "latency": round(self.latency, 3) if self.latency is not None else None,
+            "score": round(self.health_score(), 4),
+            "quarantined_until": self.quarantined_until,
+        }
+
+
+class EgressPool:
+    """
+    Routes each request through the healthiest available egress and quarantines
+    egresses that get blocked or challenged. When all of them are quarantined,
+    acquire() waits up to `max_wait` for the first one to come back rather than
+    sending traffic down a route that was just blocked. `clock` and `sleep` can
+    be replaced in tests.
+    """
+
+    def __init__(self, proxies: List[str] = None, user_agents: List[str] = None,
+                 include_direct: bool = True, min_request_interval: float = 1.0,
+                 quarantine_seconds: float = 600, max_consecutive_failures: int = 3,
+                 max_wait: float = 30, clock: Callable[[], float] = time.monotonic,
+                 sleep: Callable[[float], None] = time.sleep):
+        user_agents = user_agents or [requests.utils.default_user_agent()]
+        routes = ([None] if include_direct else []) + list(proxies or [])
+        if not routes:
+            raise ValueError("EgressPool needs at least one proxy or the direct route")
+
+        self.egresses = [
+            Egress(
+                name=proxy or "direct",
+                proxy=proxy,
+                user_agent=user_agents[i % len(user_agents)],
+                min_request_interval=min_request_interval
+            )
+            for i, proxy in enumerate(routes)
+        ]
+        self.quarantine_seconds = quarantine_seconds
+        self.max_consecutive_failures = max_consecutive_failures
+        self.max_wait = max_wait
+        self.clock = clock
+        self.sleep = sleep
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, variable: str = "VINTED_PROXIES", **kwargs) -> Optional["EgressPool"]:
+        """Build a pool from a comma-separated proxy list, or None if it isn't set"""
+        proxies = [p.strip() for p in os.environ.get(variable, "").split(",") if p.strip()]
+        return cls(proxies, **kwargs) if proxies else None
+
+    def _available(self) -> List[Egress]:
+        now = self.clock()
+        return [egress for egress in self.egresses if egress.quarantined_until <= now]
+
+    def next_release(self) -> float:
+        """Seconds until the first quarantined egress is usable again; 0 if one already is"""
+        with self.lock:
+            return max(0.0, min(egress.quarantined_until for egress in self.egresses) - self.clock())
+
+    def acquire(self, max_wait: float = None) -> Egress:
+        """
+        Pick the healthiest egress that has request budget left, waiting on the best
+        one if all are busy. If every egress is quarantined, wait for the first to be
+        released, or raise EgressUnavailable if that is more than `max_wait` away.
+        """
+        max_wait = self.max_wait if max_wait is None else max_wait
+        while True:
+            with self.lock:
+                candidates = sorted(
+                    self._available(),
+                    key=lambda egress: (egress.health_score(), -egress.last_used),
+                    reverse=True
+                )
+            if candidates:
+                break
+            wait = self.next_release()
+            if wait > max_wait:
+                raise EgressUnavailable(f"Every egress is quarantined for another {wait:.0f}s")
+            logger.warning(f"Every egress is quarantined, waiting {wait:.1f}s for the first release")
+            self.sleep(wait)
+            max_wait -= wait
+
+        chosen = next((egress for egress in candidates if egress.rate_limiter.try_acquire()), None)
+        if chosen is None:
+            chosen = candidates[0]
+            chosen.rate_limiter.acquire()
+        chosen.last_used = self.clock()
+        return chosen
+
+    def record(self, egress: Egress, success: bool, latency: float = None,
+               captcha: bool = False, blocked: bool = False):
+        """
+        Update an egress's health after a request and quarantine it if it was blocked
+        """
+        with self.lock:
+            egress.requests += 1
+            if latency is not None:
+                egress.latency = latency if egress.latency is None else 0.8 * egress.latency + 0.2 * latency
+
+            if success:
+                egress.successes += 1
+                egress.consecutive_failures = 0
+                egress.quarantine_count = 0
+                return
+
+            egress.failures += 1
+            egress.consecutive_failures += 1
+            if captcha:
+                egress.captchas += 1
+
+            if captcha or blocked or egress.consecutive_failures >= self.max_consecutive_failures:
+                # Back off harder each time the same egress gets quarantined
+                duration = self.quarantine_seconds * (2 ** egress.quarantine_count)
+                egress.quarantine_count += 1
+                egress.quarantined_until = self.clock() + duration
+                egress.consecutive_failures = 0
+                # Drop cookies tied to the flagged session
+                egress.session.cookies.clear()
+                logger.warning(f"Quarantining egress {egress.name} for {duration:.0f}s")
+
+    def stats(self) -> List[Dict]:
+        with self.lock:
+            return [egress.stats() for egress in self.egresses]
@@ -0,0 +1,284 @@
+import argparse
+import json
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from typing import Dict, Iterator, List, Optional, Sequence
+
+logger = logging.getLogger(__name__)
+
+EVENT_LOG_PATH = os.path.join("cache", "events.db")
+
+# New listings plus known ones that dropped in price or were relisted (tagged `event`)
+LISTINGS_TOPIC = "listings"
+DEALS_TOPIC = "deals"
+
+
+class EventLogFull(RuntimeError):
+    """Raised by publish() when a live consumer is too far behind to accept more"""
+
+
+class EventLog:
+    """
+    Durable, ordered log of monitor events in one SQLite file, so other tools
+    can follow listings and deals without polling deals.csv or re-scraping.
+    Every event gets a global, increasing offset. Consumers are named and keep
+    their committed offset in the same file, so each reads at its own pace and
+    resumes where it left off after a restart.
+
+    Backpressure: publish() refuses new events while any live consumer is more
+    than `max_lag` events behind. Consumers that haven't committed for
+    `consumer_ttl` seconds count as gone and stop holding the producer back.
+    Events are pruned once every live consumer has read them and they are older
+    than `retention`.
+    """
+
+    def __init__(self, path: str = EVENT_LOG_PATH, max_lag: int = 200000,
+                 retention: float = 7 * 24 * 3600, consumer_ttl: float = 24 * 3600):
+        self.path = path
+        self.max_lag = max_lag
+        self.retention = retention
+        self.consumer_ttl = consumer_ttl
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.lock = threading.Lock()
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS events ("
+            " offset INTEGER PRIMARY KEY AUTOINCREMENT,"
+            " topic TEXT NOT NULL,"
+            " key TEXT,"
+            " created_at REAL NOT NULL,"
+            " payload TEXT NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS events_created_at ON events(created_at)")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS consumers ("
+            " name TEXT PRIMARY KEY,"
+            " offset INTEGER NOT NULL,"
+            " updated_at REAL NOT NULL)"
+        )
+
+    def publish(self, topic: str, events: List[Dict], key_field: str = "id", timeout: float = 0) -> int:
+        """
+        Append a batch of events to a topic in one transaction and return the
+        offset of the last one. If a live consumer is over `max_lag` behind,
+        wait up to `timeout` seconds for it to catch up, then raise EventLogFull.
+        """
+        if not events:
+            return self.head()
+        deadline = time.time() + timeout
+        while self.lag() > self.max_lag:
+            if time.time() >= deadline:
+                raise EventLogFull(f"A consumer is more than {self.max_lag} events behind")
+            time.sleep(min(0.5, max(0.0, deadline - time.time())))
+
+        now = time.time()
+        rows = [
+            (topic, str(event.get(key_field)) if event.get(key_field) is not None else None, now,
+             json.dumps(event, default=str))
+            for event in events
+        ]
+        with self.lock:
+            self.conn.execute("BEGIN IMMEDIATE")
+            try:
+                self.conn.executemany(
+                    "INSERT INTO events (topic, key, created_at, payload) VALUES (?, ?, ?, ?)", rows
+                )
+                last = self.conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+        return last
+
+    def head(self) -> int:
+        """Offset of the newest event, 0 for an empty log"""
+        with self.lock:
+            row = self.conn.execute("SELECT MAX(offset) FROM events").fetchone()
+        return row[0] or 0
+
+    def read(self, after: int, topics: Sequence[str] = None, limit: int = 500) -> List[Dict]:
+        """Up to `limit` events with an offset above `after`, oldest first"""
+        query = "SELECT offset, topic, key, created_at, payload FROM events WHERE offset > ?"
+        params = [after]
+        if topics:
+            query += f" AND topic IN ({', '.join('?' * len(topics))})"
+            params.extend(topics)
+        query += " ORDER BY offset LIMIT ?"
+        params.append(limit)
+        with self.lock:
+            rows = self.conn.execute(query, params).fetchall()
+        return [
+            {"offset": row[0], "topic": row[1], "key": row[2], "created_at": row[3], "data": json.loads(row[4])}
+            for row in rows
+        ]
+
+    def committed(self, name: str) -> Optional[int]:
+        with self.lock:
+            row = self.conn.execute("SELECT offset FROM consumers WHERE name = ?", (name,)).fetchone()
+        return row[0] if row else None
+
+    def commit(self, name: str, offset: int):
+        with self.lock:
+            self.conn.execute(
+                "INSERT INTO consumers (name, offset, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(name) DO UPDATE SET offset = excluded.offset, updated_at = excluded.updated_at",
+                (name, offset, time.time())
+            )
+
+    def consumers(self) -> List[Dict]:
+        """Every registered consumer with its offset, lag and whether it still counts as live"""
+        head = self.head()
+        cutoff = time.time() - self.consumer_ttl
+        with self.lock:
+            rows = self.conn.execute("SELECT name, offset, updated_at FROM consumers ORDER BY name").fetchall()
+        return [
+            {"name": name, "offset": offset, "lag": head - offset, "live": updated_at >= cutoff}
+            for name, offset, updated_at in rows
+        ]
+
+    def lag(self) -> int:
+        """How far the slowest live consumer is behind the head, in events"""
+        cutoff = time.time() - self.consumer_ttl
+        with self.lock:
+            head = self.conn.execute("SELECT MAX(offset) FROM events").fetchone()[0] or 0
+            slowest = self.conn.execute(
+                "SELECT MIN(offset) FROM consumers WHERE updated_at >= ?", (cutoff,)
+            ).fetchone()[0]
+        return 0 if slowest is None else max(0, head - slowest)
+
+    def prune(self) -> int:
+        """Drop events past retention that every live consumer has already read"""
+        now = time.time()
+        with self.lock:
+            slowest = self.conn.execute(
+                "SELECT MIN(offset) FROM consumers WHERE updated_at >= ?", (now - self.consumer_ttl,)
+            ).fetchone()[0]
+            query, params = "DELETE FROM events WHERE created_at < ?", [now - self.retention]
+            if slowest is not None:
+                query += " AND offset <= ?"
+                params.append(slowest)
+            cursor = self.conn.execute(query, params)
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        with self.lock:
+            return self.conn.execute("SELECT COUNT(*) FROM events").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
+
+
+class Consumer:
+    """
+    A named reader of the event log. poll() hands out batches; commit() stores
+    the position, so after a crash the consumer re-reads at most the batch it
+    was working on (at-least-once delivery). Without a name the consumer is
+    ephemeral: nothing is stored and it never holds the producer back.
+
+        consumer = Consumer("relister", topics=[DEALS_TOPIC])
+        for batch in consumer:
+            handle(batch)
+            consumer.commit()
+    """
+
+    def __init__(self, name: Optional[str], topics: Sequence[str] = None, log: EventLog = None,
+                 start: str = "earliest", poll_interval: float = 1.0):
+        self.name = name
+        self.topics = list(topics) if topics else None
+        # An empty log is falsy (__len__), so test for None explicitly
+        self.log = log if log is not None else EventLog()
+        self.poll_interval = poll_interval
+
+        committed = self.log.committed(name) if name else None
+        if committed is None:
+            # New consumers either replay what is retained or only follow new events
+            committed = self.log.head() if start == "latest" else 0
+            if name:
+                self.log.commit(name, committed)
+        self.position = committed
+
+    def poll(self, max_events: int = 500, timeout: float = 0) -> List[Dict]:
+        """
+        The next batch of at most `max_events` events, waiting up to `timeout`
+        seconds for one to arrive. Advances the in-memory position only.
+        """
+        deadline = time.time() + timeout
+        while True:
+            # Head first: everything up to it is covered by the read that follows
+            head = self.log.head()
+            events = self.log.read(self.position, self.topics, max_events)
+            if events:
+                self.position = events[-1]["offset"]
+                return events
+            if head > self.position:
+                # Nothing on our topics; skip ahead so other topics don't count as lag
+                self.position = head
+            if time.time() >= deadline:
+                return []
+            time.sleep(min(self.poll_interval, max(0.0, deadline - time.time())))
+
+    def commit(self, offset: int = None):
+        """Mark everything up to `offset` (default: the last polled batch) as processed"""
+        if self.name:
+            self.log.commit(self.name, self.position if offset is None else offset)
+
+    def seek(self, offset: int):
+        """Re-read from just after `offset`; takes effect for the next poll"""
+        self.position = offset
+        self.commit(offset)
+
+    def __iter__(self) -> Iterator[List[Dict]]:
+        """Batches forever; a slow loop body is what applies backpressure to the monitor"""
+        while True:
+            batch = self.poll(timeout=self.poll_interval * 30)
+            if batch:
+                yield batch
+            else:
+                # Keep the consumer live (and the skipped-ahead position saved) while idle
+                self.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Follow the monitor's event log as JSON lines")
+    parser.add_argument("--path", default=EVENT_LOG_PATH)
+    parser.add_argument("--consumer", default=None, help="Consumer name; its offset is committed after each batch")
+    parser.add_argument("--topics", nargs="*", default=None, help=f"e.g. {LISTINGS_TOPIC} {DEALS_TOPIC}")
+    parser.add_argument("--from-start", action="store_true", help="Replay retained events for a new consumer")
+    parser.add_argument("--follow", action="store_true", help="Keep waiting for new events")
+    parser.add_argument("--stats", action="store_true", help="Show consumers and their lag")
+    args = parser.parse_args()
+
+    log = EventLog(args.path)
+    if args.stats:
+        logger.info(f"{len(log)} events retained, head offset {log.head()}")
+        for consumer in log.consumers():
+            logger.info(f"{consumer['name']}: offset {consumer['offset']}, lag {consumer['lag']}"
+                        f"{'' if consumer['live'] else ' (inactive)'}")
+        return
+
+    consumer = Consumer(args.consumer, args.topics, log, start="earliest" if args.from_start else "latest")
+    try:
+        while True:
+            batch = consumer.poll(timeout=30 if args.follow else 0)
+            for event in batch:
+                sys.stdout.write(json.dumps(event, default=str) + "\n")
+            sys.stdout.flush()
+            consumer.commit()
+            if not batch and not args.follow:
+                break
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,120 @@
+import json
+import logging
+import os
+import threading
+import time
+from typing import Dict, Optional
+
+import requests
+
+logger = logging.getLogger(__name__)
+
+FX_CACHE_PATH = os.path.join("cache", "fx_rates.json")
+FX_RATES_URL = "https://api.frankfurter.app/latest"
+
+# Units of each currency per 1 GBP, used until a refresh succeeds
+DEFAULT_RATES = {
+    "GBP": 1.0,
+    "EUR": 1.17,
+    "USD": 1.27,
+    "PLN": 5.05,
+    "CZK": 29.4,
+    "SEK": 13.4,
+    "DKK": 8.72,
+    "HUF": 462.0,
+    "RON": 5.82,
+}
+
+CURRENCY_SYMBOLS = {"£": "GBP", "€": "EUR", "$": "USD", "zł": "PLN", "Kč": "CZK"}
+
+
+class FxRates:
+    """
+    Locally cached FX table for normalizing every domain's prices to GBP
+    """
+
+    def __init__(self, cache_path: str = FX_CACHE_PATH, max_age: float = 12 * 3600,
+                 retry_interval: float = 900):
+        self.cache_path = cache_path
+        self.max_age = max_age
+        self.retry_interval = retry_interval
+        self.last_attempt = 0.0
+        self.rates: Dict[str, float] = dict(DEFAULT_RATES)
+        self.updated_at = 0.0
+        self.lock = threading.Lock()
+        self._load_cache()
+
+    def _load_cache(self):
+        if not os.path.exists(self.cache_path):
+            return
+        try:
+            with open(self.cache_path, "r", encoding="utf-8") as f:
+                cached = json.load(f)
+            self.rates.update(cached["rates"])
+            self.updated_at = float(cached["updated_at"])
+        except (OSError, ValueError, KeyError) as e:
+            logger.warning(f"Ignoring invalid FX cache {self.cache_path}: {str(e)}")
+
+    def is_stale(self) -> bool:
+        return time.time() - self.updated_at > self.max_age
+
+    def refresh(self, session: Optional[requests.Session] = None) -> bool:
+        """
+        Fetch GBP-based rates and persist them; keeps the current table on failure
+        """
+        session = session or requests.Session()
+        self.last_attempt = time.time()
+        try:
+            response = session.get(FX_RATES_URL, params={"from": "GBP"}, timeout=10)
+            response.raise_for_status()
+            rates = {currency: float(rate) for currency, rate in response.json()["rates"].items()}
+        except (requests.exceptions.RequestException, ValueError, KeyError) as e:
+            logger.warning(f"FX refresh failed, keeping cached rates: {str(e)}")
+            return False
+
+        rates["GBP"] = 1.0
+        with self.lock:
+            self.rates.update(rates)
+            self.updated_at = time.time()
+            directory = os.path.dirname(self.cache_path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            tmp_path = f"{self.cache_path}.tmp"
+            with open(tmp_path, "w", encoding="utf-8") as f:
+                json.dump({"updated_at": self.updated_at, "rates": self.rates}, f, indent=2)
+            os.replace(tmp_path, self.cache_path)
+        logger.info(f"FX rates refreshed ({len(rates)} currencies)")
+        return True
+
+    def refresh_if_stale(self):
+        # Don't hammer the rates endpoint while it's failing
+        if self.is_stale() and time.time() - self.last_attempt > self.retry_interval:
+            self.refresh()
+
+    def to_gbp(self, amount: float, currency: str) -> float:
+        currency = CURRENCY_SYMBOLS.get(currency, currency or "GBP")
+        rate = self.rates.get(currency)
+        if not rate:
+            raise ValueError(f"No FX rate for currency '{currency}'")
+        return amount / rate
+
+    def from_gbp(self, amount: float, currency: str) -> float:
+        currency = CURRENCY_SYMBOLS.get(currency, currency or "GBP")
+        rate = self.rates.get(currency)
+        if not rate:
+            raise ValueError(f"No FX rate for currency '{currency}'")
+        return amount * rate
+
+
+_fx_rates: Optional[FxRates] = None
+_fx_lock = threading.Lock()
+
+
+def get_fx_rates() -> FxRates:
+    """Process-wide FX table shared by every domain scraper"""
+    global _fx_rates
+    if _fx_rates is None:
+        with _fx_lock:
+            if _fx_rates is None:
+                _fx_rates = FxRates()
+    return _fx_rates
@@ -0,0 +1,159 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Dict, List
+
+logger = logging.getLogger(__name__)
+
+ITEM_STATE_DB_PATH = os.path.join("cache", "item_state.db")
+
+
+class ItemStateStore:
+    """
+    Last known price and availability of recently seen listings, so later polls
+    can spot price drops and relists on items we already know about. Shared
+    between processes through one SQLite file; only the process whose update
+    lands first emits an event for a change.
+
+    Bounded by both age and size: items not seen for max_age, and the least
+    recently seen beyond max_entries, are forgotten on prune().
+    """
+
+    def __init__(self, path: str = ITEM_STATE_DB_PATH, max_age: float = 14 * 24 * 3600,
+                 max_entries: int = 200000, min_drop: float = 1.0, min_drop_pct: float = 5.0):
+        self.path = path
+        self.max_age = max_age
+        self.max_entries = max_entries
+        # A drop has to clear both thresholds to count, so 50p haggles are ignored
+        self.min_drop = min_drop
+        self.min_drop_pct = min_drop_pct
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS items ("
+            " listing_id TEXT PRIMARY KEY,"
+            " price REAL NOT NULL,"
+            " currency TEXT,"
+            " status TEXT NOT NULL,"
+            " first_seen REAL NOT NULL,"
+            " last_seen REAL NOT NULL)"
+        )
+        # Descriptive columns so observed sales can be used as valuation training data
+        columns = {row[1] for row in self.conn.execute("PRAGMA table_info(items)")}
+        for column, kind in (("price_gbp", "REAL"), ("title", "TEXT"), ("brand", "TEXT"), ("category", "TEXT")):
+            if column not in columns:
+                self.conn.execute(f"ALTER TABLE items ADD COLUMN {column} {kind}")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS items_last_seen ON items(last_seen)")
+
+    def _is_drop(self, old_price: float, new_price: float) -> bool:
+        drop = old_price - new_price
+        return drop >= self.min_drop and drop * 100 >= self.min_drop_pct * old_price
+
+    def unseen(self, listings: List[Dict]) -> List[Dict]:
+        """The listings this store has no record of yet; call before observe()"""
+        ids = list({str(listing["id"]) for listing in listings if listing.get("id") is not None})
+        known = set()
+        for i in range(0, len(ids), 500):
+            chunk = ids[i:i + 500]
+            known.update(row[0] for row in self.conn.execute(
+                f"SELECT listing_id FROM items WHERE listing_id IN ({','.join('?' * len(chunk))})", chunk
+            ))
+        return [listing for listing in listings if listing.get("id") is not None and str(listing["id"]) not in known]
+
+    def observe(self, listings: List[Dict]) -> List[Dict]:
+        """
+        Record this poll's listings and return copies of the known ones that got
+        cheaper or came back on sale, tagged with `event` and `previous_price`.
+        Prices are compared in the listing's own currency so FX moves don't count.
+        """
+        now = time.time()
+        polled = {}
+        for listing in listings:
+            if listing.get("id") is not None and listing.get("price"):
+                polled[str(listing["id"])] = listing
+
+        events = []
+        # One write transaction per poll; the existing rows are read in chunks
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            known = {}
+            ids = list(polled)
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                rows = self.conn.execute(
+                    f"SELECT listing_id, price, currency, status FROM items "
+                    f"WHERE listing_id IN ({','.join('?' * len(chunk))})", chunk
+                ).fetchall()
+                known.update((row[0], row[1:]) for row in rows)
+
+            inserts, updates = [], []
+            for listing_id, listing in polled.items():
+                price = listing.get("original_price") or listing["price"]
+                currency = listing.get("currency")
+                status = listing.get("availability") or "active"
+                details = (listing["price"], listing.get("title"), listing.get("brand"), listing.get("category"))
+                if listing_id not in known:
+                    inserts.append((listing_id, price, currency, status, now, now) + details)
+                    continue
+
+                old_price, old_currency, old_status = known[listing_id]
+                event = None
+                if status == "active" and old_currency == currency and self._is_drop(old_price, price):
+                    event = "price_drop"
+                elif status == "active" and old_status != "active":
+                    event = "relisted"
+                if event:
+                    changed = listing.copy()
+                    changed["event"] = event
+                    # Reported in GBP like the listing price itself
+                    changed["previous_price"] = round(listing["price"] * old_price / price, 2)
+                    events.append(changed)
+                updates.append((price, currency, status, now) + details + (listing_id,))
+
+            self.conn.executemany(
+                "INSERT OR IGNORE INTO items (listing_id, price, currency, status, first_seen, last_seen,"
+                " price_gbp, title, brand, category) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)", inserts
+            )
+            self.conn.executemany(
+                "UPDATE items SET price = ?, currency = ?, status = ?, last_seen = ?,"
+                " price_gbp = ?, title = ?, brand = ?, category = ? WHERE listing_id = ?", updates
+            )
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+
+        if events:
+            logger.info(f"Detected {len(events)} price drops / relists on known items")
+        return events
+
+    def sold_items(self) -> List[Dict]:
+        """Items last seen as sold, with their final GBP price as `sold_price`"""
+        rows = self.conn.execute(
+            "SELECT listing_id, title, brand, category, price_gbp FROM items"
+            " WHERE status = 'sold' AND price_gbp > 0 AND title IS NOT NULL"
+        ).fetchall()
+        return [{"id": row[0], "title": row[1], "brand": row[2], "category": row[3], "sold_price": row[4]}
+                for row in rows]
+
+    def prune(self) -> int:
+        """Forget stale items, then the least recently seen ones beyond max_entries"""
+        removed = self.conn.execute("DELETE FROM items WHERE last_seen < ?", (time.time() - self.max_age,)).rowcount
+        removed += self.conn.execute(
+            "DELETE FROM items WHERE listing_id IN ("
+            " SELECT listing_id FROM items ORDER BY last_seen DESC LIMIT -1 OFFSET ?)",
+            (self.max_entries,)
+        ).rowcount
+        return removed
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM items").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
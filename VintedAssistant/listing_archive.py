@@ -0,0 +1,262 @@
+import argparse
+import logging
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from typing import Dict, Iterator, List, Optional
+from urllib.parse import quote
+
+try:
+    import pyarrow as pa
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # The archive is optional; without pyarrow listings just aren't kept
+    pa = None
+
+from brand_registry import get_brand_registry
+
+logger = logging.getLogger(__name__)
+
+ARCHIVE_DIR = os.path.join("cache", "archive")
+
+# Columns stored in each file; `date` and `brand` come from the partition path
+COLUMNS = ["id", "title", "price", "original_price", "currency", "domain", "size", "seller_id",
+           "url", "photo", "availability", "category", "team", "year", "scraped_at"]
+
+
+def _schema():
+    return pa.schema([
+        ("id", pa.string()),
+        ("title", pa.string()),
+        ("price", pa.float64()),
+        ("original_price", pa.float64()),
+        ("currency", pa.string()),
+        ("domain", pa.string()),
+        ("size", pa.string()),
+        ("seller_id", pa.string()),
+        ("url", pa.string()),
+        ("photo", pa.string()),
+        ("availability", pa.string()),
+        ("category", pa.string()),
+        ("team", pa.string()),
+        ("year", pa.int32()),
+        ("scraped_at", pa.timestamp("ms", tz="UTC")),
+    ])
+
+
+def _partition_dir(root: str, day: str, brand: str) -> str:
+    # Hive-style, URI-encoded so brands like "The North Face" round-trip
+    return os.path.join(root, f"date={day}", f"brand={quote(brand or 'Other', safe='')}")
+
+
+class ListingArchive:
+    """
+    Append-only archive of every scraped listing as zstd-compressed Parquet,
+    partitioned by scrape date and brand. append() only buffers; a background
+    thread writes a file per partition once enough rows piled up or the flush
+    interval passed, so the scan loop never waits on disk or compression.
+    """
+
+    def __init__(self, root: str = ARCHIVE_DIR, flush_rows: int = 20000, flush_interval: float = 60,
+                 compression: str = "zstd"):
+        self.root = root
+        self.flush_rows = flush_rows
+        self.flush_interval = flush_interval
+        self.compression = compression
+        self.enabled = pa is not None
+        if not self.enabled:
+            logger.warning("pyarrow is not installed; the listing archive is disabled")
+            return
+
+        self.buffer: List[tuple] = []
+        self.lock = threading.Lock()
+        self.wakeup = threading.Event()
+        self.stopping = False
+        self.rows_written = 0
+        self.files_written = 0
+        self.thread = threading.Thread(target=self._flush_loop, name="listing-archive", daemon=True)
+        self.thread.start()
+
+    def append(self, listings: List[Dict]):
+        """Queue a batch for archiving; O(batch) list append on the caller's thread"""
+        if not self.enabled or not listings:
+            return
+        now = time.time()
+        with self.lock:
+            self.buffer.extend((now, listing) for listing in listings)
+            full = len(self.buffer) >= self.flush_rows
+        if full:
+            self.wakeup.set()
+
+    def _flush_loop(self):
+        while not self.stopping:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Listing archive flush failed: {str(e)}")
+
+    def flush(self) -> int:
+        """Write everything buffered so far; returns the number of rows written"""
+        if not self.enabled:
+            return 0
+        with self.lock:
+            pending, self.buffer = self.buffer, []
+        if not pending:
+            return 0
+
+        partitions: Dict[tuple, List[Dict]] = {}
+        registry = get_brand_registry()
+        for scraped_at, listing in pending:
+            stamp = datetime.fromtimestamp(scraped_at, timezone.utc)
+            # Unknown brands come through as raw titles; one shared bucket keeps the partition count bounded
+            known = registry.get(listing.get("brand") or "")
+            key = (stamp.date().isoformat(), known["name"] if known else "Other")
+            row = {column: listing.get(column) for column in COLUMNS}
+            row["id"] = str(row["id"]) if row["id"] is not None else None
+            row["seller_id"] = str(row["seller_id"]) if row["seller_id"] is not None else None
+            row["size"] = str(row["size"]) if row["size"] is not None else None
+            row["year"] = int(row["year"]) if row["year"] else None
+            row["scraped_at"] = stamp
+            partitions.setdefault(key, []).append(row)
+
+        schema = _schema()
+        for (day, brand), rows in partitions.items():
+            directory = _partition_dir(self.root, day, brand)
+            os.makedirs(directory, exist_ok=True)
+            name = f"part-{int(time.time() * 1000)}-{uuid.uuid4().hex[:8]}.parquet"
+            # Dot-prefixed temp names are skipped by dataset discovery, so readers never see a partial file
+            tmp_path = os.path.join(directory, f".{name}.tmp")
+            pq.write_table(pa.Table.from_pylist(rows, schema=schema), tmp_path, compression=self.compression)
+            os.replace(tmp_path, os.path.join(directory, name))
+            self.files_written += 1
+        self.rows_written += len(pending)
+        return len(pending)
+
+    def compact(self, day: str) -> int:
+        """
+        Merge each brand partition of one (finished) day into a single file;
+        periodic flushes otherwise leave many small files behind
+        """
+        if not self.enabled:
+            return 0
+        merged = 0
+        day_dir = os.path.join(self.root, f"date={day}")
+        if not os.path.isdir(day_dir):
+            return 0
+        for brand_dir in os.listdir(day_dir):
+            directory = os.path.join(day_dir, brand_dir)
+            parts = sorted(name for name in os.listdir(directory) if name.endswith(".parquet"))
+            if len(parts) < 2:
+                continue
+            table = pa.concat_tables(pq.read_table(os.path.join(directory, name), memory_map=True) for name in parts)
+            name = f"part-compacted-{uuid.uuid4().hex[:8]}.parquet"
+            tmp_path = os.path.join(directory, f".{name}.tmp")
+            pq.write_table(table, tmp_path, compression=self.compression)
+            os.replace(tmp_path, os.path.join(directory, name))
+            for name in parts:
+                os.remove(os.path.join(directory, name))
+            merged += len(parts)
+        return merged
+
+    def stats(self) -> Dict:
+        if not self.enabled:
+            return {"enabled": False}
+        with self.lock:
+            buffered = len(self.buffer)
+        return {"enabled": True, "buffered": buffered, "rows_written": self.rows_written,
+                "files_written": self.files_written}
+
+    def close(self):
+        if not self.enabled:
+            return
+        self.stopping = True
+        self.wakeup.set()
+        self.thread.join(timeout=30)
+        self.flush()
+
+
+def _archive_filter(start_date: Optional[str], end_date: Optional[str], brands: Optional[List[str]]):
+    expression = None
+    clauses = []
+    if start_date:
+        clauses.append(ds.field("date") >= start_date)
+    if end_date:
+        clauses.append(ds.field("date") <= end_date)
+    if brands:
+        clauses.append(ds.field("brand").isin(brands))
+    for clause in clauses:
+        expression = clause if expression is None else expression & clause
+    return expression
+
+
+def _dataset(root: str):
+    if pa is None:
+        raise RuntimeError("pyarrow is required to query the listing archive")
+    # Partition values stay strings; ISO dates still compare correctly
+    partitioning = ds.partitioning(pa.schema([("date", pa.string()), ("brand", pa.string())]), flavor="hive")
+    return ds.dataset(root, format="parquet", partitioning=partitioning)
+
+
+def query_archive(columns: List[str] = None, start_date: str = None, end_date: str = None,
+                  brands: List[str] = None, root: str = ARCHIVE_DIR):
+    """
+    Read the given columns for a date range / brand set as an Arrow table. Only
+    the matching partition directories are opened, only the requested column
+    chunks are read, and files are memory-mapped rather than copied in.
+    """
+    if not os.path.isdir(root):
+        return None
+    return pq.read_table(
+        root,
+        columns=columns,
+        filters=_archive_filter(start_date, end_date, brands),
+        partitioning=_dataset(root).partitioning,
+        memory_map=True,
+    )
+
+
+def iter_archive_batches(columns: List[str] = None, start_date: str = None, end_date: str = None,
+                         brands: List[str] = None, batch_size: int = 50000,
+                         root: str = ARCHIVE_DIR) -> Iterator[List[Dict]]:
+    """
+    Stream the same selection as lists of row dicts, for jobs too big for one table
+    """
+    if not os.path.isdir(root):
+        return
+    scanner = _dataset(root).scanner(columns=columns, filter=_archive_filter(start_date, end_date, brands),
+                                     batch_size=batch_size)
+    for batch in scanner.to_batches():
+        if batch.num_rows:
+            yield batch.to_pylist()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Inspect or compact the listing archive")
+    parser.add_argument("--root", default=ARCHIVE_DIR)
+    parser.add_argument("--start", default=None, help="First date (YYYY-MM-DD)")
+    parser.add_argument("--end", default=None, help="Last date (YYYY-MM-DD)")
+    parser.add_argument("--brands", nargs="*", default=None)
+    parser.add_argument("--compact", default=None, help="Merge the small files of this date")
+    args = parser.parse_args()
+
+    if args.compact:
+        merged = ListingArchive(args.root, flush_interval=3600).compact(args.compact)
+        logger.info(f"Merged {merged} files for {args.compact}")
+        return
+
+    table = query_archive(["brand", "price"], args.start, args.end, args.brands, root=args.root)
+    if table is None or not table.num_rows:
+        logger.info("No archived listings match")
+        return
+    summary = table.group_by("brand").aggregate([("price", "count"), ("price", "mean")])
+    summary = summary.sort_by([("price_count", "descending")]).to_pandas().to_string(index=False)
+    logger.info(f"{table.num_rows} archived listings by brand:\n{summary}")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
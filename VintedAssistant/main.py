@@ -1,10 +1,27 @@
 import streamlit as st
 import pandas as pd
+import atexit
+import threading
 import time
 import os
-from vinted_scraper import VintedScraper
+from datetime import datetime, timedelta
+from multi_domain_scraper import MultiDomainScraper
+from vinted_scraper import real_listings
+from vinted_domains import DEFAULT_DOMAIN, VINTED_DOMAINS
+from title_attributes import FOOTBALL_TEAMS, KIT_TYPES
 from deal_analyzer import DealAnalyzer
+from config_service import get_config_service
 from discord_notifier import DiscordNotifier
+from brand_registry import get_brand_registry
+from repost_detector import RepostDetector
+from photo_cache import PhotoCache
+from rule_engine import RuleSet
+from item_state import ItemStateStore
+from listing_archive import ListingArchive
+from deal_store import DealStore
+from profiler import CycleProfiler
+from event_log import DEALS_TOPIC, LISTINGS_TOPIC, EventLog, EventLogFull
+from saved_searches import SavedSearchIndex, SubscriptionRouter, with_deals
 import hashlib
 import random  # Import random for random selections
 
@@ -39,6 +56,7 @@ if not st.session_state.logged_in:
     if login_button:
         if check_login(username, password):
             st.session_state.logged_in = True
+            st.session_state.username = username
             st.success("✅ Login successful! Redirecting...")
             time.sleep(1)  # Pause before loading main content
             st.rerun()
@@ -67,12 +85,36 @@ if 'total_scanned' not in st.session_state:
     st.session_state.total_scanned = 0
 if 'previous_deals' not in st.session_state:
     st.session_state.previous_deals = []
-if 'all_deals' not in st.session_state:
-    st.session_state.all_deals = []
-
-# Load past deals from CSV if exists
-if os.path.exists(DEALS_CSV_PATH):
-    st.session_state.all_deals = pd.read_csv(DEALS_CSV_PATH).to_dict(orient="records")
+if 'rendered_version' not in st.session_state:
+    st.session_state.rendered_version = -1
+    st.session_state.deals_df = None
+if 'browser_pages' not in st.session_state:
+    # Cursors of the pages visited so far, so "Previous" needs no offset scan
+    st.session_state.browser_pages = [None]
+    st.session_state.browser_query = None
+if 'photo_cache' not in st.session_state:
+    st.session_state.photo_cache = PhotoCache()
+if 'item_state' not in st.session_state:
+    st.session_state.item_state = ItemStateStore()
+if 'repost_detector' not in st.session_state:
+    st.session_state.repost_detector = RepostDetector(photo_loader=st.session_state.photo_cache.get_cached)
+
+
+@st.cache_resource
+def get_deal_store():
+    """Deal history shared by every session (and the sharded monitor, through the file)"""
+    store = DealStore()
+    # Carry over the CSV history from before the deal store existed
+    if not len(store) and os.path.exists(DEALS_CSV_PATH):
+        store.import_csv(DEALS_CSV_PATH)
+    return store
+
+
+deal_store = get_deal_store()
+
+# Tunables (fees, modifiers, defaults) live in config.json and reload in place
+config_service = get_config_service()
+monitor_defaults = config_service.get("monitor")
 
 # Main title
 st.title("🛍️ Vinted Deal Monitor")
@@ -88,19 +130,13 @@ webhook_url = st.sidebar.text_input(
 )
 
 # Filtering options
-min_price = st.sidebar.number_input("Minimum Price (£)", value=0.0, step=1.0)
-max_price = st.sidebar.number_input("Maximum Price (£)", value=1000.0, step=1.0)
-profit_threshold = st.sidebar.number_input("Minimum Profit Threshold (£)", value=5.0, step=1.0)
-scan_interval = st.sidebar.number_input("Scan Interval (seconds)", value=300, min_value=120, help="How often to check for new deals. Keep this high (5+ minutes) to avoid being blocked by Vinted.")
+min_price = st.sidebar.number_input("Minimum Price (£)", value=float(monitor_defaults["min_price"]), step=1.0)
+max_price = st.sidebar.number_input("Maximum Price (£)", value=float(monitor_defaults["max_price"]), step=1.0)
+profit_threshold = st.sidebar.number_input("Minimum Profit Threshold (£)", value=float(monitor_defaults["profit_threshold"]), step=1.0)
+scan_interval = st.sidebar.number_input("Scan Interval (seconds)", value=int(monitor_defaults["scan_interval"]), min_value=120, help="How often to check for new deals. Keep this high (5+ minutes) to avoid being blocked by Vinted.")
 
 # Brand selection
-brands = [
-    "Nike", "Adidas", "Puma", "New Balance", "Jordan", "Reebok",
-    "Supreme", "Palace", "Stussy", "BAPE", "Off-White", "Stone Island",
-    "Carhartt", "The North Face", "Nike x Off-White", "Yeezy", "Fear of God",
-    "Palm Angels", "Essentials", "Chrome Hearts", "Ralph Lauren",
-    "Tommy Hilfiger", "Patagonia", "Arc'teryx", "Trapstar", "Corteiz", "Other"
-]
+brands = get_brand_registry().names() + ["Other"]
 
 # Allow user to choose "Any Brand" or select specific brands
 any_brand_option = st.sidebar.checkbox("Use Any Brand Randomly", value=False)
@@ -109,12 +145,170 @@ if any_brand_option:
     selected_brands = [random.choice(brands)]  # Select one random brand
     st.sidebar.write(f"Monitoring random brand: {selected_brands[0]}")
 else:
-    selected_brands = st.sidebar.multiselect("Filter Brands", brands, default=["Nike", "Adidas", "Supreme"])
+    selected_brands = st.sidebar.multiselect("Filter Brands", brands, default=[b for b in monitor_defaults["brands"] if b in brands])
+
+# Vinted storefronts to search; prices are converted to GBP
+selected_domains = st.sidebar.multiselect(
+    "Vinted Domains",
+    list(VINTED_DOMAINS),
+    default=[domain for domain in monitor_defaults["domains"] if domain in VINTED_DOMAINS] or [DEFAULT_DOMAIN],
+    format_func=lambda domain: f"vinted.{domain}"
+) or [DEFAULT_DOMAIN]
+
+# Football shirts: one query per team x kit type
+st.sidebar.subheader("Football Shirts")
+selected_teams = st.sidebar.multiselect("Teams", FOOTBALL_TEAMS, default=[])
+selected_kits = st.sidebar.multiselect("Kit Types", KIT_TYPES, default=["home", "away"])
+shirt_years = st.sidebar.slider("Season Range", min_value=1970, max_value=time.localtime().tm_year, value=(1990, time.localtime().tm_year))
+
+# Optional deal rules; a deal must match at least one
+deal_rules = None
+with st.sidebar.expander("Deal Rules"):
+    rules_text = st.text_area(
+        "Rules (JSON list)",
+        value="[]",
+        help='e.g. [{"name": "Jordan retros", "brands": ["Jordan"], "size_min": 9, "size_max": 10, '
+             '"title_includes": ["retro"], "title_excludes": ["replica"], "min_profit": 20, "min_profit_pct": 25}]'
+    )
+    try:
+        deal_rules = RuleSet.from_json(rules_text) if rules_text.strip() not in ("", "[]") else None
+    except ValueError as e:
+        st.error(str(e))
+    if deal_rules and st.session_state.get('rule_stats'):
+        st.dataframe(pd.DataFrame(st.session_state.rule_stats), hide_index=True)
+
+@st.cache_resource
+def get_saved_searches():
+    """One saved-search index and router shared by every dashboard session"""
+    index = SavedSearchIndex.load()
+    return index, SubscriptionRouter(index)
+
+
+saved_searches, saved_search_router = get_saved_searches()
+
+
+@st.cache_resource
+def get_listing_archive():
+    """One archive writer for the whole process; it flushes in the background"""
+    archive = ListingArchive()
+    # The cached writer is never torn down by Streamlit, so write out its buffer on exit
+    atexit.register(archive.close)
+    return archive
+
+
+listing_archive = get_listing_archive()
+
+
+@st.cache_resource
+def get_event_log():
+    """Event stream for downstream tools (see event_log.py for the consumer side)"""
+    return EventLog()
 
-# Initialize components
-scraper = VintedScraper()
-analyzer = DealAnalyzer(profit_threshold)
-notifier = DiscordNotifier(webhook_url)
+
+event_log = get_event_log()
+
+
+@st.cache_resource
+def get_cycle_profiler():
+    """Off unless VINTED_PROFILE_EVERY is set; profiles land in cache/profiles"""
+    return CycleProfiler.from_env("dashboard")
+
+
+cycle_profiler = get_cycle_profiler()
+if cycle_profiler.enabled:
+    summary = cycle_profiler.last_summary
+    st.sidebar.caption(
+        f"Profiling every {cycle_profiler.every} scans" + (
+            f" - last: {summary['wall']:.1f}s wall, {summary['cpu']:.1f}s CPU, "
+            f"{summary['sleep']:.1f}s sleeping, {summary['wait']:.1f}s waiting" if summary else "")
+    )
+
+
+def publish_events(topic, events):
+    # A stalled consumer must not stall scanning; listings stay in the archive, deals in the deal store
+    try:
+        event_log.publish(topic, events)
+    except EventLogFull as e:
+        st.warning(f"Skipped {len(events)} {topic} events: {str(e)}")
+current_user = st.session_state.get('username', 'user')
+
+# Saved searches: each user's watchlist, notified on their own webhook
+with st.sidebar.expander("Saved Searches"):
+    with st.form("saved_search_form", clear_on_submit=True):
+        search_name = st.text_input("Name")
+        search_brands = st.multiselect("Brands", brands)
+        search_sizes = st.text_input("Sizes (comma separated)")
+        search_keywords = st.text_input("Keywords (comma separated, all required)")
+        search_min_price = st.number_input("Min Price (£)", value=0.0, step=1.0)
+        search_max_price = st.number_input("Max Price (£)", value=0.0, step=1.0, help="0 for no limit")
+        search_min_profit = st.number_input("Min Profit (£)", value=0.0, step=1.0)
+        search_webhook = st.text_input("Webhook URL", value=webhook_url, type="password")
+        if st.form_submit_button("Save Search") and search_name:
+            saved_searches.add({
+                "id": f"{current_user}:{search_name}",
+                "subscriber": current_user,
+                "name": search_name,
+                "webhook_url": search_webhook,
+                "brands": search_brands,
+                "sizes": [size.strip() for size in search_sizes.split(",") if size.strip()],
+                "keywords": [word.strip() for word in search_keywords.split(",") if word.strip()],
+                "price_min": search_min_price or None,
+                "price_max": search_max_price or None,
+                "min_profit": search_min_profit or None,
+            })
+            saved_searches.save()
+
+    for search in saved_searches.for_subscriber(current_user):
+        col_name, col_delete = st.columns([4, 1])
+        col_name.write(search.get("name", search["id"]))
+        if col_delete.button("✕", key=f"delete_{search['id']}"):
+            saved_searches.remove(search["id"])
+            saved_searches.save()
+            st.rerun()
+
+# Initialize components once per session; sidebar changes are applied to them in
+# place so sessions, cookies and price caches survive every rerun
+if 'scraper' not in st.session_state:
+    # Optional proxy list, e.g. VINTED_PROXIES=http://proxy1:8080,http://proxy2:8080
+    proxies = [p.strip() for p in os.environ.get("VINTED_PROXIES", "").split(",") if p.strip()]
+    st.session_state.scraper = MultiDomainScraper(selected_domains, proxies=proxies)
+    st.session_state.analyzer = DealAnalyzer(profit_threshold)
+    st.session_state.notifier = DiscordNotifier(webhook_url)
+scraper = st.session_state.scraper
+scraper.set_domains(selected_domains)
+analyzer = st.session_state.analyzer
+analyzer.profit_threshold = profit_threshold
+notifier = st.session_state.notifier
+notifier.webhook_url = webhook_url
+st.sidebar.caption(f"Valuation model: {analyzer.valuation.model_name} · Config v{config_service.version}")
+
+@st.cache_resource
+def get_brand_refresh():
+    """One catalog refresh job for the process, so sessions can't start a second one"""
+    return {"thread": None, "version": None, "error": None}
+
+
+def refresh_brand_catalog(job, scraper):
+    try:
+        job["version"], job["error"] = scraper.refresh_brand_catalog().version, None
+    except ValueError as e:
+        job["error"] = str(e)
+
+
+# Pull current brand IDs from Vinted into the shared brand cache. That is one
+# request per brand a second apart, so it runs off the script thread.
+brand_refresh = get_brand_refresh()
+refreshing = brand_refresh["thread"] is not None and brand_refresh["thread"].is_alive()
+if st.sidebar.button("Refresh Brand Catalog", disabled=refreshing):
+    brand_refresh["thread"] = threading.Thread(target=refresh_brand_catalog, args=(brand_refresh, scraper), daemon=True)
+    brand_refresh["thread"].start()
+    refreshing = True
+if refreshing:
+    st.sidebar.info("Refreshing brand catalog from Vinted in the background...")
+elif brand_refresh["error"]:
+    st.sidebar.error(f"Brand refresh rejected: {brand_refresh['error']}")
+elif brand_refresh["version"] is not None:
+    st.sidebar.success(f"Brand catalog updated to version {brand_refresh['version']}")
 
 # Start/Stop monitoring button
 if st.sidebar.button("Toggle Monitoring"):
@@ -137,14 +331,73 @@ with col2:
 with col3:
     st.metric("Last Scan", "Never" if not st.session_state.last_scan_time else time.strftime("%H:%M:%S", time.localtime(st.session_state.last_scan_time)))
 with col4:
-    st.metric("Next Scan In", "N/A" if not st.session_state.monitoring else f"{max(0, scan_interval - (time.time() - st.session_state.last_scan_time)):.0f}s")
+    # A fixed time rather than a countdown, so the page has nothing to tick while idle
+    if not st.session_state.monitoring:
+        next_scan = "N/A"
+    elif not st.session_state.last_scan_time:
+        next_scan = "Now"
+    else:
+        next_scan = time.strftime("%H:%M:%S", time.localtime(st.session_state.last_scan_time + scan_interval))
+    st.metric("Next Scan", next_scan)
+
+
+def scan_due() -> bool:
+    return st.session_state.monitoring and (
+        not st.session_state.last_scan_time or time.time() - st.session_state.last_scan_time >= scan_interval)
+
+
+@st.fragment(run_every=2)
+def watch_for_changes():
+    """
+    Cheap poll of the deal store version and the scan schedule. The page only
+    reruns when a scan is due or another process/session stored new deals.
+    """
+    # A newer config version is applied to the live components right here, no rerun needed
+    config_service.current()
+    if scan_due() or deal_store.version() != st.session_state.rendered_version:
+        st.rerun()
+
+
+def deal_rows(deals):
+    df = pd.DataFrame(deals)
+    for column in ('photo', 'size', 'brand', 'url', 'matched_rules'):
+        if column not in df:
+            df[column] = None
+    # Thumbnails come from the local photo cache, not from Vinted's CDN
+    df['thumbnail'] = df['photo'].map(
+        lambda url: st.session_state.photo_cache.thumbnail_data_uri(url) if isinstance(url, str) else None
+    )
+    return df
+
+
+def latest_deals_frame(limit: int = 30):
+    """
+    Table of the newest deals, only touching the store for rows added since
+    the version last rendered in this session
+    """
+    version = deal_store.version()
+    if version != st.session_state.rendered_version:
+        cached = st.session_state.deals_df
+        if cached is None:
+            fresh = deal_store.recent(limit)
+        else:
+            fresh = deal_store.since(st.session_state.rendered_version, limit)
+        if fresh:
+            frame = deal_rows(fresh)
+            if cached is not None:
+                # Re-found deals move to the top instead of showing twice
+                cached = cached[~cached['seq'].isin(frame['seq']) & ~cached['id'].isin(frame['id'])]
+                frame = pd.concat([frame, cached], ignore_index=True)
+            st.session_state.deals_df = frame.head(limit)
+        st.session_state.rendered_version = version
+    return st.session_state.deals_df
 
 # Main monitoring loop
 if st.session_state.monitoring:
     try:
         current_time = time.time()
-        if not st.session_state.last_scan_time or (current_time - st.session_state.last_scan_time) >= scan_interval:
-            with st.spinner("🔍 Scanning Vinted listings..."):
+        if scan_due():
+            with st.spinner("🔍 Scanning Vinted listings..."), cycle_profiler.cycle():
                 all_listings = []
 
                 # Show progress bar
@@ -165,61 +418,190 @@ if st.session_state.monitoring:
                     progress_bar.progress(min(1.0, (i+2) / len(selected_brands)))
                     progress_text.text(f"Searching for {', '.join(batch_brands)}...")
 
+                if selected_teams:
+                    progress_text.text(f"Searching football shirts for {len(selected_teams)} teams...")
+                    all_listings.extend(scraper.search_football_shirts_batch(
+                        teams=selected_teams,
+                        kit_types=selected_kits,
+                        min_price=min_price,
+                        max_price=max_price,
+                        min_year=shirt_years[0],
+                        max_year=shirt_years[1]
+                    ))
+
                 # Clear progress indicators
                 progress_bar.empty()
                 progress_text.empty()
 
                 # Update scan stats
                 st.session_state.total_scanned += len(all_listings)
+                # Demo items shown when scraping fails stay out of every stored record
+                scraped_listings = real_listings(all_listings)
+                listing_archive.append(scraped_listings)
                 st.session_state.last_scan_time = current_time
 
+                # Known items that got cheaper or came back on sale
+                unseen_listings = st.session_state.item_state.unseen(scraped_listings)
+                price_events = st.session_state.item_state.observe(scraped_listings)
+                st.session_state.item_state.prune()
+                # The listings topic carries new and changed items, not every scan's full result
+                publish_events(LISTINGS_TOPIC, unseen_listings + price_events)
+                event_log.prune()
+
                 # Track new deals
                 seen_ids = set(deal.get('id', '') for deal in st.session_state.previous_deals)
+                seen_ids.update(event['id'] for event in price_events)
                 new_listings = [item for item in all_listings if item.get('id', '') not in seen_ids]
-
-                if new_listings:
-                    new_deals = analyzer.find_deals(new_listings)
+                # Fetch photos once, concurrently; dedup and the deal table read them from disk
+                st.session_state.photo_cache.fetch_many(item.get('photo') for item in new_listings)
+
+                # Same item reposted under a new id
+                new_listings, _ = st.session_state.repost_detector.filter_reposts(new_listings)
+
+                new_deals = []
+                if new_listings or price_events:
+                    new_deals = analyzer.find_deals(new_listings, rules=deal_rules)
+                    new_deals += analyzer.find_price_drops(price_events, rules=deal_rules)
+                    new_deals.sort(key=lambda deal: deal.get('estimated_profit', 0), reverse=True)
+                    if deal_rules:
+                        st.session_state.rule_stats = deal_rules.stats()
                     if new_deals:
-                        st.session_state.all_deals = new_deals + st.session_state.all_deals
-                        st.session_state.all_deals = st.session_state.all_deals[:100]
+                        # Bumps the store version; every open dashboard picks the rows up
+                        deal_store.add(new_deals)
+                        publish_events(DEALS_TOPIC, real_listings(new_deals))
 
                         for deal in new_deals:
                             notifier.send_deal(deal)
 
-                        # Save deals to CSV
-                        pd.DataFrame(st.session_state.all_deals).to_csv(DEALS_CSV_PATH, index=False)
+                # Saved searches follow every new listing, not only those over the deal threshold
+                subscriber_listings = real_listings(with_deals(new_listings, new_deals))
+                if subscriber_listings:
+                    saved_search_router.dispatch(subscriber_listings)
 
                 st.session_state.previous_deals = all_listings
 
-            # Display all deals in a table
-            if st.session_state.all_deals:
-                st.success(f"🎯 Found {len(st.session_state.all_deals)} potential deals!")
-
-                df = pd.DataFrame(st.session_state.all_deals[:30])  # Show top 30 deals
-                st.dataframe(
-                    df[['title', 'size', 'price', 'estimated_profit', 'profit_percentage', 'url']],  # Added 'size'
-                    hide_index=True,
-                    use_container_width=True,
-                    column_config={
-                        'size': st.column_config.TextColumn('Size'),
-                        'price': st.column_config.NumberColumn('Price (£)', format="£%.2f"),
-                        'estimated_profit': st.column_config.NumberColumn('Potential Profit (£)', format="£%.2f"),
-                        'profit_percentage': st.column_config.NumberColumn('Profit %', format="%.1f%%"),
-                        'url': st.column_config.LinkColumn('Link')
-                    }
-                )
-
-            else:
-                st.info("👀 No deals found yet - keeping watch!")
-
-        # Add a small delay
-        time.sleep(0.2)
-        st.rerun()
+            # Once per scan: redraw the metrics above with this scan's numbers
+            st.rerun()
 
     except Exception as e:
         st.error(f"An error occurred: {str(e)}")
-        time.sleep(5)
-        st.rerun()
+        # Try again in 30 seconds rather than waiting out the whole interval
+        st.session_state.last_scan_time = time.time() - max(0, scan_interval - 30)
+
+# Display all deals in a table
+deals_df = latest_deals_frame()
+if deals_df is not None and len(deals_df):
+    st.success(f"🎯 {len(deal_store)} potential deals found so far")
+    st.dataframe(
+        deals_df[['thumbnail', 'title', 'size', 'price', 'estimated_profit', 'profit_percentage', 'url']],  # Added 'size'
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'thumbnail': st.column_config.ImageColumn('Photo'),
+            'size': st.column_config.TextColumn('Size'),
+            'price': st.column_config.NumberColumn('Price (£)', format="£%.2f"),
+            'estimated_profit': st.column_config.NumberColumn('Potential Profit (£)', format="£%.2f"),
+            'profit_percentage': st.column_config.NumberColumn('Profit %', format="%.1f%%"),
+            'url': st.column_config.LinkColumn('Link')
+        }
+    )
+    st.download_button(
+        "Download CSV",
+        deals_df.drop(columns=['thumbnail']).to_csv(index=False),
+        file_name=DEALS_CSV_PATH,
+        mime="text/csv"
+    )
+elif st.session_state.monitoring:
+    st.info("👀 No deals found yet - keeping watch!")
+
+if st.session_state.monitoring:
+    watch_for_changes()
+
+
+@st.cache_data(ttl=300)
+def deal_filter_options():
+    return deal_store.distinct("brand"), deal_store.distinct("size")
+
+
+BROWSER_SORTS = {
+    "Newest": ("found_at", True),
+    "Oldest": ("found_at", False),
+    "Highest profit %": ("profit_percentage", True),
+    "Highest profit (£)": ("estimated_profit", True),
+    "Cheapest": ("price", False),
+}
+
+
+@st.fragment
+def deal_browser(page_size: int = 50):
+    """
+    Search the whole deal history. Runs as a fragment so changing a filter or
+    page only reruns this block, and each page is one keyset query against
+    the deal store's indexes; no more than `page_size` rows are ever loaded.
+    """
+    brand_options, size_options = deal_filter_options()
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        brands = st.multiselect("Brand", brand_options, key="browser_brands")
+        sort_label = st.selectbox("Sort by", list(BROWSER_SORTS), key="browser_sort")
+    with col2:
+        sizes = st.multiselect("Size", size_options, key="browser_sizes")
+        min_profit_pct = st.number_input("Min profit %", min_value=0.0, value=0.0, step=5.0, key="browser_min_pct")
+    with col3:
+        found_between = st.date_input("Found between", value=(), key="browser_dates")
+
+    start = end = None
+    if len(found_between) >= 1:
+        start = datetime.combine(found_between[0], datetime.min.time()).timestamp()
+        last_day = found_between[-1]
+        end = datetime.combine(last_day + timedelta(days=1), datetime.min.time()).timestamp()
+
+    sort, descending = BROWSER_SORTS[sort_label]
+    query = dict(sort=sort, descending=descending, brands=brands, sizes=sizes,
+                 min_profit_pct=min_profit_pct or None, start=start, end=end)
+    # New filters start again from the first page
+    if query != st.session_state.browser_query:
+        st.session_state.browser_query = query
+        st.session_state.browser_pages = [None]
+
+    pages = st.session_state.browser_pages
+    deals, next_cursor = deal_store.page(after=pages[-1], limit=page_size, **query)
+    if not deals:
+        st.info("No deals match these filters")
+        return
+
+    df = deal_rows(deals)
+    df['found_at'] = pd.to_datetime(df['found_at'], unit='s')
+    st.dataframe(
+        df[['thumbnail', 'title', 'brand', 'size', 'price', 'estimated_profit', 'profit_percentage', 'found_at', 'url']],
+        hide_index=True,
+        use_container_width=True,
+        column_config={
+            'thumbnail': st.column_config.ImageColumn('Photo'),
+            'brand': st.column_config.TextColumn('Brand'),
+            'size': st.column_config.TextColumn('Size'),
+            'price': st.column_config.NumberColumn('Price (£)', format="£%.2f"),
+            'estimated_profit': st.column_config.NumberColumn('Potential Profit (£)', format="£%.2f"),
+            'profit_percentage': st.column_config.NumberColumn('Profit %', format="%.1f%%"),
+            'found_at': st.column_config.DatetimeColumn('Found', format="YYYY-MM-DD HH:mm"),
+            'url': st.column_config.LinkColumn('Link')
+        }
+    )
+
+    # Callbacks move the cursor before the fragment reruns, so the new page renders in one pass
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        st.button("← Previous", disabled=len(pages) == 1, key="browser_previous", on_click=pages.pop)
+    with col2:
+        st.caption(f"Page {len(pages)}")
+    with col3:
+        st.button("Next →", disabled=next_cursor is None, key="browser_next",
+                  on_click=pages.append, args=(next_cursor,))
+
+
+if len(deal_store):
+    with st.expander("🔎 Browse Deal History"):
+        deal_browser()
 
 # Display instructions
 with st.expander("How to Use"):
@@ -229,7 +611,8 @@ with st.expander("How to Use"):
     3. Select brands to monitor, or choose to monitor any random brand.
     4. Click 'Toggle Monitoring' to start/stop the monitor.
     5. The app will scan Vinted every few seconds and notify you of good deals.
-    6. Deals will appear in the table and be saved to CSV.
+    6. Deals will appear in the table as soon as they are found and can be downloaded as CSV.
+    7. Use 'Browse Deal History' to search every deal found so far by brand, size, profit and date.
     """)
 
 
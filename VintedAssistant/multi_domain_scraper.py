@@ -0,0 +1,102 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List
+
+from egress_pool import EgressPool
+from fx_rates import get_fx_rates
+from vinted_domains import DEFAULT_DOMAIN, VINTED_DOMAINS
+from vinted_scraper import VintedScraper
+
+logger = logging.getLogger(__name__)
+
+
+class MultiDomainScraper:
+    """
+    Query several Vinted storefronts at once. Every domain gets its own
+    VintedScraper (session, cookies, connection pool and rate budget) and all
+    prices come back in GBP, so DealAnalyzer never sees foreign currencies.
+    """
+
+    def __init__(self, domains: List[str] = None, proxies: List[str] = None):
+        self.fx = get_fx_rates()
+        self.fx.refresh_if_stale()
+        self.proxies = proxies
+        self.scrapers: Dict[str, VintedScraper] = {}
+        # Threads are only started as needed, so sizing for every domain costs nothing up front
+        self.executor = ThreadPoolExecutor(max_workers=len(VINTED_DOMAINS), thread_name_prefix="vinted-domain")
+        self.set_domains(domains or [DEFAULT_DOMAIN])
+
+    def _build_scraper(self, domain: str) -> VintedScraper:
+        scraper = VintedScraper(domain, fx_rates=self.fx)
+        if self.proxies:
+            # Separate pool per domain so a block on one storefront doesn't bench the others
+            scraper.egress_pool = EgressPool(
+                self.proxies,
+                user_agents=scraper.user_agents,
+                min_request_interval=scraper.min_request_interval
+            )
+        return scraper
+
+    def set_domains(self, domains: List[str]):
+        """
+        Switch to a new set of storefronts in place: domains that stay keep
+        their session, cookies, rate budget and query cache
+        """
+        domains = list(domains or [DEFAULT_DOMAIN])
+        if domains == list(self.scrapers):
+            return
+        self.scrapers = {
+            domain: self.scrapers.get(domain) or self._build_scraper(domain) for domain in domains
+        }
+
+    @property
+    def primary(self) -> VintedScraper:
+        return next(iter(self.scrapers.values()))
+
+    def get_listings(self, min_price: float, max_price: float, brands: List[str],
+                     search_text: str = "") -> List[Dict]:
+        """
+        Fetch the same query from every domain concurrently and merge the results
+        """
+        futures = {
+            domain: self.executor.submit(scraper.get_listings, min_price, max_price, brands, search_text)
+            for domain, scraper in self.scrapers.items()
+        }
+        listings = []
+        for domain, future in futures.items():
+            try:
+                listings.extend(future.result())
+            except Exception as e:
+                logger.error(f"Fetching from vinted.{domain} failed: {str(e)}")
+        return listings
+
+    def search_football_shirts_batch(self, teams: List[str], kit_types: List[str], min_price: float,
+                                     max_price: float, brand: str = None, min_year: int = None,
+                                     max_year: int = None) -> List[Dict]:
+        """
+        Run the team x kit-type fan-out on every domain concurrently
+        """
+        futures = {
+            domain: self.executor.submit(scraper.search_football_shirts_batch, teams, kit_types,
+                                         min_price, max_price, brand, min_year, max_year)
+            for domain, scraper in self.scrapers.items()
+        }
+        shirts = []
+        for domain, future in futures.items():
+            try:
+                shirts.extend(future.result())
+            except Exception as e:
+                logger.error(f"Football shirt search on vinted.{domain} failed: {str(e)}")
+        return shirts
+
+    def egress_stats(self) -> Dict[str, List[Dict]]:
+        return {
+            domain: scraper.egress_pool.stats()
+            for domain, scraper in self.scrapers.items() if scraper.egress_pool
+        }
+
+    def refresh_brand_catalog(self):
+        return self.primary.refresh_brand_catalog()
+
+    def close(self):
+        self.executor.shutdown(wait=False)
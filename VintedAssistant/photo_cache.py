@@ -0,0 +1,216 @@
+import base64
+import hashlib
+import io
+import logging
+import os
+import sqlite3
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from typing import Dict, Iterable, List, Optional
+
+import requests
+
+try:
+    from PIL import Image
+except ImportError:  # Without Pillow there are no thumbnails; the dashboard links the CDN photo
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+PHOTO_CACHE_DIR = os.path.join("cache", "photos")
+
+
+class PhotoCache:
+    """
+    Content-addressed on-disk cache of listing photos with small thumbnails.
+    Downloads go through one pooled session on a bounded thread pool; the cache
+    is trimmed back under `max_bytes` by evicting the least recently used images.
+    """
+
+    def __init__(self, cache_dir: str = PHOTO_CACHE_DIR, max_bytes: int = 500 * 1024 * 1024,
+                 max_workers: int = 8, thumbnail_size: int = 128, timeout: float = 10):
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.thumbnail_size = thumbnail_size
+        self.timeout = timeout
+        os.makedirs(os.path.join(cache_dir, "objects"), exist_ok=True)
+        os.makedirs(os.path.join(cache_dir, "thumbs"), exist_ok=True)
+
+        self.session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=max_workers)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="photo-fetch")
+        self.in_flight: Dict[str, object] = {}
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(os.path.join(cache_dir, "index.db"), check_same_thread=False,
+                                    timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS photos ("
+            " url TEXT PRIMARY KEY,"
+            " digest TEXT NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " accessed_at REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS photos_accessed ON photos(accessed_at)")
+        self.conn.execute("CREATE INDEX IF NOT EXISTS photos_digest ON photos(digest)")
+
+    def _object_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "objects", digest[:2], digest)
+
+    def _thumb_path(self, digest: str) -> str:
+        return os.path.join(self.cache_dir, "thumbs", digest[:2], f"{digest}.jpg")
+
+    def _lookup(self, url: str) -> Optional[str]:
+        with self.lock:
+            row = self.conn.execute("SELECT digest FROM photos WHERE url = ?", (url,)).fetchone()
+            if row is None:
+                return None
+            self.conn.execute("UPDATE photos SET accessed_at = ? WHERE url = ?", (time.time(), url))
+        return row[0]
+
+    def get_cached(self, url: str) -> Optional[bytes]:
+        """Image bytes if already on disk; never touches the network"""
+        digest = self._lookup(url) if url else None
+        if digest is None:
+            return None
+        try:
+            with open(self._object_path(digest), "rb") as f:
+                return f.read()
+        except OSError:
+            return None
+
+    def get(self, url: str) -> Optional[bytes]:
+        """Image bytes, downloading them if needed"""
+        data = self.get_cached(url)
+        if data is None and url:
+            self._download(url)
+            data = self.get_cached(url)
+        return data
+
+    def _download(self, url: str):
+        try:
+            response = self.session.get(url, timeout=self.timeout)
+            response.raise_for_status()
+            data = response.content
+        except requests.exceptions.RequestException as e:
+            logger.warning(f"Photo download failed for {url}: {str(e)}")
+            return
+        self._store(url, data)
+
+    def _store(self, url: str, data: bytes):
+        digest = hashlib.sha256(data).hexdigest()
+        path = self._object_path(digest)
+        # Identical images behind different URLs are stored once
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            self._write_thumbnail(digest, data)
+
+        with self.lock:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO photos (url, digest, size, accessed_at) VALUES (?, ?, ?, ?)",
+                (url, digest, len(data), time.time())
+            )
+
+    def _write_thumbnail(self, digest: str, data: bytes):
+        if Image is None:
+            return
+        try:
+            image = Image.open(io.BytesIO(data)).convert("RGB")
+            image.thumbnail((self.thumbnail_size, self.thumbnail_size))
+            path = self._thumb_path(digest)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            image.save(path, "JPEG", quality=80)
+        except (OSError, ValueError) as e:
+            logger.warning(f"Could not thumbnail photo {digest[:12]}: {str(e)}")
+
+    def prefetch(self, urls: Iterable[str]) -> List:
+        """
+        Queue downloads for URLs that aren't cached or already being fetched;
+        returns the futures so callers can wait on them if they need to
+        """
+        futures = []
+        for url in set(u for u in urls if u):
+            with self.lock:
+                future = self.in_flight.get(url)
+                cached = self.conn.execute("SELECT 1 FROM photos WHERE url = ?", (url,)).fetchone()
+            if cached:
+                continue
+            if future is None:
+                future = self.executor.submit(self._download, url)
+                with self.lock:
+                    self.in_flight[url] = future
+                future.add_done_callback(lambda _, url=url: self._done(url))
+            futures.append(future)
+        return futures
+
+    def _done(self, url: str):
+        with self.lock:
+            self.in_flight.pop(url, None)
+
+    def fetch_many(self, urls: Iterable[str], timeout: float = 15):
+        """Prefetch and block until the batch is on disk (or the timeout passes)"""
+        futures = self.prefetch(urls)
+        if futures:
+            wait(futures, timeout=timeout)
+        self.evict()
+
+    def thumbnail_data_uri(self, url: str) -> Optional[str]:
+        """
+        Local thumbnail as a data URI for the dashboard, or None if not cached yet.
+        Photos that have no thumbnail (no Pillow, or it couldn't decode them) are
+        linked by their CDN URL rather than inlining the full-size original.
+        """
+        digest = self._lookup(url) if url else None
+        if digest is None:
+            return None
+        try:
+            with open(self._thumb_path(digest), "rb") as f:
+                return "data:image/jpeg;base64," + base64.b64encode(f.read()).decode("ascii")
+        except OSError:
+            return url
+
+    def total_bytes(self) -> int:
+        with self.lock:
+            row = self.conn.execute(
+                "SELECT COALESCE(SUM(size), 0) FROM (SELECT digest, MAX(size) AS size FROM photos GROUP BY digest)"
+            ).fetchone()
+        return row[0]
+
+    def evict(self) -> int:
+        """
+        Remove least recently used images until the cache fits in max_bytes
+        """
+        total = self.total_bytes()
+        if total <= self.max_bytes:
+            return 0
+        removed = 0
+        with self.lock:
+            rows = self.conn.execute(
+                "SELECT digest, MAX(size), MAX(accessed_at) AS last FROM photos GROUP BY digest ORDER BY last"
+            ).fetchall()
+            for digest, size, _ in rows:
+                if total <= self.max_bytes:
+                    break
+                for path in (self._object_path(digest), self._thumb_path(digest)):
+                    try:
+                        os.remove(path)
+                    except OSError:
+                        pass
+                self.conn.execute("DELETE FROM photos WHERE digest = ?", (digest,))
+                total -= size
+                removed += 1
+        if removed:
+            logger.info(f"Evicted {removed} cached photos")
+        return removed
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.conn.close()
@@ -0,0 +1,287 @@
+import argparse
+import contextlib
+import json
+import linecache
+import logging
+import os
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+PROFILE_DIR = os.path.join("cache", "profiles")
+APP_ROOT = os.path.dirname(os.path.abspath(__file__))
+
+# Synthetic leaf frames marking where off-CPU time went
+SLEEP_FRAME = "[sleep]"
+WAIT_FRAME = "[wait]"
+
+# Idle pool threads block in these; their samples are dropped
+IDLE_FILES = ("threading.py", "queue.py")
+
+
+def _thread_cpu_clock(ident: int) -> Optional[int]:
+    try:
+        return time.pthread_getcpuclockid(ident)
+    except (AttributeError, OSError, OverflowError):
+        return None  # Windows: samples are split into sleep vs CPU only
+
+
+class _CycleSampler:
+    """
+    Samples the stacks of the scanning thread, and of any other thread running
+    app code, every `interval` seconds from a background thread until stopped
+    """
+
+    def __init__(self, thread_id: int, root_depth: int, interval: float):
+        self.thread_id = thread_id
+        self.root_depth = root_depth
+        self.interval = interval
+        self.samples: Dict[str, Counter] = {}
+        self.weights: Dict[str, float] = {}
+        self.seconds = Counter()  # category -> seconds, scanning thread only
+        self.names = {}
+        self.clocks: Dict[int, Optional[int]] = {}
+        self.last_cpu: Dict[int, float] = {}
+        self.sleep_lines: Dict[Tuple[str, int], bool] = {}
+        self.stopping = threading.Event()
+        self.thread = threading.Thread(target=self._run, name="cycle-profiler", daemon=True)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stopping.set()
+        self.thread.join()
+
+    def _is_sleep_line(self, code, line: int) -> bool:
+        # time.sleep is C code and has no frame of its own; the calling line gives it away
+        key = (code.co_filename, line)
+        if key not in self.sleep_lines:
+            self.sleep_lines[key] = "sleep(" in linecache.getline(code.co_filename, line)
+        return self.sleep_lines[key]
+
+    def _run(self):
+        last = time.perf_counter()
+        own_id = threading.get_ident()
+        while not self.stopping.wait(self.interval):
+            now = time.perf_counter()
+            elapsed, last = now - last, now
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id != own_id:
+                    self._sample(thread_id, frame, elapsed)
+
+    def _sample(self, thread_id: int, frame, elapsed: float):
+        stack = []
+        while frame is not None:
+            stack.append(frame)
+            frame = frame.f_back
+        stack.reverse()
+        leaf = stack[-1]
+        main = thread_id == self.thread_id
+        if main:
+            stack = stack[max(0, self.root_depth - 1):]
+        elif (os.path.basename(leaf.f_code.co_filename) in IDLE_FILES
+              or not any(f.f_code.co_filename.startswith(APP_ROOT) for f in stack)):
+            return
+
+        if thread_id not in self.clocks:
+            self.clocks[thread_id] = _thread_cpu_clock(thread_id)
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            self.names[thread_id] = names.get(thread_id, str(thread_id))
+        on_cpu = True
+        clock = self.clocks[thread_id]
+        if clock is not None:
+            try:
+                cpu = time.clock_gettime(clock)
+            except OSError:
+                cpu = None
+            if cpu is not None:
+                previous = self.last_cpu.get(thread_id)
+                self.last_cpu[thread_id] = cpu
+                on_cpu = previous is None or cpu - previous >= elapsed / 2
+
+        frames = [f"{os.path.splitext(os.path.basename(f.f_code.co_filename))[0]}.{f.f_code.co_name}"
+                  f" ({f.f_code.co_filename}:{f.f_code.co_firstlineno})" for f in stack]
+        if self._is_sleep_line(leaf.f_code, leaf.f_lineno or 0):
+            category = "sleep"
+            frames.append(SLEEP_FRAME)
+        elif not on_cpu:
+            category = "wait"
+            frames.append(WAIT_FRAME)
+        else:
+            category = "cpu"
+
+        name = self.names[thread_id]
+        key = ";".join([name] + frames)
+        self.samples.setdefault(name, Counter())[key] += 1
+        self.weights[key] = self.weights.get(key, 0.0) + elapsed
+        if main:
+            self.seconds[category] += elapsed
+
+
+class CycleProfiler:
+    """
+    Opt-in sampling profiler for scan cycles. Wrap each cycle in
+    `with profiler.cycle():`; every `every`-th one is sampled and written to
+    `out_dir` as a collapsed-stack file (flamegraph.pl, speedscope, ...) or a
+    speedscope JSON profile. With `every=0`, or on the cycles in between,
+    cycle() is a counter increment and no sampler thread exists.
+
+    Samples of the scanning thread are split into CPU, sleep (a `sleep(` call
+    on the current line) and wait (off-CPU otherwise: network, locks, futures).
+    The wait split needs per-thread CPU clocks, so on Windows it is folded into CPU.
+    """
+
+    def __init__(self, every: int = 0, interval: float = 0.005, out_dir: str = PROFILE_DIR,
+                 fmt: str = "speedscope", name: str = "scan"):
+        if fmt not in ("speedscope", "collapsed"):
+            raise ValueError(f"Unknown profile format {fmt!r}")
+        self.every = every
+        self.interval = interval
+        self.out_dir = out_dir
+        self.fmt = fmt
+        self.name = name
+        self.cycles = 0
+        self.last_summary: Optional[Dict] = None
+        # One profiled cycle at a time; sessions sharing the profiler take turns
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, name: str = "scan") -> "CycleProfiler":
+        """Configured by VINTED_PROFILE_EVERY / _FORMAT / _INTERVAL; disabled when unset"""
+        return cls(
+            every=int(os.environ.get("VINTED_PROFILE_EVERY", "0") or 0),
+            interval=float(os.environ.get("VINTED_PROFILE_INTERVAL", "0.005")),
+            fmt=os.environ.get("VINTED_PROFILE_FORMAT", "speedscope"),
+            name=name,
+        )
+
+    @property
+    def enabled(self) -> bool:
+        return self.every > 0
+
+    def cycle(self):
+        self.cycles += 1
+        if not self.enabled or self.cycles % self.every or not self.lock.acquire(blocking=False):
+            return contextlib.nullcontext()
+        return self._profiled(self.cycles)
+
+    @contextlib.contextmanager
+    def _profiled(self, cycle: int):
+        # Frames above the `with` statement are the same in every sample; trim them
+        root_depth = 0
+        frame = sys._getframe(2)
+        while frame is not None:
+            root_depth += 1
+            frame = frame.f_back
+
+        sampler = _CycleSampler(threading.get_ident(), root_depth, self.interval)
+        wall_start, cpu_start = time.perf_counter(), time.thread_time()
+        sampler.start()
+        try:
+            yield
+        finally:
+            sampler.stop()
+            wall, cpu = time.perf_counter() - wall_start, time.thread_time() - cpu_start
+            try:
+                self._write(cycle, sampler, wall, cpu)
+            except Exception as e:
+                logger.error(f"Could not write the profile of cycle {cycle}: {str(e)}")
+            finally:
+                self.lock.release()
+
+    def _write(self, cycle: int, sampler: _CycleSampler, wall: float, cpu: float):
+        os.makedirs(self.out_dir, exist_ok=True)
+        stamp = time.strftime("%Y%m%d-%H%M%S")
+        base = os.path.join(self.out_dir, f"{self.name}-cycle{cycle:05d}-{stamp}")
+        if self.fmt == "collapsed":
+            path = base + ".collapsed"
+            with open(path, "w", encoding="utf-8") as f:
+                for counts in sampler.samples.values():
+                    for key, count in counts.most_common():
+                        f.write(f"{key} {count}\n")
+        else:
+            path = base + ".speedscope.json"
+            with open(path, "w", encoding="utf-8") as f:
+                json.dump(self._speedscope(sampler, f"{self.name} cycle {cycle}", wall), f)
+
+        # Scale the sampled off-CPU split to the exact wall / thread CPU totals
+        off_cpu = max(0.0, wall - cpu)
+        sleep_share = sampler.seconds["sleep"] / max(sampler.seconds["sleep"] + sampler.seconds["wait"], 1e-9)
+        self.last_summary = {
+            "cycle": cycle,
+            "wall": round(wall, 3),
+            "cpu": round(cpu, 3),
+            "sleep": round(off_cpu * sleep_share, 3),
+            "wait": round(off_cpu * (1 - sleep_share), 3),
+            "samples": sum(sum(counts.values()) for counts in sampler.samples.values()),
+            "path": path,
+        }
+        logger.info(f"Profiled {self.name} cycle {cycle}: wall {wall:.2f}s, cpu {cpu:.2f}s, "
+                    f"sleep {self.last_summary['sleep']:.2f}s, wait {self.last_summary['wait']:.2f}s -> {path}")
+
+    @staticmethod
+    def _speedscope(sampler: _CycleSampler, name: str, wall: float) -> Dict:
+        frames, frame_index = [], {}
+        profiles = []
+        for thread_name, counts in sampler.samples.items():
+            samples, weights = [], []
+            for key, count in counts.items():
+                stack = []
+                for label in key.split(";")[1:]:
+                    if label not in frame_index:
+                        frame_index[label] = len(frames)
+                        function, _, location = label.partition(" (")
+                        entry = {"name": function}
+                        if location:
+                            file, _, line = location.rstrip(")").rpartition(":")
+                            entry.update(file=file, line=int(line))
+                        frames.append(entry)
+                    stack.append(frame_index[label])
+                samples.append(stack)
+                weights.append(round(sampler.weights[key], 6))
+            profiles.append({
+                "type": "sampled", "name": thread_name, "unit": "seconds",
+                "startValue": 0, "endValue": round(sum(weights), 6),
+                "samples": samples, "weights": weights,
+            })
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "vinted-deal-monitor",
+            "activeProfileIndex": 0,
+            "shared": {"frames": frames},
+            "profiles": profiles,
+        }
+
+
+def summarize(path: str, top: int = 15) -> List[Tuple[str, int]]:
+    """Self-sample counts per leaf frame (and off-CPU marker) of a collapsed profile, hottest first"""
+    leaves = Counter()
+    with open(path, "r", encoding="utf-8") as f:
+        for line in f:
+            stack, _, count = line.rstrip("\n").rpartition(" ")
+            frames = stack.split(";")
+            if frames[-1] in (SLEEP_FRAME, WAIT_FRAME) and len(frames) > 2:
+                # Attribute off-CPU time to the frame that slept or blocked
+                frames[-2:] = [f"{frames[-2]} {frames[-1]}"]
+            leaves[frames[-1]] += int(count)
+    return leaves.most_common(top)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Show the hottest frames of a collapsed scan-cycle profile")
+    parser.add_argument("profile", help="A .collapsed file written by CycleProfiler")
+    parser.add_argument("--top", type=int, default=15)
+    args = parser.parse_args()
+    rows = [f"{count:8d}  {frame}" for frame, count in summarize(args.profile, args.top)]
+    logger.info(f"Top {len(rows)} frames of {args.profile}:\n" + "\n".join(rows))
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
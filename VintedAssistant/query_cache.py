@@ -0,0 +1,77 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, Optional
+
+
+class QueryCache:
+    """
+    Bounded LRU of catalog responses keyed by query parameters. Entries younger
+    than `ttl` are served without a request; older ones are revalidated with
+    their ETag / Last-Modified so unchanged pages come back as a cheap 304.
+    """
+
+    def __init__(self, ttl: float = 120, max_entries: int = 2000):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.entries: "OrderedDict[str, Dict]" = OrderedDict()
+        self.lock = threading.Lock()
+        self.hits = 0
+        self.revalidated = 0
+        self.misses = 0
+
+    @staticmethod
+    def key(params: Dict) -> str:
+        return hashlib.sha1(json.dumps(params, sort_keys=True).encode("utf-8")).hexdigest()
+
+    def get(self, params: Dict) -> Optional[Dict]:
+        """Cached entry for a query; counted as a hit when fresh and a miss when absent"""
+        with self.lock:
+            key = self.key(params)
+            entry = self.entries.get(key)
+            if entry is None:
+                self.misses += 1
+            else:
+                self.entries.move_to_end(key)
+                if self.is_fresh(entry):
+                    self.hits += 1
+            return entry
+
+    def is_fresh(self, entry: Dict) -> bool:
+        return time.time() - entry["fetched_at"] < self.ttl
+
+    def conditional_headers(self, entry: Dict) -> Dict:
+        headers = {}
+        if entry.get("etag"):
+            headers["If-None-Match"] = entry["etag"]
+        if entry.get("last_modified"):
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def put(self, params: Dict, data: Dict, etag: str = None, last_modified: str = None):
+        with self.lock:
+            key = self.key(params)
+            self.entries[key] = {
+                "data": data,
+                "etag": etag,
+                "last_modified": last_modified,
+                "fetched_at": time.time(),
+            }
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.max_entries:
+                self.entries.popitem(last=False)
+
+    def touch(self, params: Dict):
+        """Mark a revalidated (304) entry as fresh again"""
+        with self.lock:
+            entry = self.entries.get(self.key(params))
+            if entry is not None:
+                entry["fetched_at"] = time.time()
+            self.revalidated += 1
+
+    def stats(self) -> Dict:
+        with self.lock:
+            return {"entries": len(self.entries), "hits": self.hits,
+                    "revalidated": self.revalidated, "misses": self.misses}
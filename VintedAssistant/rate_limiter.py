@@ -0,0 +1,57 @@
+import threading
+import time
+
+
+class RateLimiter:
+    """
+    Thread-safe token bucket. `rate` is the sustained number of requests per second,
+    `burst` how many may go out back-to-back after an idle period.
+    """
+
+    def __init__(self, rate: float, burst: int = 1):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.last_refill = time.monotonic()
+        self.lock = threading.Lock()
+
+    @classmethod
+    def from_interval(cls, min_interval: float, burst: int = 1) -> "RateLimiter":
+        return cls(1.0 / min_interval if min_interval > 0 else float("inf"), burst)
+
+    def _refill(self, now: float):
+        self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+    def try_acquire(self) -> bool:
+        """Take a token without waiting; False if the budget is spent"""
+        with self.lock:
+            self._refill(time.monotonic())
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return True
+            return False
+
+    def acquire(self) -> float:
+        """
+        Block until a token is available and return how long we waited
+        """
+        waited = 0.0
+        while True:
+            with self.lock:
+                self._refill(time.monotonic())
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return waited
+                sleep_time = (1 - self.tokens) / self.rate
+            time.sleep(sleep_time)
+            waited += sleep_time
+
+    def set_rate(self, rate: float, burst: int = None):
+        """Change the budget in place without dropping tokens already earned"""
+        with self.lock:
+            self._refill(time.monotonic())
+            self.rate = rate
+            if burst is not None:
+                self.burst = burst
+                self.tokens = min(self.tokens, burst)
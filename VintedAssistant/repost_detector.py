@@ -0,0 +1,237 @@
+import io
+import logging
+import re
+import time
+import zlib
+from collections import OrderedDict, defaultdict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+import numpy as np
+
+try:
+    from PIL import Image
+except ImportError:  # Photo hashing is optional
+    Image = None
+
+logger = logging.getLogger(__name__)
+
+_MERSENNE_PRIME = (1 << 61) - 1
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+
+
+def normalize_title(title: str) -> str:
+    return _NON_ALNUM.sub(" ", (title or "").lower()).strip()
+
+
+def photo_hash(image_bytes: bytes) -> Optional[int]:
+    """
+    64-bit difference hash of an image, or None without Pillow / on bad data
+    """
+    if Image is None or not image_bytes:
+        return None
+    try:
+        image = Image.open(io.BytesIO(image_bytes)).convert("L").resize((9, 8))
+    except (OSError, ValueError):
+        return None
+    pixels = list(image.getdata())
+    bits = 0
+    for row in range(8):
+        for col in range(8):
+            bits = (bits << 1) | (pixels[row * 9 + col] > pixels[row * 9 + col + 1])
+    return bits
+
+
+class RepostDetector:
+    """
+    MinHash/LSH index over recent listings for spotting the same item reposted
+    under a new id. A candidate counts as a repost when its size and price match
+    and either the same seller posted a near-identical title or the photo hashes
+    are within `photo_distance` bits.
+
+    Title buckets are keyed per seller and size, since a title match only counts
+    for the same seller selling the same size; a generic title ("nike hoodie")
+    then can't crowd one seller's earlier listing out of a shared bucket. Photo
+    hashes are indexed by their eight bytes (multi-index hashing): two hashes
+    within 7 bits always share a byte, and every candidate is confirmed by its
+    Hamming distance.
+
+    Entries hold the signature as bytes and bucket keys as ints, about 1.4 KB per
+    listing with a photo hash, so the default 100k entries stay under 150 MB.
+    """
+
+    PHOTO_CHUNKS = 8
+
+    def __init__(self, num_perm: int = 32, bands: int = 8, threshold: float = 0.7,
+                 price_tolerance: float = 0.15, max_entries: int = 100000,
+                 max_age: float = 14 * 24 * 3600, photo_distance: int = 8,
+                 max_bucket_size: int = 64, photo_loader: Callable[[str], Optional[bytes]] = None,
+                 seed: int = 1):
+        if num_perm % bands:
+            raise ValueError("num_perm must be divisible by bands")
+        self.num_perm = num_perm
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.price_tolerance = price_tolerance
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.photo_distance = photo_distance
+        # Caps one seller's bucket (or the shared one for unknown sellers); keeps the newest
+        self.max_bucket_size = max_bucket_size
+        self.photo_loader = photo_loader
+
+        # Universal hash family h(x) = (a*x + b) mod p, fixed by the seed
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 31, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 31, size=num_perm, dtype=np.uint64)
+
+        # id -> (added, signature bytes, seller, size, price, photo hash)
+        self.entries: "OrderedDict[str, Tuple]" = OrderedDict()
+        # Most band keys hold a single listing, so a lone id is stored as is rather than in a list
+        self.buckets: Dict[int, Union[str, List[str]]] = {}
+        # (byte index, byte value) -> ids whose photo hash has that byte
+        self.photos: Dict[int, Dict[str, None]] = defaultdict(dict)
+
+    def signature(self, title: str) -> np.ndarray:
+        """MinHash signature over character 4-shingles of the normalized title"""
+        text = normalize_title(title)
+        shingles = {text[i:i + 4] for i in range(max(1, len(text) - 3))}
+        values = np.fromiter((zlib.crc32(s.encode("utf-8")) for s in shingles), dtype=np.uint64, count=len(shingles))
+        hashes = (values[:, None] * self._a + self._b) % _MERSENNE_PRIME
+        return hashes.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: bytes, seller, size: str) -> List[int]:
+        # Only kept as hashes; a collision just adds a candidate that fails the similarity check
+        prefix = f"{seller or ''}\0{size}\0".encode("utf-8")
+        width = self.rows * 4
+        return [hash(prefix + bytes([band]) + signature[band * width:(band + 1) * width])
+                for band in range(self.bands)]
+
+    def _photo_keys(self, phash: int) -> List[int]:
+        return [(chunk << 8) | ((phash >> (chunk * 8)) & 0xFF) for chunk in range(self.PHOTO_CHUNKS)]
+
+    def _evict(self, now: float):
+        # Entries are kept in insertion order, so the oldest are always at the front
+        while self.entries:
+            listing_id, entry = next(iter(self.entries.items()))
+            if len(self.entries) <= self.max_entries and now - entry[0] <= self.max_age:
+                break
+            self.entries.popitem(last=False)
+            for key in self._band_keys(entry[1], entry[2], entry[3]):
+                bucket = self.buckets.get(key)
+                if bucket == listing_id:
+                    del self.buckets[key]
+                elif isinstance(bucket, list) and listing_id in bucket:
+                    bucket.remove(listing_id)
+                    if not bucket:
+                        del self.buckets[key]
+            if entry[5] is not None:
+                for key in self._photo_keys(entry[5]):
+                    same_chunk = self.photos.get(key)
+                    if same_chunk is not None:
+                        same_chunk.pop(listing_id, None)
+                        if not same_chunk:
+                            del self.photos[key]
+
+    def _price_close(self, price: float, other: float) -> bool:
+        if not price or not other:
+            return True
+        return abs(price - other) <= self.price_tolerance * max(price, other)
+
+    def _photo_hash(self, listing: Dict) -> Optional[int]:
+        if self.photo_loader is None or not listing.get("photo"):
+            return None
+        return photo_hash(self.photo_loader(listing["photo"]))
+
+    def _photo_matches(self, phash: int) -> set:
+        """Ids whose photo hash is within photo_distance bits"""
+        matches = set()
+        for key in self._photo_keys(phash):
+            for candidate_id in self.photos.get(key, ()):
+                if candidate_id not in matches and (phash ^ self.entries[candidate_id][5]).bit_count() <= self.photo_distance:
+                    matches.add(candidate_id)
+        return matches
+
+    def check_and_add(self, listing: Dict, now: float = None) -> Optional[Dict]:
+        """
+        Index a listing and return the earlier listing it reposts, if any
+        """
+        now = now or time.time()
+        self._evict(now)
+
+        listing_id = str(listing.get("id"))
+        seller = listing.get("seller_id")
+        size = normalize_title(str(listing.get("size") or ""))
+        price = listing.get("price") or 0.0
+        signature = self.signature(listing.get("title") or "")
+        signature_bytes = signature.tobytes()
+        band_keys = self._band_keys(signature_bytes, seller, size)
+        phash = self._photo_hash(listing)
+
+        match = None
+        # This seller's similar titles in this size, the same from unknown sellers, and near-identical photos
+        lookup = band_keys + (self._band_keys(signature_bytes, None, size) if seller else [])
+        candidates = set()
+        for key in lookup:
+            bucket = self.buckets.get(key)
+            if isinstance(bucket, str):
+                candidates.add(bucket)
+            elif bucket:
+                candidates.update(bucket)
+        photo_matches = self._photo_matches(phash) if phash is not None else set()
+        candidates |= photo_matches
+        candidates.discard(listing_id)
+        for candidate_id in candidates:
+            _, other_signature, other_seller, other_size, other_price, _ = self.entries[candidate_id]
+            same_seller = bool(seller) and seller == other_seller
+            if seller and other_seller and not same_seller:
+                continue
+            # Another size of the same item is a separate listing, not a repost
+            if size and other_size and size != other_size:
+                continue
+            if not self._price_close(price, other_price):
+                continue
+            similarity = float(np.mean(signature == np.frombuffer(other_signature, dtype=np.uint32)))
+            photo_match = candidate_id in photo_matches
+            # Without seller ids a similar title alone could be a different copy of the same item
+            if (same_seller and similarity >= self.threshold) or photo_match:
+                if match is None or similarity > match["similarity"]:
+                    match = {"id": candidate_id, "similarity": round(similarity, 3), "photo_match": photo_match}
+
+        if listing_id not in self.entries:
+            self.entries[listing_id] = (now, signature_bytes, seller, size, price, phash)
+            for key in band_keys:
+                bucket = self.buckets.get(key)
+                if bucket is None:
+                    self.buckets[key] = listing_id
+                elif isinstance(bucket, str):
+                    self.buckets[key] = [bucket, listing_id]
+                else:
+                    bucket.append(listing_id)
+                    if len(bucket) > self.max_bucket_size:
+                        del bucket[0]
+            if phash is not None:
+                for key in self._photo_keys(phash):
+                    self.photos[key][listing_id] = None
+        return match
+
+    def filter_reposts(self, listings: List[Dict]) -> Tuple[List[Dict], List[Dict]]:
+        """
+        Split a batch into fresh listings and reposts (tagged with `repost_of`)
+        """
+        fresh, reposts = [], []
+        now = time.time()
+        for listing in listings:
+            match = self.check_and_add(listing, now)
+            if match:
+                repost = listing.copy()
+                repost["repost_of"] = match["id"]
+                reposts.append(repost)
+            else:
+                fresh.append(listing)
+        if reposts:
+            logger.info(f"Suppressed {len(reposts)} reposted listings")
+        return fresh, reposts
+
+    def __len__(self) -> int:
+        return len(self.entries)
@@ -0,0 +1,197 @@
+import json
+import re
+import time
+from functools import lru_cache
+from typing import Callable, Dict, List, Optional
+
+from brand_registry import get_brand_registry, normalize_brand
+
+_SIZE_NUMBER = re.compile(r"\d+(?:[.,]\d+)?")
+# Listing brands repeat a lot; normalize each distinct one once
+_brand_key = lru_cache(maxsize=4096)(normalize_brand)
+
+# Fields a rule may use. Cheap ones are checked before valuation, value ones after.
+CHEAP_FIELDS = {"name", "brands", "exclude_brands", "domains", "categories", "conditions", "teams",
+                "sizes", "size_min", "size_max", "price_min", "price_max",
+                "title_includes", "title_any", "title_excludes"}
+VALUE_FIELDS = {"min_profit", "min_profit_pct", "min_value"}
+# Fields holding a list of values; a bare string would turn into a set of letters
+LIST_FIELDS = {"brands", "exclude_brands", "domains", "categories", "conditions", "teams", "sizes",
+               "title_includes", "title_any", "title_excludes"}
+
+
+def _size_number(size) -> Optional[float]:
+    match = _SIZE_NUMBER.search(str(size or ""))
+    return float(match.group(0).replace(",", ".")) if match else None
+
+
+def _word_pattern(words: List[str]) -> "re.Pattern":
+    return re.compile(r"\b(?:" + "|".join(re.escape(w.lower()) for w in words) + r")\b")
+
+
+class DealRule:
+    """
+    One compiled rule. Example config:
+
+        {"name": "Jordan retros", "brands": ["Jordan"], "size_min": 9, "size_max": 10,
+         "title_includes": ["retro"], "title_excludes": ["replica"],
+         "min_profit": 20, "min_profit_pct": 25}
+    """
+
+    def __init__(self, config: Dict):
+        if not isinstance(config, dict):
+            raise ValueError(f"Each rule must be an object, got {json.dumps(config)}")
+        unknown = set(config) - CHEAP_FIELDS - VALUE_FIELDS
+        if unknown:
+            raise ValueError(f"Unknown rule field(s): {', '.join(sorted(unknown))}")
+        for field in sorted(LIST_FIELDS & set(config)):
+            if not isinstance(config[field], list):
+                raise ValueError(f"Rule field '{field}' must be a list, e.g. [{json.dumps(config[field])}]")
+        self.name = config.get("name") or "rule"
+        self.config = config
+        try:
+            self.cheap_predicates = self._compile_cheap(config)
+            self.value_predicates = self._compile_value(config)
+        except (TypeError, AttributeError) as e:
+            raise ValueError(f"Invalid value in rule '{self.name}': {str(e)}")
+
+        # Evaluation cost and selectivity, reported per rule
+        self.evaluated = 0
+        self.passed_cheap = 0
+        self.value_checks = 0
+        self.matched = 0
+        self.cheap_ns = 0
+        self.value_ns = 0
+
+    @staticmethod
+    def _compile_cheap(config: Dict) -> List[Callable[[Dict, Dict], bool]]:
+        """
+        Build predicates cheapest-first so most listings are rejected by a set lookup
+        """
+        predicates = []
+        # Brands compare by normalized canonical name, so "nike" and "Nike" both match
+        registry = get_brand_registry()
+        if config.get("brands"):
+            brands = frozenset(normalize_brand(registry.canonical(brand)) for brand in config["brands"])
+            predicates.append(lambda listing, attrs: _brand_key(listing.get("brand")) in brands)
+        if config.get("exclude_brands"):
+            excluded = frozenset(normalize_brand(registry.canonical(brand)) for brand in config["exclude_brands"])
+            predicates.append(lambda listing, attrs: _brand_key(listing.get("brand")) not in excluded)
+        if config.get("domains"):
+            domains = frozenset(config["domains"])
+            predicates.append(lambda listing, attrs: listing.get("domain", "co.uk") in domains)
+        if config.get("price_min") is not None:
+            price_min = float(config["price_min"])
+            predicates.append(lambda listing, attrs: listing.get("price", 0.0) >= price_min)
+        if config.get("price_max") is not None:
+            price_max = float(config["price_max"])
+            predicates.append(lambda listing, attrs: listing.get("price", 0.0) <= price_max)
+        if config.get("sizes"):
+            sizes = frozenset(str(size).strip().lower() for size in config["sizes"])
+            predicates.append(lambda listing, attrs: str(listing.get("size") or "").strip().lower() in sizes)
+        if config.get("size_min") is not None or config.get("size_max") is not None:
+            size_min = float(config.get("size_min", float("-inf")))
+            size_max = float(config.get("size_max", float("inf")))
+
+            def size_in_range(listing, attrs):
+                number = _size_number(listing.get("size"))
+                return number is not None and size_min <= number <= size_max
+            predicates.append(size_in_range)
+        if config.get("categories"):
+            categories = frozenset(config["categories"])
+            predicates.append(lambda listing, attrs: (listing.get("category") or attrs.get("category")) in categories)
+        if config.get("conditions"):
+            conditions = frozenset(config["conditions"])
+            predicates.append(lambda listing, attrs: attrs.get("condition") in conditions)
+        if config.get("teams"):
+            teams = frozenset(config["teams"])
+            predicates.append(lambda listing, attrs: (listing.get("team") or attrs.get("team")) in teams)
+        # Regex predicates last; they are the most expensive of the cheap checks
+        for word in config.get("title_includes", []):
+            pattern = _word_pattern([word])
+            predicates.append(lambda listing, attrs, pattern=pattern: pattern.search((listing.get("title") or "").lower()) is not None)
+        if config.get("title_any"):
+            pattern = _word_pattern(config["title_any"])
+            predicates.append(lambda listing, attrs: pattern.search((listing.get("title") or "").lower()) is not None)
+        if config.get("title_excludes"):
+            pattern = _word_pattern(config["title_excludes"])
+            predicates.append(lambda listing, attrs: pattern.search((listing.get("title") or "").lower()) is None)
+        return predicates
+
+    @staticmethod
+    def _compile_value(config: Dict) -> List[Callable[[Dict], bool]]:
+        predicates = []
+        if config.get("min_profit") is not None:
+            min_profit = float(config["min_profit"])
+            predicates.append(lambda deal: deal["estimated_profit"] >= min_profit)
+        if config.get("min_profit_pct") is not None:
+            min_pct = float(config["min_profit_pct"])
+            predicates.append(lambda deal: deal["profit_percentage"] >= min_pct)
+        if config.get("min_value") is not None:
+            min_value = float(config["min_value"])
+            predicates.append(lambda deal: deal["estimated_value"] >= min_value)
+        return predicates
+
+    def accepts_listing(self, listing: Dict, attrs: Dict) -> bool:
+        started = time.perf_counter_ns()
+        passed = all(predicate(listing, attrs) for predicate in self.cheap_predicates)
+        self.cheap_ns += time.perf_counter_ns() - started
+        self.evaluated += 1
+        self.passed_cheap += passed
+        return passed
+
+    def accepts_deal(self, deal: Dict) -> bool:
+        started = time.perf_counter_ns()
+        passed = all(predicate(deal) for predicate in self.value_predicates)
+        self.value_ns += time.perf_counter_ns() - started
+        self.value_checks += 1
+        self.matched += passed
+        return passed
+
+    def stats(self) -> Dict:
+        return {
+            "rule": self.name,
+            "evaluated": self.evaluated,
+            "passed_cheap": self.passed_cheap,
+            "matched": self.matched,
+            "cheap_us_per_listing": round(self.cheap_ns / 1000 / self.evaluated, 2) if self.evaluated else 0.0,
+            "value_us_per_deal": round(self.value_ns / 1000 / self.value_checks, 2) if self.value_checks else 0.0,
+        }
+
+
+class RuleSet:
+    """
+    A listing is a deal if any rule accepts it. DealAnalyzer calls prefilter()
+    on the whole batch first and only values listings some rule still wants.
+    """
+
+    def __init__(self, rules: List[DealRule]):
+        self.rules = rules
+
+    @classmethod
+    def from_config(cls, configs: List[Dict]) -> "RuleSet":
+        if not isinstance(configs, list):
+            raise ValueError("Rules must be a list of rule objects")
+        return cls([DealRule(config) for config in configs])
+
+    @classmethod
+    def from_json(cls, text: str) -> "RuleSet":
+        try:
+            return cls.from_config(json.loads(text))
+        except json.JSONDecodeError as e:
+            raise ValueError(f"Invalid rules JSON: {str(e)}")
+
+    def prefilter(self, listings: List[Dict], attributes: List[Dict]) -> List[List[DealRule]]:
+        """
+        For each listing, the rules whose cheap predicates it passes
+        """
+        return [
+            [rule for rule in self.rules if rule.accepts_listing(listing, attrs)]
+            for listing, attrs in zip(listings, attributes)
+        ]
+
+    def match(self, deal: Dict, candidates: List[DealRule]) -> List[str]:
+        return [rule.name for rule in candidates if rule.accepts_deal(deal)]
+
+    def stats(self) -> List[Dict]:
+        return [rule.stats() for rule in self.rules]
@@ -0,0 +1,347 @@
+import bisect
+import json
+import logging
+import os
+import random
+import re
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+from typing import Callable, Dict, List, Set, Tuple
+
+from brand_registry import get_brand_registry, normalize_brand
+from discord_notifier import DiscordNotifier
+
+logger = logging.getLogger(__name__)
+
+SAVED_SEARCHES_PATH = os.path.join("cache", "saved_searches.json")
+
+# Upper edges of the price bands (GBP) used by the price index
+PRICE_BANDS = [5, 10, 20, 35, 50, 75, 100, 150, 200, 300, 500, 1000]
+
+_NON_ALNUM = re.compile(r"[^a-z0-9]+")
+_SIZE_PREFIX = re.compile(r"^(?:uk|eu|us|size)\s*")
+_EMPTY: Set[str] = frozenset()
+# Listing brands are already canonical, so matching only needs the same normalization as rule_engine
+_brand_key = lru_cache(maxsize=4096)(normalize_brand)
+
+
+def normalize_text(text: str) -> str:
+    return _NON_ALNUM.sub(" ", (text or "").lower()).strip()
+
+
+def normalize_size(size) -> str:
+    return _SIZE_PREFIX.sub("", str(size or "").strip().lower())
+
+
+def price_band(price: float) -> int:
+    return bisect.bisect_right(PRICE_BANDS, price)
+
+
+def with_deals(listings: List[Dict], deals: List[Dict]) -> List[Dict]:
+    """
+    New listings to route to saved searches, with the analyzed deal swapped in
+    where there is one (so min_profit can be checked), plus deals on items that
+    were already known, like price drops
+    """
+    deals_by_id = {deal.get("id"): deal for deal in deals}
+    routed = [deals_by_id.pop(listing.get("id"), listing) for listing in listings]
+    return routed + list(deals_by_id.values())
+
+
+class SavedSearchIndex:
+    """
+    Percolator for saved searches: subscriptions are indexed by brand, size,
+    keyword and price band, and each incoming listing is checked only against the
+    subscriptions whose postings it hits instead of against all of them. Brands
+    are indexed by normalized canonical name, the same way deal rules match them.
+
+    A subscription looks like:
+        {"id": "u1-jordans", "subscriber": "user1", "webhook_url": "...",
+         "brands": ["Jordan"], "sizes": ["9", "9.5"], "keywords": ["retro"],
+         "price_min": 40, "price_max": 150, "min_profit": 15}
+    """
+
+    def __init__(self):
+        self.subscriptions: Dict[str, Dict] = {}
+        self.lock = threading.RLock()
+        self._reset_indexes()
+
+    def _reset_indexes(self):
+        self.by_brand: Dict[str, Set[str]] = defaultdict(set)
+        self.by_size: Dict[str, Set[str]] = defaultdict(set)
+        self.by_keyword: Dict[str, Set[str]] = defaultdict(set)
+        self.by_band: Dict[int, Set[str]] = defaultdict(set)
+        # Subscriptions without a constraint on a dimension match any value of it
+        self.any_brand: Set[str] = set()
+        self.any_size: Set[str] = set()
+        self.any_keyword: Set[str] = set()
+        # Postings each subscription was added to, so remove() doesn't scan every key
+        self.postings_of: Dict[str, List[Tuple[Dict, object]]] = {}
+
+    def add(self, subscription: Dict):
+        if not subscription.get("id"):
+            raise ValueError("Saved search needs an id")
+        subscription = dict(subscription)
+        subscription["sizes"] = [normalize_size(size) for size in subscription.get("sizes") or []]
+        subscription["keywords"] = [normalize_text(kw) for kw in subscription.get("keywords") or [] if normalize_text(kw)]
+        with self.lock:
+            if subscription["id"] in self.subscriptions:
+                self.remove(subscription["id"])
+            self.subscriptions[subscription["id"]] = subscription
+            self._index(subscription)
+
+    def _index(self, subscription: Dict):
+        sub_id = subscription["id"]
+        keys = []
+        registry = get_brand_registry()
+        for brand in subscription.get("brands") or []:
+            keys.append((self.by_brand, normalize_brand(registry.canonical(brand))))
+        if not subscription.get("brands"):
+            self.any_brand.add(sub_id)
+
+        for size in subscription["sizes"]:
+            keys.append((self.by_size, size))
+        if not subscription["sizes"]:
+            self.any_size.add(sub_id)
+
+        # One posting per subscription is enough: every keyword is required, so
+        # index the first word of the first keyword and verify the rest later
+        if subscription["keywords"]:
+            keys.append((self.by_keyword, subscription["keywords"][0].split()[0]))
+        else:
+            self.any_keyword.add(sub_id)
+
+        low = price_band(subscription.get("price_min") or 0)
+        high = price_band(subscription["price_max"]) if subscription.get("price_max") is not None else len(PRICE_BANDS)
+        for band in range(low, high + 1):
+            keys.append((self.by_band, band))
+
+        for postings, key in keys:
+            postings[key].add(sub_id)
+        self.postings_of[sub_id] = keys
+
+    def remove(self, sub_id: str):
+        with self.lock:
+            if self.subscriptions.pop(sub_id, None) is None:
+                return
+            for postings, key in self.postings_of.pop(sub_id, []):
+                posting = postings.get(key)
+                if posting is not None:
+                    posting.discard(sub_id)
+                    if not posting:
+                        del postings[key]
+            for wildcard in (self.any_brand, self.any_size, self.any_keyword):
+                wildcard.discard(sub_id)
+
+    def for_subscriber(self, subscriber: str) -> List[Dict]:
+        with self.lock:
+            return [sub for sub in self.subscriptions.values() if sub.get("subscriber") == subscriber]
+
+    def candidates(self, listing: Dict, title_words: Set[str]) -> Set[str]:
+        """
+        Subscriptions whose index postings all contain this listing
+        """
+        dimensions = [
+            (self.by_brand.get(_brand_key(listing.get("brand")), _EMPTY), self.any_brand),
+            (self.by_size.get(normalize_size(listing.get("size")), _EMPTY), self.any_size),
+            (self.by_band.get(price_band(listing.get("price") or 0), _EMPTY), _EMPTY),
+        ]
+        # Seed from the most selective dimension and narrow it with intersections,
+        # which only ever iterate the smaller side, so big wildcard sets are never copied
+        dimensions.sort(key=lambda dimension: len(dimension[0]) + len(dimension[1]))
+        posting, wildcard = dimensions[0]
+        result = posting | wildcard
+        for posting, wildcard in dimensions[1:]:
+            if not result:
+                return result
+            result = (result & posting) | (result & wildcard)
+
+        keyword_hits = result & self.any_keyword
+        for word in title_words:
+            posting = self.by_keyword.get(word)
+            if posting:
+                keyword_hits |= result & posting
+        return keyword_hits
+
+    @staticmethod
+    def _verify(subscription: Dict, deal: Dict, padded_title: str) -> bool:
+        price = deal.get("price") or 0.0
+        if subscription.get("price_min") is not None and price < subscription["price_min"]:
+            return False
+        if subscription.get("price_max") is not None and price > subscription["price_max"]:
+            return False
+        if subscription.get("min_profit") is not None and deal.get("estimated_profit", 0.0) < subscription["min_profit"]:
+            return False
+        return all(f" {keyword} " in padded_title for keyword in subscription["keywords"])
+
+    def match(self, deal: Dict) -> List[Dict]:
+        """Subscriptions matching one listing or deal"""
+        title = normalize_text(deal.get("title"))
+        padded_title = f" {title} "
+        with self.lock:
+            return [
+                self.subscriptions[sub_id]
+                for sub_id in self.candidates(deal, set(title.split()))
+                if self._verify(self.subscriptions[sub_id], deal, padded_title)
+            ]
+
+    def route(self, deals: List[Dict]) -> Dict[str, List[Dict]]:
+        """
+        Group a batch of listings or deals by the subscriptions they match
+        """
+        routed: Dict[str, List[Dict]] = defaultdict(list)
+        for deal in deals:
+            for subscription in self.match(deal):
+                routed[subscription["id"]].append(deal)
+        return routed
+
+    def save(self, path: str = SAVED_SEARCHES_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        with self.lock:
+            data = list(self.subscriptions.values())
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f, indent=2)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = SAVED_SEARCHES_PATH) -> "SavedSearchIndex":
+        index = cls()
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                for subscription in json.load(f):
+                    index.add(subscription)
+        return index
+
+    def __len__(self) -> int:
+        return len(self.subscriptions)
+
+
+class SubscriptionRouter:
+    """
+    Delivers routed listings to each subscriber's own notifier. Subscribers are
+    served in parallel; one subscriber's deals go out in order on one notifier,
+    so Discord rate limits apply per webhook.
+    """
+
+    def __init__(self, index: SavedSearchIndex, max_workers: int = 8,
+                 notifier_factory: Callable[[str], DiscordNotifier] = DiscordNotifier):
+        self.index = index
+        self.notifier_factory = notifier_factory
+        self.notifiers: Dict[str, DiscordNotifier] = {}
+        self.executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="subscriber-notify")
+
+    def _notifier(self, webhook_url: str) -> DiscordNotifier:
+        notifier = self.notifiers.get(webhook_url)
+        if notifier is None:
+            notifier = self.notifiers[webhook_url] = self.notifier_factory(webhook_url)
+        return notifier
+
+    def dispatch(self, deals: List[Dict]) -> Dict[str, int]:
+        """
+        Match a batch of listings and queue notifications; returns matches per subscription
+        """
+        routed = self.index.route(deals)
+        by_webhook: Dict[str, List[Dict]] = defaultdict(list)
+        for sub_id, sub_deals in routed.items():
+            webhook_url = self.index.subscriptions[sub_id].get("webhook_url")
+            if webhook_url:
+                by_webhook[webhook_url].extend(sub_deals)
+
+        for webhook_url, webhook_deals in by_webhook.items():
+            notifier = self._notifier(webhook_url)
+            self.executor.submit(self._send_all, notifier, webhook_deals)
+        return {sub_id: len(sub_deals) for sub_id, sub_deals in routed.items()}
+
+    @staticmethod
+    def _send_all(notifier: DiscordNotifier, deals: List[Dict]):
+        # A deal matching several of one subscriber's searches is sent once
+        sent = set()
+        for deal in deals:
+            if deal.get("id") not in sent:
+                sent.add(deal.get("id"))
+                notifier.send_deal(deal)
+
+    def close(self):
+        """Wait for queued notifications to go out"""
+        self.executor.shutdown(wait=True)
+
+
+class _CountingNotifier:
+    """Stands in for a webhook in the benchmark and only counts deliveries"""
+
+    def __init__(self, webhook_url: str):
+        self.webhook_url = webhook_url
+        self.sent = 0
+
+    def send_deal(self, deal: Dict) -> bool:
+        self.sent += 1
+        return True
+
+
+def benchmark(subscriptions: int = 10000, deals: int = 5000, seed: int = 7) -> Dict:
+    """
+    Throughput check for matching and routing at scale with synthetic subscriptions
+    """
+    from brand_registry import get_brand_registry
+
+    rng = random.Random(seed)
+    brands = get_brand_registry().names()
+    words = ["retro", "vintage", "hoodie", "jacket", "dunk", "low", "high", "box", "logo",
+             "puffer", "tee", "cargo", "shirt", "home", "away", "black", "white", "og"]
+    sizes = ["xs", "s", "m", "l", "xl", "8", "9", "9.5", "10", "11"]
+
+    index = SavedSearchIndex()
+    for i in range(subscriptions):
+        index.add({
+            "id": f"sub{i}",
+            "subscriber": f"user{i % 2000}",
+            "webhook_url": f"https://discord.invalid/webhooks/user{i % 2000}",
+            "brands": rng.sample(brands, rng.randint(1, 2)),
+            "sizes": rng.sample(sizes, rng.randint(0, 2)),
+            "keywords": rng.sample(words, rng.randint(1, 2)),
+            "price_min": rng.choice([None, 10, 20, 40]),
+            "price_max": rng.choice([None, 60, 120, 300]),
+        })
+
+    batch = [{
+        "id": i,
+        "title": " ".join(rng.sample(words, 4)),
+        "brand": rng.choice(brands),
+        "size": rng.choice(sizes),
+        "price": round(rng.uniform(5, 300), 2),
+        "estimated_profit": round(rng.uniform(5, 80), 2),
+    } for i in range(deals)]
+
+    started = time.perf_counter()
+    routed = index.route(batch)
+    elapsed = time.perf_counter() - started
+
+    # Full dispatch: matching, grouping per webhook and delivery on the router's threads
+    router = SubscriptionRouter(index, notifier_factory=_CountingNotifier)
+    dispatch_started = time.perf_counter()
+    router.dispatch(batch)
+    router.close()
+    dispatch_elapsed = time.perf_counter() - dispatch_started
+    deliveries = sum(notifier.sent for notifier in router.notifiers.values())
+    return {
+        "subscriptions": subscriptions,
+        "deals": deals,
+        "matches": sum(len(matched) for matched in routed.values()),
+        "seconds": round(elapsed, 3),
+        "deals_per_second": round(deals / elapsed) if elapsed else None,
+        "deliveries": deliveries,
+        "dispatch_seconds": round(dispatch_elapsed, 3),
+        "deliveries_per_second": round(deliveries / dispatch_elapsed) if dispatch_elapsed else None,
+    }
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    for count in (1000, 10000, 50000):
+        logger.info(f"Percolator benchmark: {benchmark(subscriptions=count)}")
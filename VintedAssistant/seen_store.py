@@ -0,0 +1,74 @@
+import logging
+import os
+import sqlite3
+import time
+from typing import Iterable, List
+
+logger = logging.getLogger(__name__)
+
+SEEN_DB_PATH = os.path.join("cache", "seen.db")
+
+
+class SeenStore:
+    """
+    Listing ids already processed, shared between processes through one SQLite file.
+    Claiming is atomic, so when two workers fetch the same listing only one of them
+    gets to analyze it.
+    """
+
+    def __init__(self, path: str = SEEN_DB_PATH, max_age: float = 7 * 24 * 3600):
+        self.path = path
+        self.max_age = max_age
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS seen ("
+            " listing_id TEXT PRIMARY KEY,"
+            " first_seen REAL NOT NULL)"
+        )
+        self.conn.execute("CREATE INDEX IF NOT EXISTS seen_first_seen ON seen(first_seen)")
+
+    def claim_new(self, listing_ids: Iterable) -> List[str]:
+        """
+        Record the given ids and return only those no process had seen before
+        """
+        now = time.time()
+        new_ids = []
+        # One write transaction per batch keeps lock hold times short
+        self.conn.execute("BEGIN IMMEDIATE")
+        try:
+            for listing_id in listing_ids:
+                if listing_id is None:
+                    continue
+                cursor = self.conn.execute(
+                    "INSERT OR IGNORE INTO seen (listing_id, first_seen) VALUES (?, ?)",
+                    (str(listing_id), now)
+                )
+                if cursor.rowcount:
+                    new_ids.append(str(listing_id))
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+        return new_ids
+
+    def filter_new(self, listings: List[dict]) -> List[dict]:
+        """Claim a batch of listings and keep the ones seen for the first time"""
+        new_ids = set(self.claim_new(listing.get("id") for listing in listings))
+        return [listing for listing in listings if str(listing.get("id")) in new_ids]
+
+    def prune(self) -> int:
+        """Forget ids older than max_age so the table stays bounded"""
+        cursor = self.conn.execute("DELETE FROM seen WHERE first_seen < ?", (time.time() - self.max_age,))
+        return cursor.rowcount
+
+    def __len__(self) -> int:
+        return self.conn.execute("SELECT COUNT(*) FROM seen").fetchone()[0]
+
+    def close(self):
+        self.conn.close()
@@ -0,0 +1,306 @@
+import argparse
+import logging
+import multiprocessing
+import os
+import queue
+import threading
+import time
+from typing import Callable, Dict, List, Optional
+
+from brand_registry import get_brand_registry
+from deal_store import DealStore
+from discord_notifier import DiscordNotifier
+from event_log import DEALS_TOPIC, LISTINGS_TOPIC, EventLog, EventLogFull
+from item_state import ITEM_STATE_DB_PATH, ItemStateStore
+from listing_archive import ListingArchive
+from profiler import CycleProfiler
+from repost_detector import RepostDetector
+from saved_searches import SAVED_SEARCHES_PATH, SavedSearchIndex, SubscriptionRouter, with_deals
+from seen_store import SEEN_DB_PATH, SeenStore
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logger = logging.getLogger(__name__)
+
+
+def build_shards(brands: List[str], search_terms: List[str] = None, group_size: int = 4) -> List[Dict]:
+    """
+    Split the monitored query space into independent shards: brand groups of
+    `group_size` (the same batching the dashboard uses) plus one shard per search term
+    """
+    shards = []
+    for i in range(0, len(brands), group_size):
+        shards.append({"id": len(shards), "brands": brands[i:i + group_size], "search_text": ""})
+    for term in search_terms or []:
+        shards.append({"id": len(shards), "brands": [], "search_text": term})
+    return shards
+
+
+def _worker_main(worker_id: int, settings: Dict, shard_queue, result_queue, deal_queue):
+    """
+    Worker process: fetch, dedupe against the shared seen-store and analyze shards
+    until a None sentinel arrives. Each worker owns its scraper session and analyzer;
+    new listings go to the coordinator with their deals so reposts are judged in one place.
+    """
+    # Imported here so each spawned process builds its own sessions and caches
+    from vinted_scraper import VintedScraper, real_listings
+    from deal_analyzer import DealAnalyzer
+
+    scraper = VintedScraper()
+    analyzer = DealAnalyzer(settings["profit_threshold"])
+    seen = SeenStore(settings["seen_db"])
+    item_state = ItemStateStore(settings["item_state_db"])
+    # File names are unique per flush, so every worker can write its own parts
+    archive = ListingArchive()
+    events = EventLog()
+    profiler = CycleProfiler(settings["profile_every"], fmt=settings["profile_format"], name=f"worker{worker_id}")
+
+    while True:
+        shard = shard_queue.get()
+        if shard is None:
+            break
+
+        result = {"shard": shard["id"], "cycle": shard["cycle"], "worker": worker_id, "listings": 0, "new": 0, "deals": 0}
+        with profiler.cycle():
+            try:
+                # Headless, so the fallback demo items are of no use; a failed scrape yields nothing
+                listings = real_listings(scraper.get_listings(
+                    min_price=settings["min_price"],
+                    max_price=settings["max_price"],
+                    brands=shard["brands"],
+                    search_text=shard["search_text"]
+                ))
+                archive.append(listings)
+                price_events = item_state.observe(listings)
+                fresh = seen.filter_new(listings)
+                # Only new and changed listings; the seen-store claim makes each one publish once
+                try:
+                    events.publish(LISTINGS_TOPIC, fresh + price_events)
+                except EventLogFull as e:
+                    logger.warning(f"Worker {worker_id} skipped {len(fresh) + len(price_events)} listing events: {str(e)}")
+                # Reposts are only dropped by the coordinator, so a repost can't dodge it by landing on another worker
+                deals = analyzer.find_deals(fresh) if fresh else []
+                price_drops = analyzer.find_price_drops(price_events) if price_events else []
+                if fresh or price_drops:
+                    deal_queue.put({"listings": fresh, "deals": deals, "price_drops": price_drops})
+                result.update(listings=len(listings), new=len(fresh), deals=len(deals) + len(price_drops))
+            except Exception as e:
+                logger.error(f"Worker {worker_id} failed on shard {shard['id']}: {str(e)}")
+                result["error"] = str(e)
+        result_queue.put(result)
+
+    seen.close()
+    item_state.close()
+    archive.close()
+    events.close()
+
+
+class ShardedMonitor:
+    """
+    Coordinator for the multi-process monitor. Shards are handed out through a
+    shared queue each cycle, so idle workers pick up the next shard; every deal is
+    funnelled into one queue drained by a single notifier thread, which also holds
+    the one repost index all workers' new listings are checked against.
+    """
+
+    def __init__(self, workers: int, brands: List[str], min_price: float, max_price: float,
+                 profit_threshold: float, webhook_url: str = "", search_terms: List[str] = None,
+                 seen_db: str = SEEN_DB_PATH, item_state_db: str = ITEM_STATE_DB_PATH, on_deal: Optional[Callable[[Dict], None]] = None,
+                 profile_every: int = 0, profile_format: str = "speedscope"):
+        self.workers = workers
+        self.shards = build_shards(brands, search_terms)
+        self.settings = {
+            "min_price": min_price,
+            "max_price": max_price,
+            "profit_threshold": profit_threshold,
+            "seen_db": seen_db,
+            "item_state_db": item_state_db,
+            # Each worker profiles every Nth shard it processes
+            "profile_every": profile_every,
+            "profile_format": profile_format,
+        }
+        self.notifier = DiscordNotifier(webhook_url)
+        # Open dashboards pick these up through the store version
+        self.deal_store = DealStore()
+        self.event_log = EventLog()
+        self.on_deal = on_deal
+        self.seen = SeenStore(seen_db)
+        self.item_state = ItemStateStore(item_state_db)
+        # Only touched by the notifier thread
+        self.reposts = RepostDetector()
+        # Saved searches are edited from the dashboard; reloaded when the file changes
+        self.saved_searches_mtime = None
+        self.subscription_router = SubscriptionRouter(SavedSearchIndex())
+        self._reload_saved_searches()
+
+        # Spawn keeps workers independent of the parent's sessions and works on Windows
+        self.ctx = multiprocessing.get_context("spawn")
+        self.shard_queue = self.ctx.Queue()
+        self.result_queue = self.ctx.Queue()
+        self.deal_queue = self.ctx.Queue()
+        self.processes = []
+        self.notifier_thread = None
+        self.deals_sent = 0
+        self.cycle = 0
+
+    def start(self):
+        for worker_id in range(self.workers):
+            process = self.ctx.Process(
+                target=_worker_main,
+                args=(worker_id, self.settings, self.shard_queue, self.result_queue, self.deal_queue),
+                daemon=True
+            )
+            process.start()
+            self.processes.append(process)
+
+        self.notifier_thread = threading.Thread(target=self._notify_loop, daemon=True)
+        self.notifier_thread.start()
+        logger.info(f"Started {self.workers} workers for {len(self.shards)} shards")
+
+    def _notify_loop(self):
+        """Single consumer of the deal queue, so Discord rate limiting and repost detection stay in one place"""
+        while True:
+            batch = self.deal_queue.get()
+            if batch is None:
+                break
+            new_listings, _ = self.reposts.filter_reposts(batch["listings"])
+            new_ids = {listing["id"] for listing in new_listings}
+            deals = [deal for deal in batch["deals"] if deal["id"] in new_ids] + batch["price_drops"]
+            for deal in deals:
+                self._handle_deal(deal)
+            # Saved searches follow every new listing, not only those over the deal threshold
+            subscriber_listings = with_deals(new_listings, deals)
+            if subscriber_listings:
+                self.subscription_router.dispatch(subscriber_listings)
+
+    def _reload_saved_searches(self):
+        try:
+            mtime = os.path.getmtime(SAVED_SEARCHES_PATH)
+        except OSError:
+            return
+        if mtime != self.saved_searches_mtime:
+            self.saved_searches_mtime = mtime
+            # Swapping the reference is atomic, so the notifier thread sees the old or the new index
+            self.subscription_router.index = SavedSearchIndex.load()
+
+    def _handle_deal(self, deal: Dict):
+        self.deal_store.add([deal])
+        try:
+            # Deals are rare enough to wait a little for a slow consumer
+            self.event_log.publish(DEALS_TOPIC, [deal], timeout=5)
+        except EventLogFull as e:
+            logger.warning(f"Skipped deal event for {deal.get('id')}: {str(e)}")
+        if self.on_deal:
+            self.on_deal(deal)
+        if self.notifier.send_deal(deal):
+            self.deals_sent += 1
+
+    def run_cycle(self, timeout: float = 600) -> Dict:
+        """
+        Dispatch every shard once and wait for all of them to finish
+        """
+        started = time.time()
+        self._reload_saved_searches()
+        # Shards that overran an earlier cycle's timeout still report; the id keeps them out of this one
+        self.cycle += 1
+        for shard in self.shards:
+            self.shard_queue.put(dict(shard, cycle=self.cycle))
+
+        stats = {"listings": 0, "new": 0, "deals": 0, "errors": 0}
+        deadline = started + timeout
+        pending = len(self.shards)
+        while pending:
+            try:
+                result = self.result_queue.get(timeout=max(0.0, deadline - time.time()))
+            except queue.Empty:
+                logger.warning(f"Timed out waiting for {pending} shard results")
+                self._drop_unstarted_shards()
+                break
+            if result["cycle"] != self.cycle:
+                logger.info(f"Dropped a late result for shard {result['shard']} from cycle {result['cycle']}")
+                continue
+            pending -= 1
+            stats["listings"] += result["listings"]
+            stats["new"] += result["new"]
+            stats["deals"] += result["deals"]
+            stats["errors"] += 1 if result.get("error") else 0
+
+        stats["duration"] = round(time.time() - started, 2)
+        self.seen.prune()
+        self.item_state.prune()
+        self.event_log.prune()
+        logger.info(f"Cycle finished: {stats}")
+        return stats
+
+    def _drop_unstarted_shards(self):
+        """Shards no worker picked up yet would otherwise run late, behind the next cycle's"""
+        dropped = 0
+        while True:
+            try:
+                self.shard_queue.get_nowait()
+            except queue.Empty:
+                break
+            dropped += 1
+        if dropped:
+            logger.warning(f"Dropped {dropped} shards of cycle {self.cycle} that never started")
+
+    def run_forever(self, scan_interval: float):
+        while True:
+            cycle_start = time.time()
+            self.run_cycle()
+            time.sleep(max(0.0, scan_interval - (time.time() - cycle_start)))
+
+    def stop(self):
+        for _ in self.processes:
+            self.shard_queue.put(None)
+        for process in self.processes:
+            process.join(timeout=30)
+        self.deal_queue.put(None)
+        if self.notifier_thread:
+            self.notifier_thread.join(timeout=30)
+        self.seen.close()
+        self.item_state.close()
+        self.subscription_router.close()
+        self.deal_store.close()
+        self.event_log.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run the Vinted monitor across several worker processes")
+    parser.add_argument("--workers", type=int, default=multiprocessing.cpu_count())
+    parser.add_argument("--brands", nargs="*", default=None, help="Brands to monitor (default: whole catalog)")
+    parser.add_argument("--search", nargs="*", default=[], help="Extra search terms, one shard each")
+    parser.add_argument("--min-price", type=float, default=0.0)
+    parser.add_argument("--max-price", type=float, default=1000.0)
+    parser.add_argument("--profit-threshold", type=float, default=5.0)
+    parser.add_argument("--interval", type=float, default=300)
+    parser.add_argument("--webhook", default="")
+    parser.add_argument("--seen-db", default=SEEN_DB_PATH)
+    parser.add_argument("--profile-every", type=int, default=0,
+                        help="Write a sampling profile of every Nth shard per worker to cache/profiles (0 = off)")
+    parser.add_argument("--profile-format", choices=["speedscope", "collapsed"], default="speedscope")
+    args = parser.parse_args()
+
+    monitor = ShardedMonitor(
+        workers=args.workers,
+        brands=args.brands or get_brand_registry().names(),
+        min_price=args.min_price,
+        max_price=args.max_price,
+        profit_threshold=args.profit_threshold,
+        webhook_url=args.webhook,
+        search_terms=args.search,
+        seen_db=args.seen_db,
+        profile_every=args.profile_every,
+        profile_format=args.profile_format,
+        on_deal=lambda deal: logger.info(f"Deal: {deal['title']} (£{deal['estimated_profit']:.2f} profit)")
+    )
+    monitor.start()
+    try:
+        monitor.run_forever(args.interval)
+    except KeyboardInterrupt:
+        logger.info("Stopping workers")
+    finally:
+        monitor.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,522 @@
+import argparse
+import itertools
+import json
+import logging
+import math
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+from urllib.parse import parse_qs, urlparse
+from urllib.request import ProxyHandler, build_opener
+from urllib.error import HTTPError
+
+from brand_registry import get_brand_registry
+from title_attributes import FOOTBALL_TEAMS, KIT_TYPES
+from vinted_domains import DEFAULT_DOMAIN, get_domain_config
+
+logger = logging.getLogger(__name__)
+
+# Relative listing volume per hour of day (UTC), evening-heavy like real traffic
+DEFAULT_ARRIVAL_CURVE = [0.3, 0.2, 0.15, 0.1, 0.1, 0.15, 0.3, 0.5, 0.7, 0.8, 0.9, 1.0,
+                         1.0, 0.95, 0.9, 0.9, 1.0, 1.1, 1.3, 1.5, 1.6, 1.4, 1.0, 0.6]
+
+ITEM_WORDS = {
+    "trainers": ["Dunk Low", "Air Force 1", "Air Max 90", "Retro 1", "Retro 4", "Gazelle", "Samba", "990v5", "Trainers"],
+    "hoodie": ["Hoodie", "Box Logo Hoodie", "Tech Fleece Hoodie", "Crewneck Sweatshirt", "Zip Hoodie"],
+    "jacket": ["Jacket", "Windbreaker", "Detroit Jacket", "Overshirt", "Coach Jacket"],
+    "puffer": ["Nuptse Puffer", "Puffer Jacket", "Down Jacket"],
+    "tee": ["T-Shirt", "Logo Tee", "Vintage Tee", "Graphic Tee"],
+    "joggers": ["Joggers", "Track Pants", "Cargo Joggers"],
+    "pants": ["Cargo Pants", "Double Knee Trousers", "Jeans", "Shorts"],
+    "hat": ["Cap", "Beanie", "Bucket Hat"],
+}
+CONDITION_WORDS = ["BNWT", "Brand new", "Excellent condition", "Worn once", "Good condition",
+                   "Used", "Some wear", "Faded", ""]
+APPAREL_SIZES = ["XS", "S", "M", "L", "XL", "XXL"]
+SHOE_SIZES = ["6", "7", "8", "8.5", "9", "9.5", "10", "11", "12"]
+
+
+class SyntheticListingGenerator:
+    """
+    Seeded generator of realistic-looking listings for load and scale tests.
+    The same seed and settings always produce the same stream: ids, titles,
+    prices, duplicates, reposts, price drops and arrival times.
+
+    - brand_mix: brand -> relative weight (default: Zipf over the brand catalog)
+    - price_sigma: spread of the log-normal listing price around each brand's
+      resale range, scaled by `discount` (most listings sit below resale value)
+    - duplicate_rate: share of emitted listings that repeat an earlier one as-is,
+      like overlapping result pages
+    - repost_rate: same seller, reworded title, new id, similar price
+    - price_drop_rate: an earlier listing again, same id, 5-30% cheaper
+    - football_share: share of football shirt listings
+    - listings_per_hour / arrival_curve: mean arrival rate and its hourly shape
+    """
+
+    def __init__(self, seed: int = 0, brand_mix: Dict[str, float] = None, price_sigma: float = 0.45,
+                 discount: float = 0.75, duplicate_rate: float = 0.05, repost_rate: float = 0.02,
+                 price_drop_rate: float = 0.01, football_share: float = 0.1, domain: str = DEFAULT_DOMAIN,
+                 listings_per_hour: float = 3000, arrival_curve: List[float] = None, history: int = 5000):
+        self.seed = seed
+        self.rng = random.Random(seed)
+        self.registry = get_brand_registry()
+        if brand_mix is None:
+            names = self.registry.names()
+            brand_mix = {name: 1.0 / (rank + 1) for rank, name in enumerate(names)}
+        self.brands = list(brand_mix)
+        self.brand_weights = list(itertools.accumulate(brand_mix.values()))
+        self.price_sigma = price_sigma
+        self.discount = discount
+        self.duplicate_rate = duplicate_rate
+        self.repost_rate = repost_rate
+        self.price_drop_rate = price_drop_rate
+        self.football_share = football_share
+        self.domain = domain
+        self.config = get_domain_config(domain)
+        self.listings_per_hour = listings_per_hour
+        curve = arrival_curve or DEFAULT_ARRIVAL_CURVE
+        mean = sum(curve) / len(curve)
+        self.arrival_curve = [value / mean for value in curve]
+
+        self.next_id = 1_000_000_000 + seed * 10_000_000
+        self.next_seller = 1
+        # Recent listings that duplicates, reposts and price drops are drawn from
+        self.history: List[Dict] = []
+        self.history_size = history
+        self.clock = 0.0
+        self.counts = {"new": 0, "duplicate": 0, "repost": 0, "price_drop": 0}
+
+    def _new_id(self) -> int:
+        self.next_id += 1
+        return self.next_id
+
+    def _remember(self, listing: Dict):
+        if len(self.history) < self.history_size:
+            self.history.append(listing)
+        else:
+            self.history[self.rng.randrange(self.history_size)] = listing
+
+    def _market_value(self, brand: str, category: str) -> float:
+        low, high = self.registry.price_range(brand) or (30.0, 70.0)
+        value = self.rng.uniform(low, high)
+        if category == "trainers":
+            value *= 1.3
+        elif category in ("hat", "tee"):
+            value *= 0.6
+        return value
+
+    def _fresh(self) -> Dict:
+        rng = self.rng
+        listing_id = self._new_id()
+        seller = self.next_seller if rng.random() < 0.7 or self.next_seller < 50 else rng.randrange(1, self.next_seller)
+        self.next_seller += 1
+
+        if rng.random() < self.football_share:
+            team = rng.choice(FOOTBALL_TEAMS)
+            # Fixed upper bound so the stream doesn't change with the calendar
+            year = rng.randint(1985, 2024)
+            brand = rng.choice(["Nike", "Adidas", "Puma", "Other"])
+            title = f"{team} {rng.choice(KIT_TYPES)} shirt {year}/{str(year + 1)[2:]} {rng.choice(CONDITION_WORDS)}".strip()
+            category, size = "football_shirt", rng.choice(APPAREL_SIZES)
+            market_value = rng.uniform(25, 90) * (1.8 if year < 2004 else 1.0)
+        else:
+            brand = rng.choices(self.brands, cum_weights=self.brand_weights)[0]
+            category = rng.choice(list(ITEM_WORDS))
+            title = f"{brand} {rng.choice(ITEM_WORDS[category])} {rng.choice(CONDITION_WORDS)}".strip()
+            size = rng.choice(SHOE_SIZES if category == "trainers" else APPAREL_SIZES)
+            market_value = self._market_value(brand, category)
+
+        price = max(1.0, round(market_value * self.discount * math.exp(rng.gauss(0, self.price_sigma)), 2))
+        listing = {
+            "id": listing_id,
+            "title": title,
+            "price": price,
+            "original_price": price,
+            "currency": self.config["currency"],
+            "domain": self.domain,
+            "brand": brand,
+            "size": size,
+            "seller_id": seller,
+            "url": self.config["item_url"].format(id=listing_id),
+            "photo": f"https://images.example.invalid/{listing_id}.jpg",
+            "availability": "active",
+            # Ground truth for backtests and training; not part of a real listing
+            "market_value": round(market_value, 2),
+        }
+        if category == "football_shirt":
+            listing["category"] = category
+        return listing
+
+    def next_listing(self) -> Tuple[str, Dict]:
+        """One listing and what kind of event it is (new/duplicate/repost/price_drop)"""
+        rng = self.rng
+        roll = rng.random()
+        if self.history and roll < self.duplicate_rate:
+            kind, listing = "duplicate", dict(rng.choice(self.history))
+        elif self.history and roll < self.duplicate_rate + self.repost_rate:
+            original = rng.choice(self.history)
+            listing = dict(original, id=self._new_id())
+            words = listing["title"].split()
+            if len(words) > 2 and rng.random() < 0.5:
+                words.pop()
+            listing["title"] = " ".join(words + [rng.choice(["", "!!", "- quick sale", "cheap"])]).strip()
+            listing["price"] = listing["original_price"] = round(original["price"] * rng.uniform(0.9, 1.05), 2)
+            listing["url"] = self.config["item_url"].format(id=listing["id"])
+            kind = "repost"
+        elif self.history and roll < self.duplicate_rate + self.repost_rate + self.price_drop_rate:
+            index = rng.randrange(len(self.history))
+            listing = dict(self.history[index])
+            listing["price"] = listing["original_price"] = round(listing["price"] * rng.uniform(0.7, 0.95), 2)
+            self.history[index] = listing
+            kind = "price_drop"
+        else:
+            kind, listing = "new", self._fresh()
+        if kind in ("new", "repost"):
+            self._remember(listing)
+        self.counts[kind] += 1
+        return kind, listing
+
+    def _rate(self, at: float) -> float:
+        """Arrivals per second at simulated time `at`"""
+        hour = int(at // 3600) % 24
+        return self.listings_per_hour / 3600 * self.arrival_curve[hour]
+
+    def stream(self, count: int = None, start: float = 0.0) -> Iterator[Tuple[float, Dict]]:
+        """
+        (simulated timestamp, listing) pairs with exponential gaps following the
+        arrival curve; endless when count is None
+        """
+        self.clock = max(self.clock, start)
+        emitted = 0
+        while count is None or emitted < count:
+            self.clock += self.rng.expovariate(self._rate(self.clock))
+            yield self.clock, self.next_listing()[1]
+            emitted += 1
+
+    def batch(self, size: int) -> List[Dict]:
+        return [self.next_listing()[1] for _ in range(size)]
+
+    def with_outcome(self, listing: Dict) -> Dict:
+        """Copy with a seeded `sold_price` around the market value, for backtests and training"""
+        sold = dict(listing)
+        outcome_rng = random.Random(f"{self.seed}:{listing['id']}:{listing['price']}")
+        sold["sold_price"] = round(listing["market_value"] * outcome_rng.uniform(0.75, 1.2), 2)
+        return sold
+
+
+def to_api_item(listing: Dict) -> Dict:
+    """A listing in the shape of a Vinted catalog API item"""
+    item = {
+        "id": listing["id"],
+        "title": listing["title"],
+        "price": {"amount": f"{listing['price']:.2f}", "currency_code": listing["currency"]},
+        "brand_title": listing["brand"],
+        "size_title": listing["size"],
+        "user": {"id": listing["seller_id"]},
+        "photos": [{"url": listing["photo"]}],
+        "is_reserved": False,
+        "is_closed": False,
+    }
+    return item
+
+
+class StubVintedServer:
+    """
+    Local HTTP stand-in for the Vinted catalog API, fed by a generator. Each
+    catalog request returns the next page of synthetic items within the
+    requested price range. Point a scraper at it with VINTED_BASE_URL=<url>.
+
+    With `inventory` set, the stub instead serves a fixed snapshot of that
+    many listings, newest first, with Vinted's `pagination` block and no
+    pages past `max_pages`, which is what a backfill crawl has to work around.
+    """
+
+    def __init__(self, generator: SyntheticListingGenerator, host: str = "127.0.0.1", port: int = 0,
+                 error_rate: float = 0.0, latency: float = 0.0, inventory: int = 0, max_pages: int = 10):
+        self.generator = generator
+        self.error_rate = error_rate
+        self.latency = latency
+        self.max_pages = max_pages
+        self.inventory = sorted(generator.batch(inventory), key=lambda listing: listing["id"], reverse=True) if inventory else None
+        self.lock = threading.Lock()
+        self.requests_served = 0
+        # Failures are seeded too, so retry behaviour is reproducible
+        self.error_rng = random.Random(generator.seed + 1)
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                url = urlparse(self.path)
+                if url.path == "/catalog":
+                    self.send_response(200)
+                    self.send_header("Set-Cookie", "_vinted_fr_session=stub; Path=/")
+                    self.send_header("Content-Type", "text/html")
+                    self.end_headers()
+                    self.wfile.write(b"<html>stub</html>")
+                    return
+                if url.path != "/api/v2/catalog/items":
+                    self.send_error(404)
+                    return
+                status, body = stub.handle_catalog(parse_qs(url.query))
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def handle_catalog(self, query: Dict[str, List[str]]) -> Tuple[int, bytes]:
+        if self.latency:
+            time.sleep(self.latency)
+        per_page = int(query.get("per_page", ["96"])[0])
+        price_from = float(query.get("price_from", ["0"])[0] or 0)
+        price_to = float(query.get("price_to", ["0"])[0] or 0) or float("inf")
+        with self.lock:
+            self.requests_served += 1
+            if self.error_rng.random() < self.error_rate:
+                return 429, b'{"error": "rate limited"}'
+            if self.inventory is not None:
+                return 200, self._snapshot_page(price_from, price_to, int(query.get("page", ["1"])[0]), per_page)
+            items = []
+            # Bounded so a very narrow price range can't spin forever
+            for _ in range(per_page * 20):
+                if len(items) >= per_page:
+                    break
+                listing = self.generator.next_listing()[1]
+                if price_from <= listing["price"] <= price_to:
+                    items.append(to_api_item(listing))
+        return 200, json.dumps({"items": items}).encode("utf-8")
+
+    def _snapshot_page(self, price_from: float, price_to: float, page: int, per_page: int) -> bytes:
+        matches = [listing for listing in self.inventory if price_from <= listing["price"] <= price_to]
+        start = (page - 1) * per_page
+        items = matches[start:start + per_page] if page <= self.max_pages else []
+        pagination = {
+            "current_page": page,
+            "total_pages": -(-len(matches) // per_page),
+            "total_entries": len(matches),
+            "per_page": per_page,
+        }
+        return json.dumps({"items": [to_api_item(listing) for listing in items], "pagination": pagination}).encode("utf-8")
+
+    def start(self) -> "StubVintedServer":
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-vinted", daemon=True)
+        self.thread.start()
+        logger.info(f"Stub Vinted API listening on {self.url}")
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class StubProxy:
+    """
+    Local forward proxy for exercising the egress pool. It relays requests to
+    their target (normally a StubVintedServer) until told to misbehave:
+    `mode` "blocked" answers 403, "rate_limited" 429 and "captcha" an HTML
+    challenge page, like Vinted does to a flagged IP. Put its url in
+    VINTED_PROXIES, or pass it to EgressPool directly.
+    """
+
+    MODES = ("ok", "blocked", "rate_limited", "captcha")
+
+    def __init__(self, mode: str = "ok", host: str = "127.0.0.1", port: int = 0):
+        if mode not in self.MODES:
+            raise ValueError(f"Unknown proxy mode {mode!r}")
+        self.mode = mode
+        self.lock = threading.Lock()
+        self.requests_seen = 0
+        # Never route the relayed request through another proxy from the environment
+        opener = build_opener(ProxyHandler({}))
+        proxy = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def log_message(self, format, *args):
+                pass
+
+            def do_GET(self):
+                with proxy.lock:
+                    proxy.requests_seen += 1
+                if proxy.mode == "blocked":
+                    self.send_error(403)
+                    return
+                if proxy.mode == "rate_limited":
+                    self.send_error(429)
+                    return
+                if proxy.mode == "captcha":
+                    self.send_response(200)
+                    self.send_header("Content-Type", "text/html")
+                    self.end_headers()
+                    self.wfile.write(b"<html><body>Please verify you are a human</body></html>")
+                    return
+                try:
+                    upstream = opener.open(self.path, timeout=15)
+                    status, headers, body = upstream.status, upstream.headers, upstream.read()
+                except HTTPError as e:
+                    status, headers, body = e.code, e.headers, e.read()
+                self.send_response(status)
+                for name in ("Content-Type", "Set-Cookie", "ETag", "Last-Modified"):
+                    for value in headers.get_all(name) or []:
+                        self.send_header(name, value)
+                self.end_headers()
+                self.wfile.write(body)
+
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "StubProxy":
+        self.thread = threading.Thread(target=self.server.serve_forever, name="stub-proxy", daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+def run_egress_drill(proxies: int = 3, bad_mode: str = "blocked", queries: int = 20, seed: int = 0) -> Dict:
+    """
+    Run catalog queries through an egress pool of local stub proxies, one of
+    which misbehaves, and report how the pool spread and quarantined traffic.
+    Every proxy then goes bad to check the scraper waits or gives up instead
+    of falling back to another route.
+    """
+    import os
+    from egress_pool import EgressPool
+    from vinted_scraper import VintedScraper
+
+    server = StubVintedServer(SyntheticListingGenerator(seed=seed)).start()
+    stubs = [StubProxy(bad_mode if i == 0 else "ok").start() for i in range(proxies)]
+    previous_base_url = os.environ.get("VINTED_BASE_URL")
+    os.environ["VINTED_BASE_URL"] = server.url
+    try:
+        scraper = VintedScraper()
+        scraper.retry_delay = 0
+        scraper.egress_pool = EgressPool([stub.url for stub in stubs], include_direct=False,
+                                         min_request_interval=0.05, max_wait=0)
+        answered = sum(1 for _ in range(queries) if scraper._fetch_catalog({"per_page": "20"}) is not None)
+
+        for stub in stubs:
+            stub.mode = bad_mode
+        served_before = server.requests_served
+        for _ in range(scraper.retry_count * proxies):
+            scraper._fetch_catalog({"per_page": "20"})
+        leaked = server.requests_served - served_before
+
+        return {
+            "queries": queries,
+            "answered": answered,
+            "requests_per_proxy": [stub.requests_seen for stub in stubs],
+            "pool": scraper.egress_pool.stats(),
+            "requests_reaching_api_while_all_bad": leaked,
+        }
+    finally:
+        if previous_base_url is None:
+            os.environ.pop("VINTED_BASE_URL", None)
+        else:
+            os.environ["VINTED_BASE_URL"] = previous_base_url
+        for stub in stubs:
+            stub.stop()
+        server.stop()
+
+
+def run_pipeline_benchmark(count: int, batch_size: int = 500, seed: int = 0) -> Dict:
+    """
+    Push `count` synthetic listings through dedup, repost detection and deal
+    analysis in scan-sized batches and time each stage
+    """
+    from deal_analyzer import DealAnalyzer
+    from repost_detector import RepostDetector
+
+    logging.getLogger("ebay_scraper").setLevel(logging.WARNING)
+    random.seed(seed)
+    generator = SyntheticListingGenerator(seed=seed)
+    analyzer = DealAnalyzer()
+    reposts = RepostDetector()
+    seen = set()
+    timings = {"generate": 0.0, "dedup": 0.0, "reposts": 0.0, "analyze": 0.0}
+    deals = 0
+    for _ in range(0, count, batch_size):
+        started = time.perf_counter()
+        batch = generator.batch(batch_size)
+        timings["generate"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        new = [listing for listing in batch if listing["id"] not in seen]
+        seen.update(listing["id"] for listing in new)
+        timings["dedup"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        fresh, _ = reposts.filter_reposts(new)
+        timings["reposts"] += time.perf_counter() - started
+
+        started = time.perf_counter()
+        deals += len(analyzer.find_deals(fresh))
+        timings["analyze"] += time.perf_counter() - started
+
+    total = sum(timings.values())
+    return {"listings": count, "deals": deals, "events": generator.counts,
+            "seconds": {stage: round(value, 2) for stage, value in timings.items()},
+            "listings_per_second": round(count / total) if total else None}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Seeded synthetic Vinted workloads")
+    parser.add_argument("command", choices=["bench", "serve", "dump", "egress"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--count", type=int, default=100000)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="Share of stub API requests answered with 429")
+    parser.add_argument("--inventory", type=int, default=0,
+                        help="Serve a fixed, paginated snapshot of this many listings (for backfill runs)")
+    parser.add_argument("--max-pages", type=int, default=10, help="Deepest page the snapshot serves")
+    parser.add_argument("--out", default="synthetic_listings.jsonl", help="Output file for dump")
+    parser.add_argument("--proxies", type=int, default=3, help="Stub proxies in the egress drill")
+    parser.add_argument("--bad-mode", default="blocked", choices=StubProxy.MODES[1:],
+                        help="How the misbehaving stub proxy answers")
+    args = parser.parse_args()
+
+    if args.command == "bench":
+        logger.info(f"Pipeline benchmark: {run_pipeline_benchmark(args.count, args.batch_size, args.seed)}")
+    elif args.command == "egress":
+        logger.info(f"Egress drill: {run_egress_drill(args.proxies, args.bad_mode, seed=args.seed)}")
+    elif args.command == "serve":
+        server = StubVintedServer(SyntheticListingGenerator(seed=args.seed), port=args.port,
+                                  error_rate=args.error_rate, inventory=args.inventory,
+                                  max_pages=args.max_pages).start()
+        logger.info(f"Run the monitor with VINTED_BASE_URL={server.url}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            server.stop()
+    else:
+        # Listings with seeded outcomes, ready for backtest.py and valuation.py
+        generator = SyntheticListingGenerator(seed=args.seed)
+        with open(args.out, "w", encoding="utf-8") as f:
+            for _, listing in generator.stream(args.count):
+                f.write(json.dumps(generator.with_outcome(listing)) + "\n")
+        logger.info(f"Wrote {args.count} listings to {args.out} ({generator.counts})")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,222 @@
+import re
+import time
+from functools import lru_cache
+from typing import Dict, List, Optional
+
+# Canonical team name -> aliases sellers actually write in titles
+FOOTBALL_TEAM_ALIASES = {
+    "Manchester United": ["man utd", "man united", "manchester utd", "mufc"],
+    "Liverpool": ["lfc"],
+    "Arsenal": ["afc arsenal", "gunners"],
+    "Chelsea": ["cfc"],
+    "Manchester City": ["man city", "mcfc"],
+    "Tottenham": ["tottenham hotspur", "spurs", "thfc"],
+    "Newcastle": ["newcastle united", "nufc"],
+    "Aston Villa": ["avfc"],
+    "Everton": [],
+    "West Ham": ["west ham united", "whufc"],
+    "Leeds United": ["leeds"],
+    "Celtic": [],
+    "Rangers": ["rangers fc", "glasgow rangers"],
+    "Barcelona": ["barca", "fc barcelona", "fcb"],
+    "Real Madrid": [],
+    "Atletico Madrid": ["atletico", "atlético madrid"],
+    "Bayern Munich": ["bayern", "bayern munchen", "bayern münchen"],
+    "Borussia Dortmund": ["dortmund", "bvb"],
+    "Juventus": ["juve"],
+    "AC Milan": ["milan"],
+    "Inter Milan": ["inter", "internazionale"],
+    "Napoli": ["ssc napoli"],
+    "Roma": ["as roma"],
+    "PSG": ["paris saint germain", "paris saint-germain", "paris sg"],
+    "Marseille": ["olympique marseille"],
+    "Ajax": [],
+    "Benfica": [],
+    "Porto": ["fc porto"],
+    "England": [],
+    "Brazil": ["brasil"],
+    "Argentina": [],
+    "France": [],
+    "Germany": [],
+    "Italy": ["italia"],
+    "Netherlands": ["holland"],
+    "Portugal": [],
+    "Spain": [],
+}
+FOOTBALL_TEAMS = list(FOOTBALL_TEAM_ALIASES)
+
+# Team names that are also everyday words or places ("Power Rangers", "Made in
+# Italy"); these only make a football shirt alongside a kit word or a season
+AMBIGUOUS_TEAM_ALIASES = {
+    "rangers", "inter", "milan", "roma", "porto", "ajax", "celtic", "leeds", "everton",
+    "england", "brazil", "brasil", "argentina", "france", "germany", "italy", "italia",
+    "netherlands", "holland", "portugal", "spain",
+}
+
+KIT_TYPE_PATTERNS = {
+    "home": r"home",
+    "away": r"away",
+    "third": r"third|3rd",
+    "training": r"training|pre[- ]?match|warm[- ]?up",
+    "goalkeeper": r"goalkeeper|keeper|gk",
+}
+KIT_TYPES = list(KIT_TYPE_PATTERNS)
+
+# First match wins, so more specific conditions come first
+CONDITION_PATTERNS = [
+    ("new_with_tags", r"bnwt|nwt|new with tags?|tags attached|with tags"),
+    ("excellent", r"excellent|like new|mint|immaculate|barely worn|worn once|vgc"),
+    # Bare "new" is also the start of brand and place names
+    ("new", r"brand new|bnib|deadstock|unworn|never worn|new(?! balance| era| york| look| rock| zealand)"),
+    ("good", r"good|great condition|gc"),
+    ("worn", r"worn|used|some wear|showing age|fair"),
+    ("poor", r"poor|damaged|stained|stains?|ripped|holes?|faded"),
+]
+
+# Item categories in priority order; football shirts are decided separately
+CATEGORY_PATTERNS = [
+    ("trainers", r"trainers?|sneakers?|shoes?|dunks?|air force 1|af1|retro ?\d{1,2}|jordan ?\d{1,2}|yeezy ?\d{3}|ultraboost|gazelle|samba|air max"),
+    ("puffer", r"puffer|nuptse|down jacket"),
+    ("jacket", r"jacket|windbreaker|overshirt|coat|gilet|anorak"),
+    ("hoodie", r"hoodie|hooded|sweatshirt|crewneck|jumper"),
+    ("tee", r"t-shirt|tshirt|tee"),
+    ("shirt", r"shirt|polo|jersey|kit|top"),
+    ("joggers", r"joggers|track ?pants|sweatpants|trackies"),
+    ("pants", r"pants|trousers|cargos?|jeans|shorts"),
+    ("hat", r"hat|cap|beanie|bucket"),
+]
+
+# Model / line tokens that move resale prices
+MODEL_PATTERN = re.compile(
+    r"\b(retro ?\d{1,2}|jordan ?\d{1,2}|air max ?\d{0,3}|air force 1|af1|dunk|box logo|bogo|"
+    r"nuptse|ultraboost|gazelle|samba|yeezy(?: ?\d{3})?|tech fleece|ghost piece|nylon metal|"
+    r"irongate|alcatraz|retro|vintage|limited edition|special edition|player issue|"
+    r"jordan|nike|adidas|supreme|yeezy)\b"
+)
+
+# "2003/04", "2003-2004"; the short "03/04" form is checked against its context
+SEASON_PATTERN = re.compile(r"\b((?:19|20)\d{2})\s*[/-]\s*((?:19|20)?\d{2})\b")
+SHORT_SEASON_PATTERN = re.compile(r"\b(\d{2})\s*[/-]\s*(\d{2})\b")
+# Age and size ranges look just like short seasons ("Age 10-11", "38-40")
+RANGE_CONTEXT_PATTERN = re.compile(
+    r"\b(?:age|ages|aged|size|sizes|sz|waist|uk|eu|us)\s*$|^\s*(?:y|yr|yrs|years?|m|months?|cm|in)\b"
+)
+YEAR_PATTERN = re.compile(r"\b(19[5-9]\d|20[0-4]\d)\b")
+_TRAILING_NUMBER = re.compile(r"^(.*?) ?\d+$")
+
+
+def _alternation(options: List[str]) -> str:
+    # Longest first so "man city" wins over "man"
+    return "|".join(sorted(options, key=len, reverse=True))
+
+
+_TEAM_LOOKUP = {}
+for _team, _aliases in FOOTBALL_TEAM_ALIASES.items():
+    for _alias in [_team.lower()] + _aliases:
+        _TEAM_LOOKUP[_alias] = _team
+TEAM_PATTERN = re.compile(r"\b(" + _alternation([re.escape(alias) for alias in _TEAM_LOOKUP]) + r")\b")
+KIT_PATTERN = re.compile("|".join(f"(?P<{name}>\\b(?:{pattern})\\b)" for name, pattern in KIT_TYPE_PATTERNS.items()))
+# "t-shirt" / "t shirt" are tees, not football shirts
+FOOTBALL_GARMENT_PATTERN = re.compile(r"\b(?:(?<!t-)(?<!t )shirt|jersey|kit|top)\b")
+FOOTBALL_CONTEXT_PATTERN = re.compile(r"\b(?:football|soccer|jersey|kit|fc|match ?worn|player issue)\b")
+CONDITION_REGEXES = [(name, re.compile(rf"\b(?:{pattern})\b")) for name, pattern in CONDITION_PATTERNS]
+CATEGORY_REGEXES = [(name, re.compile(rf"\b(?:{pattern})\b")) for name, pattern in CATEGORY_PATTERNS]
+
+
+def _is_football_context(title: str) -> bool:
+    return bool(KIT_PATTERN.search(title) or FOOTBALL_GARMENT_PATTERN.search(title)
+                or FOOTBALL_CONTEXT_PATTERN.search(title) or TEAM_PATTERN.search(title))
+
+
+def extract_season_year(title: str) -> Optional[int]:
+    """
+    Season start year from titles like "2003/04", "03-04" or "2010". The short
+    form only counts as a season when the years are consecutive, the title is
+    about football and it isn't an age or size range.
+    """
+    title = title.lower()
+    for match in SEASON_PATTERN.finditer(title):
+        start, end = int(match.group(1)), int(match.group(2))
+        if end % 100 == (start + 1) % 100:
+            return start
+    if _is_football_context(title):
+        for match in SHORT_SEASON_PATTERN.finditer(title):
+            start, end = int(match.group(1)), int(match.group(2))
+            if end != (start + 1) % 100:
+                continue
+            if RANGE_CONTEXT_PATTERN.search(title[:match.start()]) or RANGE_CONTEXT_PATTERN.search(title[match.end():]):
+                continue
+            return start + (2000 if start <= time.localtime().tm_year % 100 else 1900)
+    match = YEAR_PATTERN.search(title)
+    return int(match.group(1)) if match else None
+
+
+class TitleAttributeExtractor:
+    """
+    Turns listing titles into structured attributes (team, season year, kit type,
+    condition, item category, model tokens) with precompiled patterns. Results are
+    memoized per title and shared between callers, so treat them as read-only.
+    """
+
+    def __init__(self, cache_size: int = 50000):
+        self.extract = lru_cache(maxsize=cache_size)(self._extract)
+
+    def _extract(self, title: str) -> Dict:
+        text = (title or "").lower()
+
+        match = TEAM_PATTERN.search(text)
+        team_alias = match.group(1) if match else None
+        team = _TEAM_LOOKUP[team_alias] if match else None
+
+        match = KIT_PATTERN.search(text)
+        kit_type = match.lastgroup if match else None
+
+        condition = next((name for name, regex in CONDITION_REGEXES if regex.search(text)), None)
+
+        model_tokens = []
+        for token in MODEL_PATTERN.findall(text):
+            token = token.replace("  ", " ")
+            if token not in model_tokens:
+                model_tokens.append(token)
+            # "retro 4" also counts as "retro"
+            base = _TRAILING_NUMBER.match(token)
+            if base and base.group(1) and base.group(1) not in model_tokens:
+                model_tokens.append(base.group(1))
+
+        year = extract_season_year(text)
+        if team and (kit_type or FOOTBALL_GARMENT_PATTERN.search(text)) and (
+                team_alias not in AMBIGUOUS_TEAM_ALIASES or kit_type or year
+                or FOOTBALL_CONTEXT_PATTERN.search(text)):
+            category = "football_shirt"
+        else:
+            category = next((name for name, regex in CATEGORY_REGEXES if regex.search(text)), None)
+            if team_alias in AMBIGUOUS_TEAM_ALIASES:
+                # "Made in Italy" names a country, not a team
+                team = None
+
+        return {
+            "team": team,
+            "year": year,
+            "kit_type": kit_type,
+            "condition": condition,
+            "category": category,
+            "model_tokens": tuple(model_tokens),
+        }
+
+    def extract_batch(self, titles: List[str]) -> List[Dict]:
+        """
+        Extract attributes for a batch, running each distinct title through the
+        patterns only once
+        """
+        return [self.extract(title or "") for title in titles]
+
+
+_extractor: Optional[TitleAttributeExtractor] = None
+
+
+def get_title_extractor() -> TitleAttributeExtractor:
+    """Process-wide extractor so the memo is shared by every valuation path"""
+    global _extractor
+    if _extractor is None:
+        _extractor = TitleAttributeExtractor()
+    return _extractor
@@ -0,0 +1,353 @@
+import abc
+import argparse
+import csv
+import json
+import logging
+import os
+import threading
+import time
+import zlib
+from typing import Callable, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from brand_registry import get_brand_registry
+from title_attributes import CATEGORY_PATTERNS, CONDITION_PATTERNS, FOOTBALL_TEAMS, get_title_extractor
+
+logger = logging.getLogger(__name__)
+
+VALUATION_MODEL_PATH = os.path.join("cache", "valuation_model.json")
+
+# Season age buckets (years): same boundaries as the football shirt heuristic
+AGE_BUCKETS = [5, 10, 20]
+TOKEN_BUCKETS = 64
+
+
+class Featurizer:
+    """
+    Turns a batch of listings plus their title attributes into one feature matrix.
+    The vocabularies are fixed when a model is trained and saved with it, so later
+    brand catalog changes can't shift the columns under a trained model.
+    """
+
+    def __init__(self, brands: List[str], categories: List[str], conditions: List[str],
+                 teams: List[str], token_buckets: int = TOKEN_BUCKETS):
+        self.brands = brands
+        self.categories = categories
+        self.conditions = conditions
+        self.teams = teams
+        self.token_buckets = token_buckets
+        self._brand_index = {name: i for i, name in enumerate(brands)}
+        self._category_index = {name: i for i, name in enumerate(categories)}
+        self._condition_index = {name: i for i, name in enumerate(conditions)}
+        self._team_index = {name: i for i, name in enumerate(teams)}
+
+        self.offsets = {}
+        width = 0
+        for name, size in (("brand", len(brands) + 1), ("category", len(categories) + 1),
+                           ("condition", len(conditions) + 1), ("team", len(teams) + 1),
+                           ("age", len(AGE_BUCKETS) + 2), ("tokens", token_buckets)):
+            self.offsets[name] = width
+            width += size
+        self.width = width
+
+    @classmethod
+    def default(cls) -> "Featurizer":
+        return cls(
+            brands=get_brand_registry().names(),
+            categories=["football_shirt"] + [name for name, _ in CATEGORY_PATTERNS],
+            conditions=[name for name, _ in CONDITION_PATTERNS],
+            teams=list(FOOTBALL_TEAMS),
+        )
+
+    def spec(self) -> Dict:
+        return {"brands": self.brands, "categories": self.categories, "conditions": self.conditions,
+                "teams": self.teams, "token_buckets": self.token_buckets}
+
+    def transform(self, listings: List[Dict], attributes: List[Dict]) -> np.ndarray:
+        """
+        Sparse-ish one-hot rows built with index arrays and a single scatter
+        """
+        current_year = time.localtime().tm_year
+        rows, cols = [], []
+        for row, (listing, attrs) in enumerate(zip(listings, attributes)):
+            offsets = self.offsets
+            columns = [
+                offsets["brand"] + self._brand_index.get(listing.get("brand"), len(self.brands)),
+                offsets["category"] + self._category_index.get(
+                    listing.get("category") or attrs.get("category"), len(self.categories)),
+                offsets["condition"] + self._condition_index.get(attrs.get("condition"), len(self.conditions)),
+                offsets["team"] + self._team_index.get(listing.get("team") or attrs.get("team"), len(self.teams)),
+            ]
+            year = listing.get("year") or attrs.get("year")
+            if year:
+                age = current_year - int(year)
+                columns.append(offsets["age"] + sum(age > edge for edge in AGE_BUCKETS))
+            else:
+                columns.append(offsets["age"] + len(AGE_BUCKETS) + 1)
+            for token in attrs.get("model_tokens") or ():
+                columns.append(offsets["tokens"] + zlib.crc32(token.encode("utf-8")) % self.token_buckets)
+            rows.extend([row] * len(columns))
+            cols.extend(columns)
+
+        matrix = np.zeros((len(listings), self.width), dtype=np.float64)
+        matrix[np.asarray(rows, dtype=np.intp), np.asarray(cols, dtype=np.intp)] = 1.0
+        return matrix
+
+
+class ValuationModel(abc.ABC):
+    """
+    Interface for valuation backends: one call values a whole batch
+    """
+    name = "model"
+
+    @abc.abstractmethod
+    def predict(self, listings: List[Dict], attributes: List[Dict]) -> np.ndarray:
+        """Estimated resale value in GBP for each listing"""
+
+
+class HeuristicModel(ValuationModel):
+    """
+    The hand-tuned valuation (eBay price ranges and football shirt modifiers),
+    used whenever no trained model is available
+    """
+    name = "heuristic"
+
+    def __init__(self, value_listing: Callable[[Dict, Dict], Optional[float]]):
+        self.value_listing = value_listing
+
+    def predict(self, listings: List[Dict], attributes: List[Dict]) -> np.ndarray:
+        return np.array([self.value_listing(listing, attrs) or np.nan
+                         for listing, attrs in zip(listings, attributes)], dtype=np.float64)
+
+
+class RidgeModel(ValuationModel):
+    """
+    Ridge regression on log resale price over the Featurizer columns, fitted in
+    closed form with numpy. Scoring a batch is one matrix-vector product.
+    """
+
+    def __init__(self, featurizer: Featurizer, coef: np.ndarray, intercept: float, meta: Dict = None):
+        self.featurizer = featurizer
+        self.coef = coef
+        self.intercept = intercept
+        self.meta = meta or {}
+        self.name = f"ridge ({self.meta.get('samples', '?')} samples)"
+
+    @classmethod
+    def fit(cls, listings: List[Dict], targets: Iterable[float], alpha: float = 1.0,
+            featurizer: Featurizer = None) -> "RidgeModel":
+        featurizer = featurizer or Featurizer.default()
+        attributes = get_title_extractor().extract_batch([listing.get("title") or "" for listing in listings])
+        X = featurizer.transform(listings, attributes)
+        y = np.log1p(np.asarray(list(targets), dtype=np.float64))
+
+        intercept = float(y.mean())
+        # Centering the one-hot columns keeps the intercept out of the penalty
+        X_mean = X.mean(axis=0)
+        Xc = X - X_mean
+        coef = np.linalg.solve(Xc.T @ Xc + alpha * np.eye(X.shape[1]), Xc.T @ (y - intercept))
+        intercept -= float(X_mean @ coef)
+        return cls(featurizer, coef, intercept, {"samples": len(listings), "alpha": alpha,
+                                                  "trained_at": time.time()})
+
+    def predict(self, listings: List[Dict], attributes: List[Dict]) -> np.ndarray:
+        if not listings:
+            return np.empty(0)
+        return np.expm1(self.featurizer.transform(listings, attributes) @ self.coef + self.intercept)
+
+    def save(self, path: str = VALUATION_MODEL_PATH):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        data = {"type": "ridge", "features": self.featurizer.spec(), "coef": self.coef.tolist(),
+                "intercept": self.intercept, "meta": self.meta}
+        # Write then rename, so a running monitor never loads a half-written model
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str = VALUATION_MODEL_PATH) -> "RidgeModel":
+        with open(path, "r", encoding="utf-8") as f:
+            data = json.load(f)
+        if data.get("type") != "ridge":
+            raise ValueError(f"Unsupported valuation model type: {data.get('type')}")
+        featurizer = Featurizer(**data["features"])
+        coef = np.asarray(data["coef"], dtype=np.float64)
+        if coef.shape != (featurizer.width,):
+            raise ValueError("Valuation model coefficients don't match its feature spec")
+        return cls(featurizer, coef, float(data["intercept"]), data.get("meta"))
+
+
+class ValuationService:
+    """
+    Holds the active valuation model and swaps in a newly trained one when the
+    model file changes, without restarting the monitor. Falls back to the
+    heuristic model when there is no model file or it fails to load.
+    """
+
+    def __init__(self, model_path: str = VALUATION_MODEL_PATH, check_interval: float = 30):
+        self.model_path = model_path
+        self.check_interval = check_interval
+        self.model: Optional[ValuationModel] = None
+        self.loaded_mtime = None
+        self.last_check = 0.0
+        self.lock = threading.Lock()
+
+    def current(self) -> Optional[ValuationModel]:
+        """The trained model, reloaded if the file changed since the last check"""
+        now = time.time()
+        if now - self.last_check >= self.check_interval:
+            with self.lock:
+                self.last_check = now
+                self._reload_if_changed()
+        return self.model
+
+    def _reload_if_changed(self):
+        try:
+            mtime = os.path.getmtime(self.model_path)
+        except OSError:
+            if self.model is not None:
+                logger.info("Valuation model file removed, using heuristics")
+            self.model, self.loaded_mtime = None, None
+            return
+        if mtime == self.loaded_mtime:
+            return
+        try:
+            self.model = RidgeModel.load(self.model_path)
+            logger.info(f"Loaded valuation model: {self.model.name}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            # Keep whatever was serving before
+            logger.error(f"Could not load valuation model: {str(e)}")
+        self.loaded_mtime = mtime
+
+    def swap(self, model: Optional[ValuationModel]):
+        """Install a model directly (None reverts to the heuristics)"""
+        with self.lock:
+            self.model = model
+
+    def predict(self, listings: List[Dict], attributes: List[Dict], fallback: ValuationModel) -> np.ndarray:
+        """
+        Value a batch with the trained model; rows it can't value use the fallback
+        """
+        model = self.current()
+        if model is None or not listings:
+            return fallback.predict(listings, attributes)
+        try:
+            values = model.predict(listings, attributes)
+        except Exception as e:
+            logger.error(f"Valuation model {model.name} failed, using heuristics: {str(e)}")
+            return fallback.predict(listings, attributes)
+        missing = ~np.isfinite(values) | (values <= 0)
+        if missing.any():
+            indexes = np.flatnonzero(missing)
+            values[indexes] = fallback.predict([listings[i] for i in indexes], [attributes[i] for i in indexes])
+        return values
+
+    @property
+    def model_name(self) -> str:
+        model = self.current()
+        return model.name if model else HeuristicModel.name
+
+
+_service: Optional[ValuationService] = None
+
+
+def get_valuation_service() -> ValuationService:
+    """Process-wide valuation service"""
+    global _service
+    if _service is None:
+        _service = ValuationService()
+    return _service
+
+
+def _load_archive_rows(root: str, sold_prices: Dict[str, float]) -> List[Dict]:
+    from listing_archive import iter_archive_batches
+
+    # The archive keeps a snapshot per scan; the latest one describes the item as it sold
+    latest: Dict[str, Dict] = {}
+    for batch in iter_archive_batches(root=root):
+        for row in batch:
+            previous = latest.get(row["id"])
+            if row["id"] in sold_prices and row.get("title") and (
+                    previous is None or row["scraped_at"] >= previous["scraped_at"]):
+                latest[row["id"]] = row
+    for listing_id, row in latest.items():
+        row["sold_price"] = sold_prices[listing_id]
+    return list(latest.values())
+
+
+def load_training_rows(path: str, sold_prices: Dict[str, float] = None) -> List[Dict]:
+    """
+    Archived listings with a `sold_price`: a CSV or JSON-lines file with that
+    column, or a Parquet listing archive directory labelled from `sold_prices` by id
+    """
+    if os.path.isdir(path):
+        return _load_archive_rows(path, sold_prices or {})
+    rows = []
+    with open(path, "r", encoding="utf-8", newline="") as f:
+        reader = csv.DictReader(f) if path.endswith(".csv") else (json.loads(line) for line in f if line.strip())
+        for row in reader:
+            try:
+                row["sold_price"] = float(row.get("sold_price") or 0)
+            except ValueError:
+                continue
+            if row["sold_price"] > 0 and row.get("title"):
+                rows.append(row)
+    return rows
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the valuation model from archived sell-throughs")
+    parser.add_argument("--archive", nargs="*", default=[],
+                        help="CSV / JSON-lines files with a sold_price column, or a Parquet listing archive "
+                             "directory (labelled with the sales in --item-state)")
+    parser.add_argument("--item-state", default=None, help="Item state DB to take observed sales from")
+    parser.add_argument("--alpha", type=float, default=1.0, help="Ridge penalty")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of rows held out for validation")
+    parser.add_argument("--out", default=VALUATION_MODEL_PATH)
+    args = parser.parse_args()
+
+    sold = []
+    if args.item_state:
+        from item_state import ItemStateStore
+        store = ItemStateStore(args.item_state)
+        sold = store.sold_items()
+        store.close()
+    elif any(os.path.isdir(path) for path in args.archive):
+        parser.error("a Parquet archive has no sale prices; give --item-state to label it")
+
+    rows = []
+    sold_prices = {str(row["id"]): row["sold_price"] for row in sold}
+    for path in args.archive:
+        rows.extend(load_training_rows(path, sold_prices))
+    # Sales found in the archive come with its fuller attributes (size, year, team) instead
+    archived = {str(row["id"]) for row in rows}
+    rows.extend(row for row in sold if str(row["id"]) not in archived)
+    if len(rows) < 50:
+        parser.error(f"Need at least 50 sold listings to train, found {len(rows)}")
+
+    rng = np.random.default_rng(0)
+    order = rng.permutation(len(rows))
+    split = int(len(rows) * (1 - args.holdout))
+    train = [rows[i] for i in order[:split]]
+    test = [rows[i] for i in order[split:]]
+
+    model = RidgeModel.fit(train, [row["sold_price"] for row in train], alpha=args.alpha)
+    if test:
+        attributes = get_title_extractor().extract_batch([row.get("title") or "" for row in test])
+        actual = np.array([row["sold_price"] for row in test])
+        error = np.abs(model.predict(test, attributes) - actual)
+        baseline = np.abs(np.median([row["sold_price"] for row in train]) - actual)
+        model.meta.update(holdout_mae=round(float(error.mean()), 2), baseline_mae=round(float(baseline.mean()), 2))
+        logger.info(f"Holdout MAE £{error.mean():.2f} (median baseline £{baseline.mean():.2f})")
+
+    model.save(args.out)
+    logger.info(f"Saved {model.name} to {args.out}; running monitors pick it up on their next check")
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    main()
@@ -0,0 +1,43 @@
+import os
+from typing import Dict
+
+# Per-domain settings for each Vinted storefront. `min_request_interval` is the
+# domain's own rate budget; domains are throttled independently of each other.
+VINTED_DOMAINS = {
+    "co.uk": {"host": "www.vinted.co.uk", "currency": "GBP", "language": "en-GB,en-US;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "fr": {"host": "www.vinted.fr", "currency": "EUR", "language": "fr-FR,fr;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "de": {"host": "www.vinted.de", "currency": "EUR", "language": "de-DE,de;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "nl": {"host": "www.vinted.nl", "currency": "EUR", "language": "nl-NL,nl;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "be": {"host": "www.vinted.be", "currency": "EUR", "language": "fr-BE,nl-BE;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "es": {"host": "www.vinted.es", "currency": "EUR", "language": "es-ES,es;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "it": {"host": "www.vinted.it", "currency": "EUR", "language": "it-IT,it;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "pl": {"host": "www.vinted.pl", "currency": "PLN", "language": "pl-PL,pl;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+    "cz": {"host": "www.vinted.cz", "currency": "CZK", "language": "cs-CZ,cs;q=0.9,en;q=0.8", "min_request_interval": 1.0},
+}
+
+DEFAULT_DOMAIN = "co.uk"
+
+
+def get_domain_config(domain: str) -> Dict:
+    """
+    Settings for a Vinted domain, with URLs derived from its host
+    """
+    if domain not in VINTED_DOMAINS:
+        raise ValueError(f"Unknown Vinted domain '{domain}' (known: {', '.join(VINTED_DOMAINS)})")
+    config = dict(VINTED_DOMAINS[domain])
+    host = config["host"]
+    config["domain"] = domain
+    config["origin"] = f"https://{host}"
+    config["api_url"] = f"https://{host}/api/v2/catalog/items"
+    config["catalog_url"] = f"https://{host}/catalog"
+    config["item_url"] = f"https://{host}/items/{{id}}"
+    config["cookie_domain"] = host.replace("www.", "", 1)
+
+    # Point every domain at another server, e.g. the synthetic stub API for scale tests
+    base_url = os.environ.get("VINTED_BASE_URL", "").rstrip("/")
+    if base_url:
+        config["origin"] = base_url
+        config["api_url"] = f"{base_url}/api/v2/catalog/items"
+        config["catalog_url"] = f"{base_url}/catalog"
+        config["cookie_domain"] = base_url.split("://", 1)[-1].split(":", 1)[0].split("/", 1)[0]
+    return config
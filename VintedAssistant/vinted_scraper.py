@@ -1,24 +1,50 @@
 import requests
-from typing import List, Dict
+from typing import List, Dict, Optional, Tuple
 import time
 import random
 import json
 from fake_useragent import UserAgent
 import logging
-
+from concurrent.futures import ThreadPoolExecutor
+from brand_registry import BrandRegistry, get_brand_registry
+from egress_pool import Egress, EgressPool, EgressUnavailable
+from fx_rates import CURRENCY_SYMBOLS, FxRates, get_fx_rates
+from query_cache import QueryCache
+from rate_limiter import RateLimiter
+from title_attributes import extract_season_year
+from vinted_domains import DEFAULT_DOMAIN, get_domain_config
+
+FOOTBALL_SHIRT_CATALOG_ID = "5066"  # Vinted's category ID for shirts/tops
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
+
+def real_listings(listings: List[Dict]) -> List[Dict]:
+    """Drop the fallback demo items (tagged `demo`) so they never reach the archive or event log"""
+    return [listing for listing in listings if not listing.get("demo")]
+
+
 class VintedScraper:
-    def __init__(self):
-        self.base_url = "https://www.vinted.co.uk/api/v2/catalog/items"
+    def __init__(self, domain: str = DEFAULT_DOMAIN, fx_rates: FxRates = None,
+                 egress_pool: EgressPool = None):
+        self.domain = domain
+        self.config = get_domain_config(domain)
+        self.currency = self.config["currency"]
+        self.base_url = self.config["api_url"]
         self.ua = UserAgent()
         self.session = requests.Session()
+        # Connection pool for this domain only; domains never share sockets or cookies
+        self.session.mount("https://", requests.adapters.HTTPAdapter(pool_connections=4, pool_maxsize=8))
         self.retry_count = 3
         self.retry_delay = 5
         self.last_request_time = 0
-        self.min_request_interval = 1.0  # Reduced minimum seconds between requests
+        self.min_request_interval = self.config["min_request_interval"]
+        self.rate_limiter = RateLimiter.from_interval(self.min_request_interval)
+        self.fx = fx_rates or get_fx_rates()
+        # Optional pool of proxies; when unset every request uses self.session
+        self.egress_pool = egress_pool
+        self.query_cache = QueryCache()
 
         # List of user agents to rotate through
         self.user_agents = [
@@ -29,76 +55,158 @@ class VintedScraper:
             "Mozilla/5.0 (iPad; CPU OS 17_4 like Mac OS X) AppleWebKit/605.1.15 (KHTML, like Gecko) CriOS/123.0.6312.87 Mobile/15E148 Safari/604.1",
         ]
 
-    def get_listings(self, min_price: float, max_price: float, brands: List[str]) -> List[Dict]:
-        """
-        Fetch listings from Vinted based on given criteria with improved anti-detection measures
-        """
-        # Enforce minimum delay between requests
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < self.min_request_interval:
-            sleep_time = self.min_request_interval - time_since_last_request
-            logger.info(f"Rate limiting: Sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-
-        self.last_request_time = time.time()
+    @property
+    def brands(self) -> BrandRegistry:
+        # Looked up on every use, so a catalog refresh reaches every instance
+        return get_brand_registry()
 
-        # Use a random user agent for each request
-        user_agent = random.choice(self.user_agents)
-        headers = {
-            "User-Agent": user_agent,
+    def _build_headers(self) -> Dict:
+        """Browser-like request headers with a random user agent"""
+        return {
+            "User-Agent": random.choice(self.user_agents),
             "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "en-GB,en-US;q=0.9,en;q=0.8",
-            "Origin": "https://www.vinted.co.uk",
-            "Referer": "https://www.vinted.co.uk/catalog",
+            "Accept-Language": self.config["language"],
+            "Origin": self.config["origin"],
+            "Referer": self.config["catalog_url"],
             "Sec-Fetch-Dest": "empty",
             "Sec-Fetch-Mode": "cors",
             "Sec-Fetch-Site": "same-origin",
             "DNT": "1"  # Do Not Track
         }
 
+    def get_listings(self, min_price: float, max_price: float, brands: List[str],
+                     search_text: str = "") -> List[Dict]:
+        """
+        Fetch listings from Vinted based on given criteria with improved anti-detection measures
+        """
+        # Price filters are given in GBP; the API expects the domain's currency
+        params = self._catalog_params(
+            self.fx.from_gbp(min_price, self.currency),
+            self.fx.from_gbp(max_price, self.currency),
+            brands, search_text,
+            per_page=20  # Reduced to avoid detection
+        )
+
+        data = self._fetch_catalog(params)
+        if data is None:
+            # If all retries failed, use fallback mock data
+            logger.warning("All retries failed, returning fallback data")
+            return self._get_fallback_data()
+
+        listings = self._parse_items(data.get("items", []))
+        logger.info(f"Successfully found {len(listings)} listings")
+        return listings
+
+    def _catalog_params(self, price_from: float, price_to: float, brands: List[str], search_text: str = "",
+                        page: int = 1, per_page: int = 20, order: str = "newest_first") -> Dict:
+        """Catalog API query parameters; prices are in this domain's currency"""
+        return {
+            "search_text": search_text,
+            "catalog_ids": "",
+            "color_ids": "",
+            "brand_ids": self._get_brand_ids(brands) if brands and "Other" not in brands else "",
+            "size_ids": "",
+            "material_ids": "",
+            "status_ids": "",
+            "order": order,
+            "price_from": str(round(price_from, 2)),
+            "price_to": str(round(price_to, 2)),
+            "currency": self.currency,
+            "page": str(page),
+            "per_page": str(per_page)
+        }
+
+    def fetch_page(self, price_from: float, price_to: float, brands: List[str], search_text: str = "",
+                   page: int = 1, per_page: int = 96) -> Tuple[Optional[List[Dict]], Dict]:
+        """
+        One page of a catalog query with its `pagination` block (total_entries,
+        total_pages, ...). Price bounds are in this domain's currency. Returns
+        (None, {}) when the request failed; there is no fallback data here.
+        """
+        data = self._fetch_catalog(self._catalog_params(price_from, price_to, brands, search_text, page, per_page))
+        if data is None:
+            return None, {}
+        return self._parse_items(data.get("items", [])), data.get("pagination") or {}
+
+    def _acquire_route(self) -> Tuple[requests.Session, Dict, Optional[Egress]]:
+        """
+        Pick the session to send the next request through. With an egress pool the
+        healthiest egress's own budget applies; otherwise the domain's rate limiter.
+        """
+        headers = self._build_headers()
+        # Raises EgressUnavailable rather than falling back to a route the pool may have blocked
+        egress = self.egress_pool.acquire() if self.egress_pool else None
+        if egress is not None:
+            headers["User-Agent"] = egress.user_agent
+            session = egress.session
+        else:
+            # Enforce this domain's request budget
+            waited = self.rate_limiter.acquire()
+            if waited:
+                logger.info(f"Rate limiting: Slept for {waited:.2f} seconds")
+            session = self.session
+
+        self.last_request_time = time.time()
         # Add cookie consent to help avoid detection
-        self.session.cookies.set("cookie_consent", "true", domain="vinted.co.uk")
+        session.cookies.set("cookie_consent", "true", domain=self.config["cookie_domain"])
+        return session, headers, egress
+
+    def _session_is_warm(self, session: requests.Session) -> bool:
+        """A session is warm once Vinted has set cookies beyond our consent flag"""
+        return any(cookie.name != "cookie_consent" for cookie in session.cookies)
+
+    def _record(self, egress: Optional[Egress], success: bool, started: float, **flags):
+        if egress is not None:
+            self.egress_pool.record(egress, success, latency=time.time() - started, **flags)
+        elif flags.get("captcha") or flags.get("blocked"):
+            # Start over with fresh cookies on the next attempt
+            self.session.cookies.clear()
+
+    def _fetch_catalog(self, params: Dict, use_cache: bool = False) -> Optional[Dict]:
+        """
+        Run one catalog API query with retries and exponential backoff.
+        Returns the decoded JSON, or None when every attempt failed.
+        With use_cache, fresh results are reused and stale ones revalidated.
+        """
+        cached = self.query_cache.get(params) if use_cache else None
+        if cached is not None and self.query_cache.is_fresh(cached):
+            return cached["data"]
 
-        listings = []
         for attempt in range(self.retry_count):
+            try:
+                session, headers, egress = self._acquire_route()
+            except EgressUnavailable as e:
+                logger.warning(f"Giving up on this query: {str(e)}")
+                break
+            started = time.time()
             try:
                 logger.info(f"Attempt {attempt+1}/{self.retry_count} to fetch listings")
 
-                # Initialize session with cookies (different approach)
-                init_url = "https://www.vinted.co.uk/catalog"
-                logger.info(f"Initializing session with {init_url}")
-                init_response = self.session.get(init_url, headers=headers, timeout=10)
-                init_response.raise_for_status()
-
-                # Add a small delay to mimic human behavior
-                time.sleep(random.uniform(1.0, 2.5))
-
-                # Construct search parameters
-                params = {
-                    "search_text": "",
-                    "catalog_ids": "",
-                    "color_ids": "",
-                    "brand_ids": self._get_brand_ids(brands) if brands and "Other" not in brands else "",
-                    "size_ids": "",
-                    "material_ids": "",
-                    "status_ids": "",
-                    "order": "newest_first",
-                    "price_from": str(min_price),
-                    "price_to": str(max_price),
-                    "currency": "GBP",
-                    "page": "1",
-                    "per_page": "20"  # Reduced to avoid detection
-                }
+                # Initialize session with cookies, once per session rather than per query
+                if not self._session_is_warm(session):
+                    init_url = self.config["catalog_url"]
+                    logger.info(f"Initializing session with {init_url}")
+                    init_response = session.get(init_url, headers=headers, timeout=10)
+                    init_response.raise_for_status()
+
+                    # Add a small delay to mimic human behavior
+                    time.sleep(random.uniform(1.0, 2.5))
+                    started = time.time()
 
                 # Make the API request with a timeout
                 logger.info(f"Making API request to {self.base_url}")
-                response = self.session.get(
+                request_headers = dict(headers, **self.query_cache.conditional_headers(cached)) if cached else headers
+                response = session.get(
                     self.base_url,
-                    headers=headers,
+                    headers=request_headers,
                     params=params,
                     timeout=15
                 )
+                if response.status_code == 304 and cached is not None:
+                    # Page unchanged since the last fetch
+                    self._record(egress, True, started)
+                    self.query_cache.touch(params)
+                    return cached["data"]
                 response.raise_for_status()
 
                 # Log response details for debugging
@@ -107,186 +215,182 @@ class VintedScraper:
 
                 try:
                     data = response.json()
-
-                    for item in data.get("items", []):
-                        # Extract price from the nested structure
-                        try:
-                            price_data = item.get("price")
-                            if isinstance(price_data, dict):
-                                price = float(price_data.get("amount", 0))
-                                currency = price_data.get("currency", "GBP")
-                                # Convert to GBP if not already
-                                if currency == "USD" or currency == "$":
-                                    price = price * 0.79  # Approximate USD to GBP conversion
-                            elif isinstance(price_data, str):
-                                # Handle string price formats like "$20.00"
-                                price_data = price_data.replace('$', '').replace('£', '').strip()
-                                price = float(price_data) * 0.79 if '$' in item.get("price", "") else float(price_data)
-                            else:
-                                price = float(price_data) if price_data is not None else 0.0
-                        except (ValueError, TypeError, AttributeError):
-                            # Skip this listing
-                            continue
-
-                        listing = {
-                            "id": item.get("id"),
-                            "title": item.get("title"),
-                            "price": price,
-                            "brand": item.get("brand_title", "Other"),
-                            "size": item.get("size_title"),
-                            "url": f"https://www.vinted.co.uk/items/{item.get('id')}",
-                            "photo": item.get("photos", [{}])[0].get("url") if item.get("photos") else None
-                        }
-                        listings.append(listing)
-
-                    logger.info(f"Successfully found {len(listings)} listings")
-                    return listings
+                    self._record(egress, True, started)
+                    if use_cache:
+                        self.query_cache.put(params, data, response.headers.get("ETag"),
+                                             response.headers.get("Last-Modified"))
+                    return data
 
                 except json.JSONDecodeError as je:
                     logger.warning(f"JSON Decode Error: {str(je)}")
                     logger.warning(f"Response content: {response.text[:300]}")
 
                     # If we get HTML instead of JSON, it's likely a captcha page
-                    if "<html" in response.text[:100].lower():
+                    captcha = "<html" in response.text[:100].lower()
+                    if captcha:
                         logger.warning("Received HTML instead of JSON - likely blocked")
-
-                    # Only retry if this wasn't the last attempt
-                    if attempt < self.retry_count - 1:
-                        # Exponential backoff
-                        wait_time = self.retry_delay * (2 ** attempt)
-                        logger.info(f"Waiting {wait_time} seconds before retry")
-                        time.sleep(wait_time)
-                        # Rotate user agent
-                        headers["User-Agent"] = random.choice(self.user_agents)
-                    else:
-                        # If all retries failed, use fallback mock data
-                        logger.warning("All retries failed, returning fallback data")
-                        return self._get_fallback_data()
+                    self._record(egress, False, started, captcha=captcha)
 
             except requests.exceptions.RequestException as e:
                 logger.error(f"Request error: {str(e)}")
+                status = None
                 if hasattr(e, 'response') and e.response is not None:
+                    status = e.response.status_code
                     logger.error(f"Error response: {e.response.text[:300]}")
+                self._record(egress, False, started, blocked=status in (403, 429))
 
-                # Only retry if this wasn't the last attempt
-                if attempt < self.retry_count - 1:
+            # Only retry if this wasn't the last attempt
+            if attempt < self.retry_count - 1:
+                # With a pool the next attempt goes out through another egress right away
+                if egress is None:
+                    # Exponential backoff
                     wait_time = self.retry_delay * (2 ** attempt)
                     logger.info(f"Waiting {wait_time} seconds before retry")
                     time.sleep(wait_time)
-                    # Rotate user agent
-                    headers["User-Agent"] = random.choice(self.user_agents)
-                else:
-                    # If all retries failed, use fallback mock data
-                    logger.warning("All retries failed, returning fallback data")
-                    return self._get_fallback_data()
 
+        if cached is not None:
+            # A stale page beats fallback data
+            logger.warning("All retries failed, serving cached results")
+            return cached["data"]
+        return None
+
+    def _parse_items(self, items: List[Dict]) -> List[Dict]:
+        """
+        Convert raw catalog items into listings with prices normalized to GBP
+        """
+        listings = []
+        for item in items:
+            try:
+                amount, currency = self._parse_price(item.get("price"))
+                price = round(self.fx.to_gbp(amount, currency), 2)
+            except (ValueError, TypeError, AttributeError):
+                # Skip this listing
+                continue
+
+            listings.append({
+                "id": item.get("id"),
+                "title": item.get("title"),
+                "price": price,
+                "original_price": amount,
+                "currency": currency,
+                "domain": self.domain,
+                "brand": self.brands.canonical(item.get("brand_title")),
+                "size": item.get("size_title"),
+                "seller_id": (item.get("user") or {}).get("id"),
+                "url": self.config["item_url"].format(id=item.get("id")),
+                # Vinted's own "status" field is the item condition, not its availability
+                "availability": "sold" if item.get("is_closed") else "reserved" if item.get("is_reserved") else "active",
+                "photo": item.get("photos", [{}])[0].get("url") if item.get("photos") else None
+            })
         return listings
 
-    def _get_brand_ids(self, brands: List[str]) -> str:
+    def _parse_price(self, price_data) -> Tuple[float, str]:
         """
-        Convert brand names to Vinted brand IDs
-        Updated with more streetwear and high-demand brands
+        Extract (amount, currency) from the nested, string or plain price formats
         """
-        brand_mapping = {
-            # Sportswear
-            "Nike": "53",
-            "Adidas": "14",
-            "Puma": "20",
-            "New Balance": "246",
-            "Jordan": "7592",
-            "Reebok": "88",
-
-            # Streetwear
-            "Supreme": "435",
-            "Palace": "1178",
-            "Stussy": "441",
-            "BAPE": "976",
-            "Off-White": "2090",
-            "Stone Island": "467",
-            "Carhartt": "45",
-            "The North Face": "94",
-
-            # Designer Brands
-            "Nike x Off-White": "7591",
-            "Yeezy": "8272",
-            "Fear of God": "5429",
-            "Palm Angels": "4783",
-            "Essentials": "9102",
-            "Chrome Hearts": "3421",
-
-            # Popular Fashion
-            "Ralph Lauren": "88",
-            "Tommy Hilfiger": "94",
-            "Patagonia": "150",
-            "Arc'teryx": "1543",
-            "Trapstar": "8891",
-            "Corteiz": "9988"
+        if isinstance(price_data, dict):
+            currency = price_data.get("currency_code") or price_data.get("currency") or self.currency
+            return float(price_data.get("amount", 0)), currency
+        if isinstance(price_data, str):
+            # Handle string price formats like "$20.00" or "12,50 €"
+            currency = self.currency
+            for symbol, code in CURRENCY_SYMBOLS.items():
+                if symbol in price_data:
+                    currency = code
+                    price_data = price_data.replace(symbol, "")
+            price_data = price_data.strip().replace("\xa0", "").replace(" ", "")
+            if "," in price_data and "." not in price_data:
+                price_data = price_data.replace(",", ".")
+            return float(price_data.replace(",", "")), currency
+        return (float(price_data) if price_data is not None else 0.0), self.currency
 
+    def _get_brand_ids(self, brands: List[str]) -> str:
+        """
+        Convert brand names to Vinted brand IDs using the shared brand registry
+        """
+        return ",".join(self.brands.ids_for(brands))
 
-        }
-        brand_ids = [brand_mapping[brand] for brand in brands if brand in brand_mapping]
-        return ",".join(brand_ids)
+    def refresh_brand_catalog(self) -> BrandRegistry:
+        """
+        Refresh brand IDs from Vinted's brand endpoint into the shared local cache
+        """
+        # refresh() installs the new catalog as the shared registry
+        return self.brands.refresh(self.session, headers=self._build_headers())
 
     def _add_delay(self):
         """Add minimal but effective delay between requests to avoid rate limiting"""
         time.sleep(random.uniform(2.0, 4.0))
 
     def search_football_shirts(self, search_term: str, min_price: float, max_price: float, 
-                                brand: str = None, min_year: int = None, max_year: int = None) -> List[Dict]:
+                                brand: str = None, min_year: int = None, max_year: int = None,
+                                team: str = None) -> List[Dict]:
         """
         Search for football shirts on Vinted
         """
-        # Minimal delay to speed up football shirt search
-        # Only delay 0.1 seconds instead of the full interval since we're using fallback data
-        current_time = time.time()
-        time_since_last_request = current_time - self.last_request_time
-        if time_since_last_request < 0.1:  # Reduced delay for football shirts
-            sleep_time = 0.1 - time_since_last_request
-            logger.info(f"Rate limiting (fast mode): Sleeping for {sleep_time:.2f} seconds")
-            time.sleep(sleep_time)
-
-        self.last_request_time = time.time()
-
-        # Use a random user agent for each request
-        user_agent = random.choice(self.user_agents)
-        headers = {
-            "User-Agent": user_agent,
-            "Accept": "application/json, text/plain, */*",
-            "Accept-Language": "en-GB,en-US;q=0.9,en;q=0.8",
-            "Origin": "https://www.vinted.co.uk",
-            "Referer": "https://www.vinted.co.uk/catalog",
-            "Sec-Fetch-Dest": "empty",
-            "Sec-Fetch-Mode": "cors",
-            "Sec-Fetch-Site": "same-origin",
-            "DNT": "1"  # Do Not Track
+        # Prepare search parameters
+        params = {
+            "search_text": search_term,
+            "catalog_ids": FOOTBALL_SHIRT_CATALOG_ID,
+            "price_from": str(round(self.fx.from_gbp(min_price, self.currency), 2)),
+            "price_to": str(round(self.fx.from_gbp(max_price, self.currency), 2)),
+            "currency": self.currency,
+            "order": "newest_first",
+            "page": "1",
+            "per_page": "20"
         }
 
-        try:
-            # Prepare search parameters
-            params = {
-                "search_text": search_term,
-                "catalog_ids": "5066",  # This is Vinted's category ID for shirts/tops
-                "price_from": str(min_price),
-                "price_to": str(max_price),
-                "currency": "GBP",
-                "page": "1",
-                "per_page": "20"
-            }
-
-            # Add brand if specified
-            if brand and brand != "Other":
-                brand_id = self._get_brand_ids([brand])
-                if brand_id:
-                    params["brand_ids"] = brand_id
+        # Add brand if specified
+        if brand and brand != "Other":
+            brand_id = self._get_brand_ids([brand])
+            if brand_id:
+                params["brand_ids"] = brand_id
 
-            # Make API request (or return fallback data for demo)
-            # In a real implementation, we would make an actual API call here
-            # For now, use fallback data to avoid being blocked
+        data = self._fetch_catalog(params, use_cache=True)
+        if data is None:
+            logger.warning(f"Football shirt search failed for '{search_term}', returning fallback data")
             return self._get_football_shirt_fallback_data(search_term, brand, min_year, max_year)
 
-        except Exception as e:
-            logger.error(f"Error searching for football shirts: {str(e)}")
-            return self._get_football_shirt_fallback_data(search_term, brand, min_year, max_year)
+        shirts = []
+        for listing in self._parse_items(data.get("items", [])):
+            year = extract_season_year(listing.get("title") or "")
+            # Vinted has no season filter, so the year range is applied after fetching
+            if year and ((min_year and year < min_year) or (max_year and year > max_year)):
+                continue
+            listing["category"] = "football_shirt"
+            listing["team"] = team or search_term
+            listing["year"] = year
+            shirts.append(listing)
+        return shirts
+
+    def search_football_shirts_batch(self, teams: List[str], kit_types: List[str], min_price: float,
+                                     max_price: float, brand: str = None, min_year: int = None,
+                                     max_year: int = None, max_workers: int = 4) -> List[Dict]:
+        """
+        Fan out one query per team x kit type. Queries run concurrently but all draw
+        from this scraper's rate budget (or egress pool), so the fan-out never
+        exceeds the configured request rate.
+        """
+        queries = [(team, f"{team} {kit} shirt") for team in teams for kit in (kit_types or ["home"])]
+        shirts = []
+        seen_ids = set()
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="football-search") as executor:
+            futures = [
+                executor.submit(self.search_football_shirts, term, min_price, max_price,
+                                brand, min_year, max_year, team)
+                for team, term in queries
+            ]
+            for future in futures:
+                try:
+                    results = future.result()
+                except Exception as e:
+                    logger.error(f"Error searching for football shirts: {str(e)}")
+                    continue
+                for shirt in results:
+                    # The same shirt often matches several kit-type queries
+                    if shirt["id"] not in seen_ids:
+                        seen_ids.add(shirt["id"])
+                        shirts.append(shirt)
+        return shirts
 
     def _get_football_shirt_fallback_data(self, search_term: str, brand: str, 
                                          min_year: int, max_year: int) -> List[Dict]:
@@ -383,9 +487,10 @@ class VintedScraper:
                 "price": price,
                 "brand": shirt_brand,
                 "size": random.choice(["S", "M", "L", "XL"]),
-                "url": f"https://www.vinted.co.uk/catalog?search_text={encoded_search}+football+shirt",
+                "url": f"{self.config['catalog_url']}?search_text={encoded_search}+football+shirt",
                 "photo": None,
-                "year": year
+                "year": year,
+                "demo": True
             }
             fallback_listings.append(listing)
 
@@ -463,8 +568,9 @@ class VintedScraper:
                 "price": round(price, 2),
                 "brand": brand,
                 "size": random.choice(["S", "M", "L", "XL"]),
-                "url": f"https://www.vinted.co.uk/catalog?search_text={encoded_search}",
-                "photo": None
+                "url": f"{self.config['catalog_url']}?search_text={encoded_search}",
+                "photo": None,
+                "demo": True
             }
             fallback_listings.append(listing)
 